@@ -0,0 +1,125 @@
+# armazenamento.py (INTERFACE COMUM DOS BACKENDS DE ARMAZENAMENTO DAS TRANSAÇÕES)
+from abc import ABC, abstractmethod
+
+from dados import MESES_PT
+from fila_mutacoes import OP_INSERIR
+from kpis import calcular_tabela_kpis
+
+LIMITE_AVISO_LOTE = 500 # Lotes maiores são avisados sem a lista de linhas (quem recebe recarrega)
+
+class ArmazenamentoTransacoes(ABC):
+    """
+    Onde as transações ficam guardadas (Google Sheets, SQLite local...).
+
+    Todas as operações recebem/devolvem registros no formato de
+    COLUNAS_SIMPLIFICADAS e são particionadas por ano (coluna 'Ano'). As
+    leituras devolvem DataFrames já limpos por `preparar_transacoes`.
+
+    Depois que uma escrita chega de fato ao armazenamento, o backend chama
+    `ao_gravar(ano, aplicadas)` com a lista (op, id, dados) gravada; o app usa
+    isso para corrigir o DataFrame cacheado. Backends com escrita adiada
+    (fila) podem chamá-lo mais tarde, de outra thread. Lotes grandes chegam
+    como `aplicadas=None` (mudou demais para corrigir linha a linha: recarregar).
+    """
+
+    nome = ""
+    consulta_nativa = False # True quando consultar_mes/kpis_mes não passam por carregar()
+
+    def __init__(self):
+        self.ao_gravar = None
+
+    def _gravado(self, ano, aplicadas):
+        if (aplicadas is None or aplicadas) and self.ao_gravar is not None:
+            self.ao_gravar(ano, aplicadas)
+
+    def _gravado_lote(self, ano, df):
+        """Avisa `ao_gravar` das inserções de um lote; acima de LIMITE_AVISO_LOTE linhas, só avisa que mudou."""
+        if len(df) > LIMITE_AVISO_LOTE:
+            self._gravado(ano, None)
+        else:
+            self._gravado(ano, [(OP_INSERIR, dados['ID Transacao'], dados) for dados in df.to_dict('records')])
+
+    # --- Leitura ---
+
+    @abstractmethod
+    def anos(self):
+        """Anos que já têm transações (ou partição criada), em ordem crescente."""
+
+    @abstractmethod
+    def carregar(self, ano):
+        """Todas as transações do ano."""
+
+    def consultar_mes(self, ano, mes):
+        """Transações de um mês do ano."""
+        df = self.carregar(ano)
+        if df.empty:
+            return df
+        return df[df['Mês'] == mes]
+
+    def kpis_mes(self, ano, mes):
+        """Linha de KPIs (COLUNAS_KPI) do mês."""
+        return calcular_tabela_kpis(self.consultar_mes(ano, mes), [mes]).loc[mes]
+
+    def kpis_ano(self, ano):
+        """Tabela de KPIs (COLUNAS_KPI) dos 12 meses do ano."""
+        return calcular_tabela_kpis(self.carregar(ano), MESES_PT.values())
+
+    def versao(self, ano):
+        """Valor que muda sempre que os dados da partição mudam (chave de memoização), ou None se o backend não sabe."""
+        return None
+
+    def vazio(self, ano):
+        return self.carregar(ano).empty
+
+    # --- Escrita ---
+
+    @abstractmethod
+    def inserir(self, dados):
+        """Nova transação, gravada na partição de dados['Ano']."""
+
+    def inserir_lote(self, df):
+        """Várias transações novas de uma vez (DataFrame com COLUNAS_SIMPLIFICADAS, ex.: importação)."""
+        for dados in df.to_dict('records'):
+            self.inserir(dados)
+
+    @abstractmethod
+    def atualizar(self, id_transacao, dados, ano):
+        """Substitui a transação `id_transacao` da partição `ano` por `dados`."""
+
+    @abstractmethod
+    def deletar(self, id_transacao, ano):
+        """Remove a transação `id_transacao` da partição `ano`."""
+
+    # --- Escrita adiada e sincronização (opcionais) ---
+
+    def pendentes(self, ano):
+        """Fila de mutações ainda não gravadas da partição, ou None se o backend grava na hora."""
+        return None
+
+    def descarregar(self, ano, forcar=False):
+        """
+        Grava as mutações pendentes da partição (todas com `forcar`, senão só
+        se a fila pedir). Backends que gravam na hora não têm o que fazer.
+        """
+        return None
+
+    def sincronizar(self, ano):
+        """
+        Descarta cópias locais da partição e relê tudo da origem (atualização
+        manual). Backends sem cópia local não têm o que fazer.
+        """
+        return None
+
+    def migracao_pendente(self):
+        """True se há dados no formato antigo (sem partição por ano) aguardando migração."""
+        return False
+
+    # --- Modelos de recorrência (opcionais) ---
+
+    def ler_recorrencias(self):
+        """Modelos de transações recorrentes (COLUNAS_RECORRENCIAS), ou None se o backend não os guarda."""
+        return None
+
+    def gravar_recorrencias(self, df):
+        """Substitui todos os modelos de recorrência por `df` (são poucos: regravados inteiros)."""
+        raise NotImplementedError(f"O armazenamento '{self.nome}' não guarda modelos de recorrência.")
@@ -0,0 +1,272 @@
+# armazenamento_sheets.py (BACKEND GOOGLE SHEETS: ESPELHO LOCAL, ÍNDICE DE LINHAS E FILA WRITE-BEHIND POR ANO)
+import threading
+from contextlib import nullcontext
+
+import pandas as pd
+
+from armazenamento import ArmazenamentoTransacoes
+from concorrencia import TRAVAS_ABAS, RevisaoAba
+from dados import (
+    ABA_RECORRENCIAS, COLUNAS_RECORRENCIAS, COLUNAS_SIMPLIFICADAS, atualizar_preparadas, preparar_transacoes,
+)
+from espelho_local import EspelhoLocal, caminho_espelho, titulos_com_espelho
+from fila_mutacoes import OP_ATUALIZAR, FilaMutacoes, caminho_fila
+from indice_linhas import IndiceLinhas
+from particoes import (
+    aba_legada_pendente, abas_por_titulo, ano_da_aba, listar_anos, migrar_aba_legada, obter_aba, titulo_aba,
+)
+
+class _Particao:
+    """
+    Estruturas locais de uma aba anual: espelho SQLite, índice ID -> linha
+    (retrato da coluna de IDs, refeito a cada descarga),
+    fila de mutações, a revisão otimista da aba no Sheets e o último
+    DataFrame limpo com a revisão do espelho de que ele saiu. Só para
+    leitura, o espelho fica em memória e não há fila.
+    """
+
+    def __init__(self, ano, colunas, somente_leitura=False):
+        self.espelho = EspelhoLocal(":memory:" if somente_leitura else caminho_espelho(titulo_aba(ano)))
+        self.indice = IndiceLinhas()
+        self.fila = None if somente_leitura else FilaMutacoes(colunas, caminho=caminho_fila(titulo_aba(ano)))
+        self.revisao = RevisaoAba()
+        self.lock = threading.Lock()
+        self.preparado = None
+        self.revisao_preparada = None
+
+class ArmazenamentoSheets(ArmazenamentoTransacoes):
+    """
+    Transações no Google Sheets, uma aba por ano (TRANSACOES_AAAA).
+
+    Leitura: sincronização incremental do espelho local da aba e limpeza com
+    pandas; sem conexão (ou se a sincronização falhar) usa o último conteúdo
+    do espelho e guarda o erro em `erros_sincronizacao[ano]`. Se a revisão do
+    espelho não mudou desde a última leitura, devolve o mesmo DataFrame (sem
+    reler nem limpar); se mudaram poucas linhas, limpa só essas.
+    Escrita: as mutações vão para a fila write-behind da aba e são gravadas
+    em um único batch_update quando a fila enche, quando o intervalo vence
+    (timer em segundo plano) ou em `descarregar(ano, forcar=True)`.
+
+    Concorrência: dentro do processo, toda escrita numa aba passa pela trava
+    da aba (`TRAVAS_ABAS`), então sessões diferentes nunca intercalam suas
+    gravações. Entre processos (outro servidor do app), a descarga leva a
+    revisão otimista da aba (`concorrencia.RevisaoAba`) e é refeita se a aba
+    mudou no meio. Edições feitas à mão na planilha ficam de fora.
+
+    Pode começar sem planilha (`spreadsheet=None`, conexão ainda subindo):
+    as leituras usam os espelhos em disco e a fila espera; `conectar`
+    entrega a planilha quando ela fica pronta.
+
+    Com `somente_leitura=True` (a exportação pela linha de comando) não
+    abre os espelhos nem as filas em disco do app e não liga o timer: cada
+    ano é baixado para um espelho em memória, e as escritas levantam
+    PermissionError. Assim o CLI nunca descarrega a fila do app em paralelo
+    com ele.
+    """
+
+    nome = "sheets"
+
+    def __init__(self, spreadsheet, colunas=COLUNAS_SIMPLIFICADAS, instrumentacao=None, somente_leitura=False):
+        super().__init__()
+        self.spreadsheet = spreadsheet
+        self.somente_leitura = somente_leitura
+        self.colunas = list(colunas)
+        self.instrumentacao = instrumentacao
+        self.erros_sincronizacao = {}
+        self._lock = threading.Lock()
+        self._particoes = {}
+        self._recorrencias = None # Modelos lidos da aba RECORRENCIAS (só mudam por gravar_recorrencias)
+        self.travas = TRAVAS_ABAS
+
+    def conectar(self, spreadsheet):
+        """Passa a usar a planilha aberta (ex.: pela conexão em segundo plano)."""
+        self.spreadsheet = spreadsheet
+
+    def _planilha(self):
+        if self.spreadsheet is None:
+            raise ConnectionError("Sem conexão com o Google Sheets (ainda conectando ou falhou). Tente de novo em instantes.")
+        return self.spreadsheet
+
+    def _exigir_escrita(self):
+        if self.somente_leitura:
+            raise PermissionError("Armazenamento aberto só para leitura (ex.: exportação pela linha de comando).")
+
+    def _etapa(self, nome):
+        return self.instrumentacao.etapa(nome) if self.instrumentacao is not None else nullcontext()
+
+    def _particao(self, ano):
+        ano = int(ano)
+        with self._lock:
+            particao = self._particoes.get(ano)
+            if particao is None:
+                particao = self._particoes[ano] = _Particao(ano, self.colunas, self.somente_leitura)
+                if particao.fila is not None:
+                    particao.fila.iniciar_timer(lambda: self.descarregar(ano, forcar=True))
+            return particao
+
+    # --- Leitura ---
+
+    def anos(self):
+        if self.spreadsheet is None:
+            # Sem conexão (ainda): os anos que têm cópia local
+            return sorted(a for a in map(ano_da_aba, titulos_com_espelho()) if a is not None)
+        return listar_anos(self.spreadsheet)
+
+    def tem_copia_local(self, ano):
+        """True se o espelho em disco do ano já tem dados (dá para exibir sem esperar a conexão)."""
+        return not self._particao(ano).espelho.vazio()
+
+    def carregar(self, ano):
+        particao = self._particao(ano)
+        espelho = particao.espelho
+        self.erros_sincronizacao.pop(ano, None)
+        with particao.lock:
+            if self.spreadsheet is not None:
+                try:
+                    aba = obter_aba(self.spreadsheet, ano, self.colunas)
+                    if aba is None:
+                        return pd.DataFrame() # Ano ainda sem transações (a aba é criada na primeira gravação)
+                    with self._etapa("sincronizacao_sheets"):
+                        espelho.sincronizar(aba)
+                except Exception as e:
+                    if espelho.vazio():
+                        raise
+                    self.erros_sincronizacao[ano] = e
+            return self._preparado(particao)
+
+    def _preparado(self, particao):
+        """
+        DataFrame limpo da revisão atual do espelho: o mesmo objeto se nada
+        mudou (resultados derivados dele continuam valendo), o anterior com
+        só as linhas alteradas limpas de novo ou, sem como saber o que mudou,
+        a leitura e a limpeza completas.
+        """
+        espelho = particao.espelho
+        revisao = espelho.revisao
+        if particao.preparado is not None and particao.revisao_preparada == revisao:
+            return particao.preparado
+
+        alterados = None
+        if particao.preparado is not None and 'ID Transacao' in particao.preparado.columns:
+            alterados = espelho.alteracoes_desde(particao.revisao_preparada)
+        if alterados is None:
+            with self._etapa("leitura_espelho"):
+                df = espelho.carregar()
+            with self._etapa("limpeza_pandas"):
+                df = preparar_transacoes(df)
+        else:
+            with self._etapa("limpeza_incremental"):
+                linhas_por_id = espelho.ids_por_linha()
+                df = atualizar_preparadas(
+                    particao.preparado, espelho.carregar_ids(alterados, linhas_por_id), alterados, linhas_por_id,
+                )
+        particao.preparado, particao.revisao_preparada = df, revisao
+        espelho.confirmar(revisao)
+        return df
+
+    def ultima_sincronizacao(self, ano):
+        return self._particao(ano).espelho.ultima_sincronizacao
+
+    # --- Escrita ---
+
+    def inserir(self, dados):
+        self._exigir_escrita()
+        ano = int(dados['Ano'])
+        self._particao(ano).fila.inserir(dados)
+        self.descarregar(ano)
+
+    def inserir_lote(self, df):
+        """
+        Importação em lote: um `append_rows` por aba anual, sem passar pela fila
+        (que grava cada mutação em disco). O espelho se acerta na próxima
+        leitura.
+        """
+        self._exigir_escrita()
+        planilha = self._planilha()
+        for ano, lote in df.groupby('Ano'):
+            lote = lote[self.colunas].astype(object).where(lote[self.colunas].notna(), "")
+            with self.travas.exclusiva(titulo_aba(int(ano))):
+                aba = obter_aba(planilha, int(ano), self.colunas, criar=True)
+                aba.append_rows(lote.to_numpy().tolist(), value_input_option='RAW')
+            self._gravado_lote(int(ano), lote)
+
+    def atualizar(self, id_transacao, dados, ano):
+        self._exigir_escrita()
+        self._particao(ano).fila.atualizar(id_transacao, dados)
+        self.descarregar(ano)
+
+    def deletar(self, id_transacao, ano):
+        self._exigir_escrita()
+        self._particao(ano).fila.deletar(id_transacao)
+        self.descarregar(ano)
+
+    # --- Fila e sincronização ---
+
+    def pendentes(self, ano):
+        return self._particao(ano).fila
+
+    def descarregar(self, ano, forcar=False):
+        """Grava a fila do ano com um único batch_update e avisa `ao_gravar` com o que foi aplicado."""
+        particao = self._particao(ano)
+        fila = particao.fila
+        if fila is None or not len(fila) or not (forcar or fila.precisa_descarregar()) or self.spreadsheet is None:
+            return None # Sem conexão: a fila (em disco) espera
+        trava = self.travas.trava(titulo_aba(ano))
+        if not trava.acquire(blocking=forcar):
+            return None # Outra descarga da aba em andamento (quem salvou o formulário não espera): o timer pega o resto
+        try:
+            aba = obter_aba(self.spreadsheet, ano, self.colunas, criar=True)
+            resumo = fila.descarregar(aba, particao.indice, particao.revisao)
+            # Sem esperar a janela de verificação da sincronização passar por essas linhas
+            particao.espelho.atualizar_linhas({
+                id_transacao: dados for op, id_transacao, dados in resumo["aplicadas"] if op == OP_ATUALIZAR
+            })
+        finally:
+            trava.release()
+        self._gravado(int(ano), resumo["aplicadas"])
+        return resumo
+
+    def sincronizar(self, ano):
+        planilha = self._planilha()
+        self.descarregar(ano, forcar=True)
+        aba = obter_aba(planilha, ano, self.colunas)
+        if aba is not None:
+            self._particao(ano).espelho.sincronizar(aba, forcar=True)
+
+    # --- Migração da aba única ---
+
+    def migracao_pendente(self):
+        return not self.somente_leitura and self.spreadsheet is not None and aba_legada_pendente(self.spreadsheet)
+
+    def migrar(self, ano_padrao=None):
+        """Copia a aba única TRANSACOES para as abas anuais (ver `particoes.migrar_aba_legada`)."""
+        self._exigir_escrita()
+        return migrar_aba_legada(self._planilha(), self.colunas, ano_padrao)
+
+    # --- Modelos de recorrência ---
+
+    def ler_recorrencias(self):
+        """Aba RECORRENCIAS inteira, lida uma vez (a tela é desenhada a cada rerun); sem a aba, nenhum modelo."""
+        if self._recorrencias is None:
+            df = pd.DataFrame(columns=COLUNAS_RECORRENCIAS)
+            aba = abas_por_titulo(self._planilha()).get(ABA_RECORRENCIAS)
+            valores = aba.get_all_values(value_render_option='UNFORMATTED_VALUE') if aba is not None else []
+            if len(valores) >= 2:
+                df = pd.DataFrame(valores[1:], columns=[str(c) for c in valores[0]]).reindex(columns=COLUNAS_RECORRENCIAS)
+            self._recorrencias = df
+        return self._recorrencias
+
+    def gravar_recorrencias(self, df):
+        """Regrava a aba RECORRENCIAS (criada na primeira vez) com um clear e um update."""
+        self._exigir_escrita()
+        planilha = self._planilha()
+        linhas = df[COLUNAS_RECORRENCIAS].astype(object).where(df[COLUNAS_RECORRENCIAS].notna(), "")
+        with self.travas.exclusiva(ABA_RECORRENCIAS):
+            aba = abas_por_titulo(planilha).get(ABA_RECORRENCIAS)
+            if aba is None:
+                aba = planilha.add_worksheet(
+                    title=ABA_RECORRENCIAS, rows=max(100, len(df) + 1), cols=len(COLUNAS_RECORRENCIAS),
+                )
+            aba.clear()
+            aba.update('A1', [COLUNAS_RECORRENCIAS] + linhas.to_numpy().tolist(), value_input_option='RAW')
+        self._recorrencias = df[COLUNAS_RECORRENCIAS].reset_index(drop=True)
@@ -0,0 +1,222 @@
+# armazenamento_sqlite.py (BACKEND SQLITE LOCAL COM ÍNDICES E CONSULTAS POR MÊS EM SQL)
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from armazenamento import ArmazenamentoTransacoes
+from dados import COLUNAS_RECORRENCIAS, COLUNAS_SIMPLIFICADAS, MESES_PT, STATUS_DEFAULT, preparar_transacoes
+from espelho_local import LOTE_PARAMETROS, PASTA_CACHE
+from fila_mutacoes import OP_ATUALIZAR, OP_DELETAR, OP_INSERIR
+from kpis import calcular_tabela_kpis
+
+CAMINHO_SQLITE_PADRAO = os.path.join(PASTA_CACHE, "transacoes.sqlite")
+
+# Coluna da planilha -> coluna da tabela SQL
+COLUNAS_SQL = {
+    'ID Transacao': 'id',
+    'Mês': 'mes',
+    'Descricao': 'descricao',
+    'Categoria': 'categoria',
+    'Valor': 'valor',
+    'Status': 'status',
+    'Ano': 'ano',
+}
+
+def _registros_lote(df, colunas):
+    """Tuplas para o executemany, normalizadas como em `_registro` mas de forma vetorizada."""
+    valores = pd.to_numeric(df['Valor'], errors='coerce').astype(object)
+    lote = pd.DataFrame({
+        **{c: df[c].astype(object) for c in colunas},
+        'Valor': valores.where(pd.notna(valores), None),
+        'Status': df['Status'].astype(object).where(df['Status'].notna() & df['Status'].ne(''), STATUS_DEFAULT),
+        'Ano': df['Ano'].astype('int64').astype(object),
+    }, columns=colunas)
+    return lote.itertuples(index=False, name=None)
+
+# Coluna dos modelos de recorrência -> coluna da tabela SQL
+COLUNAS_SQL_RECORRENCIAS = {
+    'ID Modelo': 'id',
+    'Descricao': 'descricao',
+    'Categoria': 'categoria',
+    'Valor': 'valor',
+    'Status': 'status',
+    'Frequencia': 'frequencia',
+    'Inicio': 'inicio',
+    'Fim': 'fim',
+}
+
+class ArmazenamentoSQLite(ArmazenamentoTransacoes):
+    """
+    Transações em um banco SQLite local, sem cota nem latência de rede.
+
+    Uma única tabela com o ID como chave primária (índice único implícito) e
+    um índice composto (ano, mes, categoria, status): a lista do mês e os
+    KPIs do mês são respondidos por SQL (`WHERE` + `GROUP BY` no índice), sem
+    carregar o ano inteiro no pandas. Escritas são gravadas na hora.
+    """
+
+    nome = "sqlite"
+    consulta_nativa = True
+
+    def __init__(self, caminho=CAMINHO_SQLITE_PADRAO, colunas=COLUNAS_SIMPLIFICADAS):
+        super().__init__()
+        self.caminho = caminho
+        self.colunas = list(colunas)
+        self._sql = [COLUNAS_SQL[c] for c in self.colunas]
+        self._lock = threading.Lock()
+        self._carregados = {} # ano -> (versao, DataFrame) da última carga do ano inteiro
+        if caminho != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS transacoes ("
+                "id TEXT PRIMARY KEY, ano INTEGER NOT NULL, mes TEXT, descricao TEXT, "
+                "categoria TEXT, valor REAL, status TEXT)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_transacoes_mes ON transacoes (ano, mes, categoria, status)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS recorrencias ("
+                "id TEXT PRIMARY KEY, descricao TEXT, categoria TEXT, valor REAL, status TEXT, "
+                "frequencia TEXT, inicio TEXT, fim TEXT)"
+            )
+
+    def _registro(self, dados):
+        """Valores na ordem de `self._sql`, já normalizados (Valor numérico, Status padrão, Ano inteiro)."""
+        valores = dict(dados)
+        valor = pd.to_numeric(valores.get('Valor'), errors='coerce')
+        valores['Valor'] = None if pd.isna(valor) else float(valor)
+        valores['Status'] = valores.get('Status') or STATUS_DEFAULT
+        valores['Ano'] = int(valores['Ano'])
+        return tuple(valores.get(c) for c in self.colunas)
+
+    def _consultar(self, filtro, parametros):
+        with self._lock:
+            df = pd.read_sql_query(
+                f"SELECT {', '.join(self._sql)} FROM transacoes WHERE {filtro} ORDER BY rowid",
+                self._conn, params=parametros,
+            )
+        if df.empty:
+            return pd.DataFrame()
+        return preparar_transacoes(df.set_axis(self.colunas, axis=1))
+
+    # --- Leitura ---
+
+    def anos(self):
+        with self._lock:
+            return [a for (a,) in self._conn.execute("SELECT DISTINCT ano FROM transacoes ORDER BY ano")]
+
+    def carregar(self, ano):
+        """Ano inteiro; sem escrita desde a última carga (mesma `versao`), devolve o mesmo DataFrame."""
+        ano = int(ano)
+        versao = self.versao(ano)
+        anterior = self._carregados.get(ano)
+        if anterior is not None and anterior[0] == versao:
+            return anterior[1]
+        df = self._consultar("ano = ?", (ano,))
+        self._carregados[ano] = (versao, df)
+        return df
+
+    def consultar_mes(self, ano, mes):
+        return self._consultar("ano = ? AND mes = ?", (int(ano), mes))
+
+    def _somas_kpis(self, filtro, parametros):
+        """Centavos somados por (Mês, Categoria, Status) no SQL, no formato que `calcular_tabela_kpis` espera."""
+        with self._lock:
+            somas = self._conn.execute(
+                "SELECT mes, categoria, status, SUM(CAST(ROUND(valor * 100) AS INTEGER)) FROM transacoes "
+                f"WHERE {filtro} AND valor IS NOT NULL GROUP BY mes, categoria, status",
+                parametros,
+            ).fetchall()
+        return pd.DataFrame(somas, columns=['Mês', 'Categoria', 'Status', 'Centavos'])
+
+    def kpis_mes(self, ano, mes):
+        df = self._somas_kpis("ano = ? AND mes = ?", (int(ano), mes))
+        return calcular_tabela_kpis(df, [mes]).loc[mes].round(2)
+
+    def kpis_ano(self, ano):
+        return calcular_tabela_kpis(self._somas_kpis("ano = ?", (int(ano),)), MESES_PT.values()).round(2)
+
+    def versao(self, ano):
+        # Total de linhas alteradas por esta conexão: muda a cada escrita (de qualquer ano)
+        with self._lock:
+            return self._conn.total_changes
+
+    def vazio(self, ano):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM transacoes WHERE ano = ? LIMIT 1", (int(ano),)).fetchone() is None
+
+    # --- Escrita ---
+
+    def inserir(self, dados):
+        registro = self._registro(dados)
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                f"INSERT OR IGNORE INTO transacoes ({', '.join(self._sql)}) VALUES ({', '.join('?' * len(self._sql))})",
+                registro,
+            )
+        if cursor.rowcount:
+            self._gravado(int(dados['Ano']), [(OP_INSERIR, dados['ID Transacao'], dados)])
+
+    def inserir_lote(self, df):
+        """
+        Um único executemany; IDs que já existem (no banco ou repetidos no
+        lote) são ignorados e não chegam a `ao_gravar`.
+        """
+        if df.empty:
+            return
+        ids = df['ID Transacao'].astype(str)
+        with self._lock, self._conn:
+            existentes = set()
+            unicos = list(ids.unique())
+            for inicio in range(0, len(unicos), LOTE_PARAMETROS):
+                lote_ids = unicos[inicio:inicio + LOTE_PARAMETROS]
+                existentes.update(i for (i,) in self._conn.execute(
+                    f"SELECT id FROM transacoes WHERE id IN ({', '.join('?' * len(lote_ids))})", lote_ids,
+                ))
+            novas = df[~ids.isin(existentes) & ~ids.duplicated()]
+            self._conn.executemany(
+                f"INSERT OR IGNORE INTO transacoes ({', '.join(self._sql)}) VALUES ({', '.join('?' * len(self._sql))})",
+                _registros_lote(novas, self.colunas),
+            )
+        for ano, lote in novas.groupby('Ano'):
+            self._gravado_lote(int(ano), lote)
+
+    def atualizar(self, id_transacao, dados, ano):
+        registro = self._registro(dict(dados, **{'ID Transacao': id_transacao}))
+        atribuicoes = ", ".join(f"{c} = ?" for c in self._sql)
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                f"UPDATE transacoes SET {atribuicoes} WHERE id = ? AND ano = ?",
+                (*registro, id_transacao, int(ano)),
+            )
+        if cursor.rowcount:
+            self._gravado(int(ano), [(OP_ATUALIZAR, id_transacao, dados)])
+
+    def deletar(self, id_transacao, ano):
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM transacoes WHERE id = ? AND ano = ?", (id_transacao, int(ano)))
+        if cursor.rowcount:
+            self._gravado(int(ano), [(OP_DELETAR, id_transacao, None)])
+
+    # --- Modelos de recorrência ---
+
+    def ler_recorrencias(self):
+        sql = [COLUNAS_SQL_RECORRENCIAS[c] for c in COLUNAS_RECORRENCIAS]
+        with self._lock:
+            df = pd.read_sql_query(f"SELECT {', '.join(sql)} FROM recorrencias ORDER BY rowid", self._conn)
+        return df.set_axis(COLUNAS_RECORRENCIAS, axis=1)
+
+    def gravar_recorrencias(self, df):
+        sql = [COLUNAS_SQL_RECORRENCIAS[c] for c in COLUNAS_RECORRENCIAS]
+        registros = df[COLUNAS_RECORRENCIAS].astype(object).where(df[COLUNAS_RECORRENCIAS].notna(), None)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM recorrencias")
+            self._conn.executemany(
+                f"INSERT INTO recorrencias ({', '.join(sql)}) VALUES ({', '.join('?' * len(sql))})",
+                registros.itertuples(index=False, name=None),
+            )
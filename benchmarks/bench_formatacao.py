@@ -0,0 +1,53 @@
+# benchmarks/bench_formatacao.py (FORMATAÇÃO MONETÁRIA: ESCALAR x VETORIZADA)
+#
+# Uso: python benchmarks/bench_formatacao.py
+#
+# Formata 10 mil e 1 milhão de valores (positivos e negativos) com
+# `format_currency` chamado valor a valor e com `format_currency_vetorizado`
+# em uma única chamada, e confere que as duas saídas são idênticas.
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from formatacao import format_currency, format_currency_vetorizado
+
+QUANTIDADES = [10_000, 1_000_000]
+REPETICOES = 3
+
+def gerar_valores(quantidade, semente=42):
+    """Valores com centavos, magnitudes de R$ 0 a milhões e ~1/3 negativos."""
+    gerador = np.random.default_rng(semente)
+    magnitudes = 10.0 ** gerador.uniform(-2, 7, quantidade)
+    sinais = np.where(gerador.random(quantidade) < 0.33, -1.0, 1.0)
+    return np.round(magnitudes * sinais, 2)
+
+def cronometrar(funcao, *args):
+    melhor, resultado = float("inf"), None
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        resultado = funcao(*args)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, resultado
+
+def main():
+    print(f"{'valores':>10} | {'escalar (s)':>11} | {'vetorizado (s)':>14} | {'ganho':>6}")
+    print("-" * 52)
+    for quantidade in QUANTIDADES:
+        valores = gerar_valores(quantidade)
+        tempo_escalar, saida_escalar = cronometrar(lambda v: [format_currency(x) for x in v], valores)
+        tempo_vetorizado, saida_vetorizada = cronometrar(format_currency_vetorizado, valores)
+        if list(saida_vetorizada) != saida_escalar:
+            print("ERRO: as saídas escalar e vetorizada divergem.")
+            return 1
+        print(
+            f"{quantidade:>10} | {tempo_escalar:>11.3f} | {tempo_vetorizado:>14.3f} | "
+            f"{tempo_escalar / tempo_vetorizado:>5.1f}x"
+        )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
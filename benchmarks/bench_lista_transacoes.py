@@ -0,0 +1,78 @@
+# benchmarks/bench_lista_transacoes.py (CUSTO DE RENDERIZAÇÃO DA LISTA: PAGINADA x SEM PAGINAÇÃO)
+#
+# Uso: python benchmarks/bench_lista_transacoes.py
+#
+# Renderiza a lista de transações com o AppTest do Streamlit (sem navegador e
+# sem Google Sheets) para meses com quantidades crescentes de linhas. Com a
+# paginação o tempo e o número de widgets ficam estáveis; sem ela crescem
+# linearmente com o número de linhas.
+import os
+import sys
+
+from streamlit.logger import set_log_level
+from streamlit.testing.v1 import AppTest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUANTIDADES = [100, 1_000, 10_000, 100_000]
+LIMITE_SEM_PAGINACAO = 1_000 # Acima disso a versão sem paginação fica lenta demais para medir
+REPETICOES = 3
+
+def _script_lista(raiz, quantidade, paginar):
+    import sys
+    import time
+
+    sys.path.insert(0, raiz)
+    import pandas as pd
+    import streamlit as st
+
+    from lista_transacoes import TAMANHO_PAGINA, renderizar_lista
+
+    if 'id_edicao_ativa' not in st.session_state:
+        st.session_state['id_edicao_ativa'] = None
+
+    df_display = pd.DataFrame({
+        'ID Transacao': [f"TRX-{i:07d}" for i in range(quantidade)],
+        'Mês': 'Jan',
+        'Descricao': [f"Transação {i}" for i in range(quantidade)],
+        'Categoria': ['Receita' if i % 3 == 0 else 'Despesa' for i in range(quantidade)],
+        'Centavos': [(i % 5000) * 100 + 50 for i in range(quantidade)],
+        'Status': ['PAGO' if i % 2 else 'PENDENTE' for i in range(quantidade)],
+    })
+    inicio = time.perf_counter()
+    renderizar_lista(
+        df_display,
+        chave="pagina_bench",
+        ao_deletar=lambda id_transacao: None,
+        ao_atualizar=lambda id_transacao, dados: None,
+        meses=['Jan'],
+        anos=[2025],
+        ano_padrao=2025,
+        status_default='PAGO',
+        tamanho_pagina=TAMANHO_PAGINA if paginar else max(1, quantidade),
+    )
+    st.session_state['_tempo_renderizacao'] = time.perf_counter() - inicio
+
+def medir(quantidade, paginar):
+    """Menor tempo de `renderizar_lista` entre as repetições e o número de botões criados."""
+    melhor, botoes = float("inf"), 0
+    for _ in range(REPETICOES):
+        app = AppTest.from_function(_script_lista, args=(RAIZ, quantidade, paginar), default_timeout=600)
+        app.run()
+        melhor = min(melhor, app.session_state['_tempo_renderizacao'])
+        botoes = len(app.button)
+    return melhor, botoes
+
+def main():
+    set_log_level("error") # Silencia o aviso de "missing ScriptRunContext" do modo bare
+    print(f"{'linhas':>8} | {'modo':<14} | {'tempo (s)':>9} | {'botões':>7}")
+    print("-" * 48)
+    for quantidade in QUANTIDADES:
+        modos = [True] + ([False] if quantidade <= LIMITE_SEM_PAGINACAO else [])
+        for paginar in modos:
+            tempo, botoes = medir(quantidade, paginar)
+            modo = "paginada" if paginar else "sem paginação"
+            print(f"{quantidade:>8} | {modo:<14} | {tempo:>9.3f} | {botoes:>7}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,546 @@
+# benchmarks/executar.py (SUÍTE DE BENCHMARKS OFFLINE COM RESULTADOS EM JSON)
+#
+# Uso:
+#   python benchmarks/executar.py                          # 10 mil e 100 mil linhas
+#   python benchmarks/executar.py --tamanhos 10000 1000000 5000000 --latencia 0.05
+#   python benchmarks/executar.py --comparar benchmarks/resultados/anterior.json
+#
+# Tudo roda em memória: o livro-caixa vem de `gerador.py` e o Google Sheets é
+# substituído por `planilha_falsa.py` (latência configurável). O resultado é
+# gravado em JSON (um arquivo por execução, com o commit atual) para comparar
+# regressões entre commits.
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from armazenamento_sqlite import ArmazenamentoSQLite
+from busca import IndiceBusca
+from cache_transacoes import CacheTransacoes
+from concorrencia import RevisaoAba
+from cliente_resiliente import ConexaoEmSegundoPlano, ControleCota, envolver_resiliente
+from dados import (
+    ABA_TRANSACOES, COLUNAS_SIMPLIFICADAS, MESES_PT, atualizar_preparadas, ordenar_para_exibicao,
+    preparar_transacoes,
+)
+from espelho_local import EspelhoLocal
+from exportacao import exportar
+from fila_mutacoes import FilaMutacoes
+from gerador import gerar_transacoes, linhas_planilha
+from importacao import ler_csv_em_blocos, importar, sugerir_mapeamento
+from indice_linhas import IndiceLinhas
+from kpis import calcular_tabela_kpis
+from planilha_falsa import APIErrorFalso, PlanilhaFalsa
+from recorrencias import gerar_recorrencias, indice_mes, materializar
+from tendencias import calcular_tendencias
+
+PASTA_RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados")
+MES_FILTRO = 'Jun'
+LIMITE_REGRESSAO = 1.20 # Mais de 20% mais lento que a referência é sinalizado
+
+# =================================================================
+# === INFRAESTRUTURA ===
+# =================================================================
+
+def cronometrar(funcao, repeticoes, preparar=None):
+    """Executa `funcao(contexto)` `repeticoes` vezes; `preparar()` (fora do tempo) gera o contexto."""
+    tempos, contexto = [], None
+    for _ in range(repeticoes):
+        contexto = preparar() if preparar else None
+        inicio = time.perf_counter()
+        funcao(contexto)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), sum(tempos) / len(tempos), contexto
+
+def preparar_legado(df_origem):
+    """
+    Carga anterior ao esquema compacto, mantida como referência: DataFrame
+    montado de uma lista de dicts, colunas de texto como objetos Python,
+    Valor float e Mes_Num float.
+    """
+    df = pd.DataFrame(df_origem.to_dict('records')).astype(object)
+    df['Valor'] = pd.to_numeric(df['Valor'], errors='coerce')
+    df = df.dropna(subset=['Mês', 'Valor']).copy()
+    df['Mes_Num'] = df['Mês'].map({v: k for k, v in MESES_PT.items()})
+    return df
+
+def memoria_mb(df):
+    return round(df.memory_usage(deep=True).sum() / 2**20, 2)
+
+def commit_atual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# =================================================================
+# === CENÁRIOS ===
+# =================================================================
+
+def registrador(resultados, quantidade):
+    """Função que acrescenta um resultado a `resultados` (e o imprime)."""
+    def registrar(cenario, melhor, media, chamadas_api=None, memoria=None):
+        resultados.append({
+            "cenario": cenario, "linhas": quantidade,
+            "segundos": round(melhor, 6), "media_segundos": round(media, 6),
+            "chamadas_api": chamadas_api, "memoria_mb": memoria,
+        })
+        extra = f" | {chamadas_api} chamada(s) de API" if chamadas_api is not None else ""
+        extra += f" | {memoria} MB" if memoria is not None else ""
+        print(f"  {cenario:<28} {melhor:>9.4f}s (média {media:.4f}s){extra}")
+    return registrar
+
+# Módulos que controle.py importa na partida (o Streamlit já está carregado no servidor)
+MODULOS_APP = [
+    'pandas', 'dados', 'armazenamento_sheets', 'armazenamento_sqlite', 'formatacao', 'cache_transacoes', 'kpis',
+    'lista_transacoes', 'importacao', 'recorrencias', 'exportacao', 'tendencias', 'busca', 'instrumentacao',
+    'cliente_resiliente',
+]
+# Referência: antes, o altair (via tendencias) e o google.oauth2 também eram importados na partida
+MODULOS_APP_LEGADO = MODULOS_APP + ['altair', 'google.oauth2.service_account']
+
+def tempo_importacao(modulos):
+    """Segundos para importar `modulos` num interpretador novo (sem contar a partida do Python e do Streamlit)."""
+    codigo = (
+        f"import sys, time; sys.path.insert(0, {RAIZ!r}); import streamlit; "
+        f"inicio = time.perf_counter(); import {', '.join(modulos)}; print(time.perf_counter() - inicio)"
+    )
+    saida = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True, text=True, check=True)
+    return float(saida.stdout.strip().splitlines()[-1])
+
+def cenarios_partida(repeticoes):
+    """Cenários que não dependem do tamanho do livro-caixa: importações na partida a frio do app."""
+    resultados = []
+    registrar = registrador(resultados, 0)
+    for cenario, modulos in (("importacao_app_fria", MODULOS_APP), ("importacao_app_fria_legado", MODULOS_APP_LEGADO)):
+        tempos = [tempo_importacao(modulos) for _ in range(repeticoes)]
+        registrar(cenario, min(tempos), sum(tempos) / len(tempos))
+    return resultados
+
+def cenarios_para(quantidade, latencia, repeticoes):
+    """Roda todos os cenários para um tamanho de livro-caixa e devolve a lista de resultados."""
+    resultados = []
+    registrar = registrador(resultados, quantidade)
+
+    df_origem = gerar_transacoes(quantidade)
+    linhas = linhas_planilha(df_origem)
+
+    def nova_planilha():
+        planilha = PlanilhaFalsa(latencia_segundos=latencia)
+        planilha.adicionar_aba(ABA_TRANSACOES, linhas)
+        return planilha
+
+    # --- partida: até os dados do ano poderem ser desenhados (com cópia local da sessão anterior) ---
+    def _preparar_partida():
+        planilha = nova_planilha()
+        espelho = EspelhoLocal(":memory:")
+        espelho.sincronizar(planilha._abas[ABA_TRANSACOES], forcar=True)
+        planilha.chamadas.clear()
+        return planilha, espelho
+
+    def _partida_bloqueante(contexto):
+        # Referência: abre a planilha (open_by_key), lista as abas e sincroniza antes de desenhar
+        planilha, espelho = contexto
+        time.sleep(latencia)
+        planilha.worksheets()
+        espelho.sincronizar(planilha._abas[ABA_TRANSACOES])
+        preparar_transacoes(espelho.carregar())
+
+    def _partida_copia_local(contexto):
+        # A conexão sobe numa thread; a primeira tela sai da cópia local
+        planilha, espelho = contexto
+        ConexaoEmSegundoPlano(lambda: (time.sleep(latencia), planilha.worksheets(), planilha)[-1]).iniciar()
+        preparar_transacoes(espelho.carregar())
+
+    melhor, media, (planilha, _) = cronometrar(_partida_bloqueante, repeticoes, _preparar_partida)
+    registrar("partida_bloqueante", melhor, media, planilha.total_chamadas() + 1) # + open_by_key
+    melhor, media, _ = cronometrar(_partida_copia_local, repeticoes, _preparar_partida)
+    registrar("partida_copia_local", melhor, media, 0)
+
+    # --- carregar_dados: parse e limpeza ---
+    def _carga_completa(planilha):
+        espelho = EspelhoLocal(":memory:")
+        espelho.sincronizar(planilha._abas[ABA_TRANSACOES], forcar=True)
+        preparar_transacoes(espelho.carregar())
+
+    melhor, media, planilha = cronometrar(_carga_completa, repeticoes, nova_planilha)
+    registrar("carga_completa", melhor, media, planilha.total_chamadas())
+
+    def _alterar_planilha(planilha):
+        # Alterações feitas "por outro usuário": 10 linhas novas e 5 removidas
+        aba = planilha._abas[ABA_TRANSACOES]
+        novas = linhas_planilha(gerar_transacoes(10, semente=7).assign(
+            **{'ID Transacao': [f"TRX-NOVA-{i}" for i in range(10)]}
+        ))[1:]
+        aba.linhas.extend(novas)
+        for posicao in range(5):
+            del aba.linhas[1 + posicao * max(1, quantidade // 6)]
+
+    def _preparar_incremental():
+        planilha = nova_planilha()
+        espelho = EspelhoLocal(":memory:")
+        espelho.sincronizar(planilha._abas[ABA_TRANSACOES], forcar=True)
+        _alterar_planilha(planilha)
+        planilha.chamadas.clear()
+        return planilha, espelho
+
+    def _carga_incremental(contexto):
+        planilha, espelho = contexto
+        espelho.sincronizar(planilha._abas[ABA_TRANSACOES])
+        preparar_transacoes(espelho.carregar())
+
+    melhor, media, (planilha, _) = cronometrar(_carga_incremental, repeticoes, _preparar_incremental)
+    registrar("carga_incremental", melhor, media, planilha.total_chamadas())
+
+    # --- mesma carga reaproveitando o DataFrame já limpo (revisão do espelho como impressão digital) ---
+    def _preparar_reaproveitamento(alterar):
+        planilha = nova_planilha()
+        espelho = EspelhoLocal(":memory:")
+        espelho.sincronizar(planilha._abas[ABA_TRANSACOES], forcar=True)
+        anterior, revisao = preparar_transacoes(espelho.carregar()), espelho.revisao
+        if alterar:
+            _alterar_planilha(planilha)
+        planilha.chamadas.clear()
+        return planilha, espelho, anterior, revisao
+
+    def _carga_reaproveitada(contexto):
+        planilha, espelho, anterior, revisao = contexto
+        espelho.sincronizar(planilha._abas[ABA_TRANSACOES])
+        alterados = espelho.alteracoes_desde(revisao)
+        if alterados:
+            linhas_por_id = espelho.ids_por_linha()
+            atualizar_preparadas(anterior, espelho.carregar_ids(alterados, linhas_por_id), alterados, linhas_por_id)
+
+    melhor, media, (planilha, *_) = cronometrar(
+        _carga_reaproveitada, repeticoes, lambda: _preparar_reaproveitamento(False),
+    )
+    registrar("carga_sem_alteracao", melhor, media, planilha.total_chamadas())
+    melhor, media, (planilha, *_) = cronometrar(
+        _carga_reaproveitada, repeticoes, lambda: _preparar_reaproveitamento(True),
+    )
+    registrar("carga_linhas_alteradas", melhor, media, planilha.total_chamadas())
+
+    # --- carga completa com 429 e 503 injetados: cliente resiliente repete com backoff ---
+    def _preparar_falhas():
+        planilha = nova_planilha()
+        planilha.falhas = [APIErrorFalso(429), APIErrorFalso(503)]
+        return planilha
+
+    def _carga_com_falhas(planilha):
+        # Backoff curto para o benchmark medir o custo das tentativas, não a espera
+        aba = envolver_resiliente(planilha._abas[ABA_TRANSACOES], ControleCota(espera_base=0.01))
+        espelho = EspelhoLocal(":memory:")
+        espelho.sincronizar(aba, forcar=True)
+        preparar_transacoes(espelho.carregar())
+
+    melhor, media, planilha = cronometrar(_carga_com_falhas, repeticoes, _preparar_falhas)
+    registrar("carga_com_429_503", melhor, media, planilha.total_chamadas())
+
+    meses = list(MESES_PT.values())
+
+    # --- esquema do DataFrame: lista de dicts/objetos (legado) x compacto (categóricas, centavos) ---
+    melhor, media, _ = cronometrar(lambda _: preparar_legado(df_origem), repeticoes)
+    df_legado = preparar_legado(df_origem)
+    registrar("preparo_legado", melhor, media, memoria=memoria_mb(df_legado))
+
+    texto_planilha = df_origem.astype(str) # Como chega do espelho: tudo texto
+    melhor, media, _ = cronometrar(lambda _: preparar_transacoes(texto_planilha), repeticoes)
+    df = preparar_transacoes(df_origem.copy())
+    registrar("preparo_compacto", melhor, media, memoria=memoria_mb(df))
+
+    # --- filtro por mês e KPIs ---
+    melhor, media, _ = cronometrar(lambda _: calcular_tabela_kpis(df, meses), repeticoes)
+    registrar("kpis_tabela_12_meses", melhor, media)
+
+    melhor, media, _ = cronometrar(lambda _: calcular_tendencias(calcular_tabela_kpis(df, meses)), repeticoes)
+    registrar("tendencias_ano", melhor, media)
+
+    # --- busca: índice invertido construído uma vez; consultas por prefixo com facetas ---
+    melhor, media, _ = cronometrar(lambda _: IndiceBusca(df), repeticoes)
+    registrar("busca_construir_indice", melhor, media)
+    indice = IndiceBusca(df)
+    consultas = [
+        {'texto': "merc"},
+        {'texto': "agua", 'categorias': ['Despesa'], 'status': ['PENDENTE']},
+        {'texto': "alug", 'meses': [MES_FILTRO], 'centavos_min': 10_000, 'centavos_max': 500_000},
+    ]
+    melhor, media, _ = cronometrar(lambda _: [indice.buscar(**c) for c in consultas], repeticoes * 20)
+    registrar("busca_consulta_x3", melhor, media)
+
+    tabela = calcular_tabela_kpis(df, meses)
+
+    def _filtro_mes(_):
+        df_mes = df[df['Mês'] == MES_FILTRO]
+        tabela.loc[MES_FILTRO]
+        return df_mes
+
+    melhor, media, _ = cronometrar(_filtro_mes, repeticoes)
+    registrar("filtro_mes_consulta_kpi", melhor, media)
+
+    melhor, media, _ = cronometrar(lambda _: df_legado[df_legado['Mês'] == MES_FILTRO], repeticoes)
+    registrar("filtro_mes_legado", melhor, media)
+
+    def _kpis_seis_mascaras(_):
+        # Cálculo original do dashboard (sobre o DataFrame legado), mantido como referência de comparação
+        df = df_legado
+        df_mes = df[df['Mês'] == MES_FILTRO].copy()
+        receita_bruta = df_mes[df_mes['Categoria'] == 'Receita']['Valor'].sum()
+        despesa_bruta = df_mes[df_mes['Categoria'] == 'Despesa']['Valor'].sum()
+        receita_paga = df_mes[(df_mes['Categoria'] == 'Receita') & (df_mes['Status'] == 'PAGO')]['Valor'].sum()
+        despesa_paga = df_mes[(df_mes['Categoria'] == 'Despesa') & (df_mes['Status'] == 'PAGO')]['Valor'].sum()
+        return receita_paga - despesa_paga, despesa_bruta - despesa_paga, receita_bruta
+
+    melhor, media, _ = cronometrar(_kpis_seis_mascaras, repeticoes)
+    registrar("kpis_seis_mascaras_legado", melhor, media)
+
+    # --- backend SQLite: lista e KPIs do mês por SQL, sem carregar o ano no pandas ---
+    sqlite = ArmazenamentoSQLite(":memory:")
+    sqlite.inserir_lote(df_origem)
+
+    def _consulta_mes_sqlite(_):
+        df_mes = sqlite.consultar_mes(df_origem['Ano'].iloc[0], MES_FILTRO)
+        sqlite.kpis_mes(df_origem['Ano'].iloc[0], MES_FILTRO)
+        return df_mes
+
+    melhor, media, _ = cronometrar(_consulta_mes_sqlite, repeticoes)
+    registrar("consulta_mes_sqlite", melhor, media)
+
+    # --- importação em lote: CSV lido em blocos, deduplicado e gravado com um único lote ---
+    csv_importacao = df_origem.drop(columns='ID Transacao').to_csv(index=False, sep=';', decimal=',').encode()
+    mapeamento = sugerir_mapeamento([c for c in COLUNAS_SIMPLIFICADAS if c != 'ID Transacao'])
+
+    def _importacao_csv(destino):
+        importar(ler_csv_em_blocos(io.BytesIO(csv_importacao), ';'), mapeamento, destino, df_origem['Ano'].iloc[0])
+
+    melhor, media, _ = cronometrar(_importacao_csv, repeticoes, lambda: ArmazenamentoSQLite(":memory:"))
+    registrar("importacao_csv", melhor, media)
+
+    # --- recorrências: 100 modelos x 12 meses gerados e gravados com um único lote (x um inserir por linha) ---
+    ano_recorrencias = int(df_origem['Ano'].iloc[0])
+    modelos = pd.DataFrame({
+        'ID Modelo': [f"bench{i:03d}" for i in range(100)],
+        'Descricao': [f"Conta fixa {i}" for i in range(100)],
+        'Categoria': ['Despesa', 'Receita'] * 50,
+        'Valor': [100.0 + i for i in range(100)],
+        'Status': 'PENDENTE',
+        'Frequencia': 'Mensal',
+        'Inicio': f"{ano_recorrencias}-01",
+        'Fim': "",
+    })
+    periodo = (indice_mes(ano_recorrencias, 1), indice_mes(ano_recorrencias, 12))
+
+    melhor, media, _ = cronometrar(
+        lambda destino: gerar_recorrencias(modelos, destino, *periodo), repeticoes,
+        lambda: ArmazenamentoSQLite(":memory:"),
+    )
+    registrar("recorrencias_lote", melhor, media)
+
+    def _recorrencias_por_linha(destino):
+        for dados in materializar(modelos, *periodo).to_dict('records'):
+            destino.inserir(dados)
+
+    melhor, media, _ = cronometrar(_recorrencias_por_linha, repeticoes, lambda: ArmazenamentoSQLite(":memory:"))
+    registrar("recorrencias_por_linha", melhor, media)
+
+    # --- exportação do ano já carregado (Parquet com zstd e CSV) ---
+    for formato in ('parquet', 'csv'):
+        melhor, media, _ = cronometrar(lambda _, formato=formato: exportar(df, formato), repeticoes)
+        registrar(f"exportacao_{formato}", melhor, media)
+
+    # --- ordenação da tabela detalhada ---
+    df_mes = df[df['Mês'] == MES_FILTRO]
+    melhor, media, _ = cronometrar(lambda _: ordenar_para_exibicao(df_mes), repeticoes)
+    registrar("ordenacao_detalhe", melhor, media)
+
+    # --- inserir/atualizar/excluir: fila -> batch_update -> cache corrigido ---
+    pasta_fila = tempfile.mkdtemp(prefix="bench_fila_")
+
+    def _preparar_mutacoes():
+        planilha = nova_planilha()
+        cache = CacheTransacoes(lambda: df, preparar_transacoes, COLUNAS_SIMPLIFICADAS, meses, ttl_segundos=3600)
+        cache.obter()
+        indice = IndiceLinhas()
+        fila = FilaMutacoes(COLUNAS_SIMPLIFICADAS, caminho=os.path.join(pasta_fila, "fila.jsonl"))
+        planilha.chamadas.clear()
+        return planilha, cache, indice, fila
+
+    def _mutacoes(contexto):
+        planilha, cache, indice, fila = contexto
+        alvo = df_origem.iloc[quantidade // 2].to_dict()
+        nova = dict(alvo, **{'ID Transacao': "TRX-BENCH-NOVA", 'Valor': 123.45})
+        fila.inserir(nova)
+        fila.atualizar(alvo['ID Transacao'], dict(alvo, Valor=999.99, Status='PENDENTE'))
+        fila.deletar(df_origem.iloc[quantidade // 3]['ID Transacao'])
+        resumo = fila.descarregar(planilha._abas[ABA_TRANSACOES], indice)
+        cache.aplicar_mutacoes(resumo["aplicadas"])
+
+    melhor, media, (planilha, _, _, _) = cronometrar(_mutacoes, repeticoes, _preparar_mutacoes)
+    registrar("mutacoes_ida_e_volta", melhor, media, planilha.total_chamadas())
+
+    # Mesmo lote com a revisão otimista da aba (já conhecida, como depois da primeira descarga)
+    def _preparar_versionado():
+        planilha, cache, indice, fila = _preparar_mutacoes()
+        revisao = RevisaoAba()
+        revisao.ler(planilha._abas[ABA_TRANSACOES])
+        planilha.chamadas.clear()
+        return planilha, cache, indice, fila, revisao
+
+    def _mutacoes_versionadas(contexto):
+        planilha, cache, indice, fila, revisao = contexto
+        alvo = df_origem.iloc[quantidade // 2].to_dict()
+        fila.inserir(dict(alvo, **{'ID Transacao': "TRX-BENCH-NOVA", 'Valor': 123.45}))
+        fila.atualizar(alvo['ID Transacao'], dict(alvo, Valor=999.99, Status='PENDENTE'))
+        fila.deletar(df_origem.iloc[quantidade // 3]['ID Transacao'])
+        resumo = fila.descarregar(planilha._abas[ABA_TRANSACOES], indice, revisao)
+        cache.aplicar_mutacoes(resumo["aplicadas"])
+
+    melhor, media, (planilha, _, _, _, _) = cronometrar(_mutacoes_versionadas, repeticoes, _preparar_versionado)
+    registrar("mutacoes_versionadas", melhor, media, planilha.total_chamadas())
+
+    # --- dois processos descarregando a mesma aba ao mesmo tempo (cada um com fila, índice e revisão) ---
+    ids = df_origem['ID Transacao'].tolist()
+
+    def _preparar_concorrentes():
+        # Latência mínima para as duas leituras da coluna de IDs se sobreporem
+        planilha = PlanilhaFalsa(latencia_segundos=max(latencia, 0.01))
+        planilha.adicionar_aba(ABA_TRANSACOES, linhas)
+        escritores = []
+        for nome in ("a", "b"):
+            revisao = RevisaoAba()
+            revisao.ler(planilha._abas[ABA_TRANSACOES])
+            caminho = os.path.join(pasta_fila, f"concorrente_{nome}.jsonl")
+            if os.path.exists(caminho):
+                os.remove(caminho)
+            escritores.append((FilaMutacoes(COLUNAS_SIMPLIFICADAS, caminho=caminho), IndiceLinhas(), revisao))
+        # Cada escritor exclui uma linha acima da que o outro atualiza: sem a revisão, o segundo lote erraria a linha
+        escritores[0][0].deletar(ids[quantidade // 4])
+        escritores[0][0].atualizar(ids[quantidade // 2], dict(df_origem.iloc[quantidade // 2].to_dict(), Valor=111.11))
+        escritores[1][0].deletar(ids[quantidade // 5])
+        escritores[1][0].atualizar(ids[quantidade // 3], dict(df_origem.iloc[quantidade // 3].to_dict(), Valor=222.22))
+        planilha.chamadas.clear()
+        return planilha, escritores
+
+    def _escritas_concorrentes(contexto):
+        planilha, escritores = contexto
+        aba = planilha._abas[ABA_TRANSACOES]
+        largada = threading.Barrier(len(escritores))
+        threads = [
+            threading.Thread(target=lambda e=e: (largada.wait(), e[0].descarregar(aba, e[1], e[2])))
+            for e in escritores
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    melhor, media, (planilha, escritores) = cronometrar(_escritas_concorrentes, repeticoes, _preparar_concorrentes)
+    linhas_finais = {linha[0]: linha for linha in planilha._abas[ABA_TRANSACOES].linhas[1:]}
+    coluna_valor = COLUNAS_SIMPLIFICADAS.index('Valor')
+    if (
+        any(len(fila) for fila, _, _ in escritores)
+        or ids[quantidade // 4] in linhas_finais or ids[quantidade // 5] in linhas_finais
+        or float(linhas_finais[ids[quantidade // 2]][coluna_valor]) != 111.11
+        or float(linhas_finais[ids[quantidade // 3]][coluna_valor]) != 222.22
+        or len(linhas_finais) != quantidade - 2
+    ):
+        raise RuntimeError("escritas_concorrentes: a planilha não terminou no estado esperado.")
+    print(f"  {'':<28} lotes refeitos por conflito: {sum(fila.conflitos for fila, _, _ in escritores)}")
+    registrar("escritas_concorrentes", melhor, media, planilha.total_chamadas())
+
+    # --- leitura com o TTL vencido: carga bloqueante x versão anterior + recarga em segundo plano ---
+    def _preparar_cache_vencido():
+        cache = CacheTransacoes(
+            lambda: (time.sleep(latencia), preparar_transacoes(df_origem.copy()))[1],
+            preparar_transacoes, COLUNAS_SIMPLIFICADAS, meses, ttl_segundos=0,
+        )
+        cache.obter()
+        while cache.recarregando:
+            time.sleep(0.01)
+        return cache
+
+    def _leitura_bloqueante(cache):
+        cache.invalidar()
+        cache.obter()
+
+    melhor, media, _ = cronometrar(_leitura_bloqueante, repeticoes, _preparar_cache_vencido)
+    registrar("cache_vencido_bloqueante", melhor, media)
+    melhor, media, _ = cronometrar(lambda cache: cache.obter(), repeticoes, _preparar_cache_vencido)
+    registrar("cache_vencido_swr", melhor, media)
+
+    return resultados
+
+# =================================================================
+# === COMPARAÇÃO ===
+# =================================================================
+
+def comparar(resultados, caminho_referencia):
+    with open(caminho_referencia, encoding="utf-8") as arquivo:
+        referencia = json.load(arquivo)
+    anteriores = {(r["cenario"], r["linhas"]): r["segundos"] for r in referencia["resultados"]}
+    regressoes = 0
+    print(f"\nComparação com {caminho_referencia} (commit {referencia.get('commit')}):")
+    for resultado in resultados:
+        anterior = anteriores.get((resultado["cenario"], resultado["linhas"]))
+        if not anterior:
+            continue
+        razao = resultado["segundos"] / anterior
+        marca = "  ⚠️ regressão" if razao > LIMITE_REGRESSAO else ""
+        regressoes += bool(marca)
+        print(f"  {resultado['cenario']:<28} {resultado['linhas']:>9} linhas: {razao:>5.2f}x{marca}")
+    return regressoes
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks offline do Controle Financeiro.")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 100_000],
+                        help="Quantidades de transações sintéticas (ex.: 10000 1000000 5000000).")
+    parser.add_argument("--latencia", type=float, default=0.0,
+                        help="Latência simulada por chamada à planilha falsa, em segundos.")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--saida", help="Arquivo JSON de saída (padrão: benchmarks/resultados/<data>-<commit>.json).")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar.")
+    args = parser.parse_args()
+
+    print("\n== partida do app ==")
+    resultados = cenarios_partida(args.repeticoes)
+    for quantidade in args.tamanhos:
+        print(f"\n== {quantidade} transações ==")
+        resultados.extend(cenarios_para(quantidade, args.latencia, args.repeticoes))
+
+    commit = commit_atual()
+    relatorio = {
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "latencia_segundos": args.latencia,
+        "repeticoes": args.repeticoes,
+        "resultados": resultados,
+    }
+    saida = args.saida or os.path.join(
+        PASTA_RESULTADOS, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{commit or 'sem-commit'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as arquivo:
+        json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+    print(f"\nResultados gravados em {saida}")
+
+    if args.comparar:
+        return 1 if comparar(resultados, args.comparar) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
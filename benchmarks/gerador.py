@@ -0,0 +1,61 @@
+# benchmarks/gerador.py (GERADOR DE LIVRO-CAIXA SINTÉTICO NO FORMATO DA ABA TRANSACOES)
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dados import COLUNAS_SIMPLIFICADAS, MESES_PT
+
+DESCRICOES_RECEITA = ["Salário", "Freelance", "Reembolso", "Venda", "Rendimento", "Aluguel recebido"]
+DESCRICOES_DESPESA = [
+    "Aluguel", "Mercado", "Energia", "Água", "Internet", "Farmácia", "Combustível",
+    "Restaurante", "Assinatura", "Condomínio", "Escola", "Plano de saúde", "Manutenção",
+]
+
+def gerar_transacoes(quantidade, semente=42, ano=2025):
+    """
+    DataFrame com `quantidade` transações sintéticas nas colunas de COLUNAS_SIMPLIFICADAS.
+
+    Mistura realista: ~25% receitas (valores maiores), ~75% despesas, das
+    quais ~30% PENDENTE; meses com leve concentração no fim do ano; valores
+    log-normais com centavos. Todas as linhas pertencem à partição `ano`.
+    """
+    gerador = np.random.default_rng(semente)
+    meses = np.array(list(MESES_PT.values()))
+    pesos_meses = np.linspace(1.0, 1.4, 12)
+    mes = meses[gerador.choice(12, size=quantidade, p=pesos_meses / pesos_meses.sum())]
+
+    receita = gerador.random(quantidade) < 0.25
+    categoria = np.where(receita, "Receita", "Despesa")
+    pendente = ~receita & (gerador.random(quantidade) < 0.30)
+    status = np.where(pendente, "PENDENTE", "PAGO")
+
+    valor = np.where(
+        receita,
+        gerador.lognormal(mean=8.0, sigma=0.6, size=quantidade),
+        gerador.lognormal(mean=5.0, sigma=1.0, size=quantidade),
+    ).round(2)
+
+    descricao = np.where(
+        receita,
+        np.array(DESCRICOES_RECEITA)[gerador.integers(len(DESCRICOES_RECEITA), size=quantidade)],
+        np.array(DESCRICOES_DESPESA)[gerador.integers(len(DESCRICOES_DESPESA), size=quantidade)],
+    )
+    ids = pd.Series(np.arange(quantidade)).map("TRX-BENCH-{:08d}".format)
+
+    return pd.DataFrame({
+        'ID Transacao': ids.to_numpy(),
+        'Mês': mes,
+        'Descricao': descricao,
+        'Categoria': categoria,
+        'Valor': valor,
+        'Status': status,
+        'Ano': ano,
+    }, columns=COLUNAS_SIMPLIFICADAS)
+
+def linhas_planilha(df):
+    """Converte o DataFrame em linhas no formato de `get_all_values` (cabeçalho + valores)."""
+    return [list(df.columns)] + df.to_numpy(dtype=object).tolist()
@@ -0,0 +1,253 @@
+# benchmarks/planilha_falsa.py (FAKE EM MEMÓRIA DO Spreadsheet/Worksheet DO GSPREAD, COM LATÊNCIA CONFIGURÁVEL)
+#
+# Implementa apenas a parte da API do gspread usada pelo app (leituras,
+# append, update, delete_rows, find, list_named_ranges e
+# spreadsheet.batch_update com updateCells/deleteDimension/appendCells e
+# add/deleteNamedRange; o lote é atômico como no Sheets). Cada chamada "de rede" dorme
+# `latencia_segundos` e é contada em `chamadas`, para medir custo de API
+# sem acesso à internet.
+import re
+import threading
+import time
+from collections import Counter
+
+_A1 = re.compile(r"^(?:.*!)?\$?([A-Z]+)\$?(\d+)?(?::\$?([A-Z]+)\$?(\d+)?)?$")
+
+def _numero_coluna(letras):
+    numero = 0
+    for letra in letras:
+        numero = numero * 26 + (ord(letra) - 64)
+    return numero
+
+def _intervalo(a1, total_linhas):
+    """Converte 'A2:F10' (ou 'A2', 'A:A') em (linha_ini, linha_fim, col_ini, col_fim), 1-based e inclusivo."""
+    encontrado = _A1.match(a1.replace("'", ""))
+    if not encontrado:
+        raise ValueError(f"Intervalo A1 não suportado pela planilha falsa: {a1}")
+    col_ini, lin_ini, col_fim, lin_fim = encontrado.groups()
+    col_fim = col_fim or col_ini
+    lin_ini = int(lin_ini) if lin_ini else 1
+    lin_fim = int(lin_fim) if lin_fim else (lin_ini if encontrado.group(3) is None else total_linhas)
+    return lin_ini, lin_fim, _numero_coluna(col_ini), _numero_coluna(col_fim)
+
+def _valor_da_celula(celula):
+    valor = celula.get("userEnteredValue", {})
+    return next(iter(valor.values()), "")
+
+class CelulaFalsa:
+    def __init__(self, row, col, value):
+        self.row, self.col, self.value = row, col, value
+
+class APIErrorFalso(Exception):
+    """Erro injetado (ex.: 429/500), com `response.status_code` como no gspread."""
+
+    def __init__(self, status_code, mensagem=""):
+        super().__init__(mensagem or f"HTTP {status_code}")
+        self.response = type("RespostaFalsa", (), {"status_code": status_code})()
+        self.code = status_code
+
+class AbaFalsa:
+    """Worksheet em memória: `linhas[0]` é o cabeçalho."""
+
+    def __init__(self, planilha, titulo, linhas, id_aba):
+        self.spreadsheet = planilha
+        self.title = titulo
+        self.id = id_aba
+        self.linhas = [list(linha) for linha in linhas]
+
+    def _chamada(self, nome):
+        self.spreadsheet._registrar(nome)
+
+    # --- Leitura ---
+
+    def get_all_values(self, **kwargs):
+        self._chamada("get_all_values")
+        return [list(linha) for linha in self.linhas]
+
+    def get_all_records(self, head=1, **kwargs):
+        self._chamada("get_all_records")
+        cabecalho = self.linhas[head - 1] if self.linhas else []
+        return [
+            dict(zip(cabecalho, linha + [""] * (len(cabecalho) - len(linha))))
+            for linha in self.linhas[head:]
+        ]
+
+    def col_values(self, col, **kwargs):
+        self._chamada("col_values")
+        valores = [linha[col - 1] if len(linha) >= col else "" for linha in self.linhas]
+        while valores and valores[-1] in ("", None):
+            valores.pop()
+        return valores
+
+    def row_values(self, row, **kwargs):
+        self._chamada("row_values")
+        return list(self.linhas[row - 1]) if row <= len(self.linhas) else []
+
+    def _recortar(self, a1):
+        lin_ini, lin_fim, col_ini, col_fim = _intervalo(a1, len(self.linhas))
+        return [list(linha[col_ini - 1:col_fim]) for linha in self.linhas[lin_ini - 1:lin_fim]]
+
+    def get(self, range_name=None, **kwargs):
+        self._chamada("get")
+        if range_name is None:
+            return [list(linha) for linha in self.linhas]
+        return self._recortar(range_name)
+
+    def batch_get(self, ranges, **kwargs):
+        self._chamada("batch_get")
+        return [self._recortar(a1) for a1 in ranges]
+
+    def cell(self, row, col, **kwargs):
+        self._chamada("cell")
+        linha = self.linhas[row - 1] if row <= len(self.linhas) else []
+        return CelulaFalsa(row, col, linha[col - 1] if len(linha) >= col else None)
+
+    def acell(self, label, **kwargs):
+        lin_ini, _, col_ini, _ = _intervalo(label, len(self.linhas))
+        return self.cell(lin_ini, col_ini)
+
+    def find(self, query, **kwargs):
+        self._chamada("find")
+        for numero, linha in enumerate(self.linhas, start=1):
+            for coluna, valor in enumerate(linha, start=1):
+                if str(valor) == str(query):
+                    return CelulaFalsa(numero, coluna, valor)
+        return None
+
+    # --- Escrita ---
+
+    def append_row(self, values, **kwargs):
+        self._chamada("append_row")
+        self.linhas.append(list(values))
+        numero = len(self.linhas)
+        return {"updates": {"updatedRange": f"{self.title}!A{numero}:{chr(64 + len(values))}{numero}"}}
+
+    def append_rows(self, values, **kwargs):
+        self._chamada("append_rows")
+        primeira = len(self.linhas) + 1
+        self.linhas.extend(list(v) for v in values)
+        return {"updates": {"updatedRange": f"{self.title}!A{primeira}:A{len(self.linhas)}"}}
+
+    def update(self, range_name, values, **kwargs):
+        self._chamada("update")
+        lin_ini, _, col_ini, _ = _intervalo(range_name, len(self.linhas))
+        for deslocamento, valores in enumerate(values):
+            numero = lin_ini + deslocamento
+            while len(self.linhas) < numero:
+                self.linhas.append([])
+            linha = self.linhas[numero - 1]
+            linha.extend([""] * max(0, col_ini - 1 + len(valores) - len(linha)))
+            linha[col_ini - 1:col_ini - 1 + len(valores)] = list(valores)
+        return {}
+
+    def delete_rows(self, start_index, end_index=None):
+        self._chamada("delete_rows")
+        end_index = end_index or start_index
+        del self.linhas[start_index - 1:end_index]
+        return {}
+
+    def update_title(self, title):
+        self._chamada("update_title")
+        abas = self.spreadsheet._abas
+        abas[title] = abas.pop(self.title)
+        self.title = title
+        return {}
+
+class PlanilhaFalsa:
+    """Spreadsheet em memória com latência por chamada e injeção opcional de falhas."""
+
+    def __init__(self, latencia_segundos=0.0):
+        self.latencia_segundos = latencia_segundos
+        self.chamadas = Counter()
+        self.falhas = [] # Exceções a levantar nas próximas chamadas (FIFO)
+        self._abas = {}
+        self._intervalos_nomeados = {} # namedRangeId -> namedRange
+        self._lock = threading.Lock()
+        self._lock_lote = threading.Lock() # Um batch_update por vez: o lote é atômico
+
+    def _registrar(self, nome):
+        with self._lock:
+            self.chamadas[nome] += 1
+            falha = self.falhas.pop(0) if self.falhas else None
+        if self.latencia_segundos:
+            time.sleep(self.latencia_segundos)
+        if falha is not None:
+            raise falha
+
+    def total_chamadas(self):
+        return sum(self.chamadas.values())
+
+    def adicionar_aba(self, titulo, linhas):
+        aba = AbaFalsa(self, titulo, linhas, id_aba=len(self._abas))
+        self._abas[titulo] = aba
+        return aba
+
+    def add_worksheet(self, title, rows=0, cols=0, **kwargs):
+        self._registrar("add_worksheet")
+        return self.adicionar_aba(title, [])
+
+    def worksheet(self, title):
+        self._registrar("worksheet")
+        if title not in self._abas:
+            raise KeyError(f"Aba {title} não existe na planilha falsa.")
+        return self._abas[title]
+
+    def worksheets(self):
+        self._registrar("worksheets")
+        return list(self._abas.values())
+
+    def list_named_ranges(self):
+        self._registrar("list_named_ranges")
+        with self._lock_lote:
+            return [dict(intervalo) for intervalo in self._intervalos_nomeados.values()]
+
+    def _validar_lote(self, requisicoes):
+        """Como no Sheets, um lote com uma requisição inválida é recusado inteiro (400) antes de aplicar qualquer coisa."""
+        ids = set(self._intervalos_nomeados)
+        for requisicao in requisicoes:
+            if "addNamedRange" in requisicao:
+                id_intervalo = requisicao["addNamedRange"]["namedRange"]["namedRangeId"]
+                if id_intervalo in ids:
+                    raise APIErrorFalso(400, f"Intervalo nomeado {id_intervalo} já existe.")
+                ids.add(id_intervalo)
+            elif "deleteNamedRange" in requisicao:
+                id_intervalo = requisicao["deleteNamedRange"]["namedRangeId"]
+                if id_intervalo not in ids:
+                    raise APIErrorFalso(400, f"Intervalo nomeado {id_intervalo} não existe.")
+                ids.discard(id_intervalo)
+            elif not {"updateCells", "deleteDimension", "appendCells"} & set(requisicao):
+                raise ValueError(f"Requisição não suportada pela planilha falsa: {list(requisicao)}")
+
+    def batch_update(self, body):
+        """Valida o lote inteiro e aplica, em ordem, as requisições (updateCells, deleteDimension, appendCells, add/deleteNamedRange)."""
+        self._registrar("batch_update")
+        requisicoes = body.get("requests", [])
+        with self._lock_lote:
+            self._validar_lote(requisicoes)
+            abas_por_id = {aba.id: aba for aba in self._abas.values()}
+            for requisicao in requisicoes:
+                if "updateCells" in requisicao:
+                    dados = requisicao["updateCells"]
+                    aba = abas_por_id[dados["range"]["sheetId"]]
+                    inicio = dados["range"]["startRowIndex"]
+                    col_ini = dados["range"].get("startColumnIndex", 0)
+                    for deslocamento, linha in enumerate(dados["rows"]):
+                        valores = [_valor_da_celula(c) for c in linha["values"]]
+                        destino = aba.linhas[inicio + deslocamento]
+                        destino.extend([""] * max(0, col_ini + len(valores) - len(destino)))
+                        destino[col_ini:col_ini + len(valores)] = valores
+                elif "deleteDimension" in requisicao:
+                    intervalo = requisicao["deleteDimension"]["range"]
+                    aba = abas_por_id[intervalo["sheetId"]]
+                    del aba.linhas[intervalo["startIndex"]:intervalo["endIndex"]]
+                elif "appendCells" in requisicao:
+                    dados = requisicao["appendCells"]
+                    aba = abas_por_id[dados["sheetId"]]
+                    for linha in dados["rows"]:
+                        aba.linhas.append([_valor_da_celula(c) for c in linha["values"]])
+                elif "addNamedRange" in requisicao:
+                    intervalo = requisicao["addNamedRange"]["namedRange"]
+                    self._intervalos_nomeados[intervalo["namedRangeId"]] = dict(intervalo)
+                else:
+                    del self._intervalos_nomeados[requisicao["deleteNamedRange"]["namedRangeId"]]
+        return {"replies": []}
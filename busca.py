@@ -0,0 +1,241 @@
+# busca.py (ÍNDICE INVERTIDO EM MEMÓRIA SOBRE A DESCRIÇÃO, SEM ACENTOS E POR PREFIXO, COM FACETAS)
+import bisect
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+FACETAS = ['Categoria', 'Status', 'Mês']
+CAPACIDADE_INICIAL = 1024
+_PALAVRA = re.compile(r"\w+")
+
+# =================================================================
+# === NORMALIZAÇÃO ===
+# =================================================================
+
+def normalizar(texto):
+    """Minúsculas e sem acentos ('Conta de Água' -> 'conta de agua')."""
+    decomposto = unicodedata.normalize('NFKD', str(texto))
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).casefold()
+
+def termos(texto):
+    return _PALAVRA.findall(normalizar(texto)) if texto else []
+
+def _texto(valor):
+    return "" if valor is None or pd.isna(valor) else str(valor)
+
+# =================================================================
+# === ÍNDICE ===
+# =================================================================
+
+class IndiceBusca:
+    """
+    Busca nas transações de um ano por palavras da Descricao e facetas.
+
+    O índice invertido liga cada termo (sem acentos, minúsculo) às
+    descrições distintas que o contêm; as linhas ficam em arrays do numpy
+    (código da descrição, códigos de Categoria/Status/Mês, centavos e uma
+    marca de linha viva). Uma consulta acha os termos com o prefixo de cada
+    palavra por bisect no vocabulário ordenado e filtra as linhas com
+    máscaras vetorizadas, sem percorrer as transações em Python.
+
+    `adicionar` acrescenta (ou substitui) linhas e `remover` só apaga a marca
+    de viva; quando metade dos espaços está morta, os arrays são compactados.
+    Não é thread-safe: quem compartilha o índice (CacheTransacoes) usa o
+    próprio lock.
+    """
+
+    def __init__(self, df=None):
+        self._descricoes = {}     # descrição -> código
+        self._postagens = {}      # termo -> set de códigos de descrição
+        self._vocabulario = []    # termos ordenados (um prefixo é uma fatia contígua)
+        self._valores_faceta = {faceta: {} for faceta in FACETAS} # valor -> código
+        self._posicoes = {}       # ID -> posição nos arrays
+        self._tamanho = 0         # posições usadas (vivas ou não)
+        self._alocar(CAPACIDADE_INICIAL)
+        if df is not None and not df.empty:
+            self.adicionar(df)
+
+    def __len__(self):
+        return len(self._posicoes)
+
+    def _alocar(self, capacidade):
+        usados = self._tamanho
+        anteriores = getattr(self, "_colunas", None)
+        self._colunas = {
+            'id': np.empty(capacidade, dtype=object),
+            'descricao': np.zeros(capacidade, dtype=np.int32),
+            'centavos': np.zeros(capacidade, dtype=np.int64),
+            'viva': np.zeros(capacidade, dtype=bool),
+            **{faceta: np.zeros(capacidade, dtype=np.int32) for faceta in FACETAS},
+        }
+        if anteriores is not None:
+            for nome, coluna in anteriores.items():
+                self._colunas[nome][:usados] = coluna[:usados]
+
+    # --- Manutenção ---
+
+    def _codigo_descricao(self, descricao):
+        codigo = self._descricoes.get(descricao)
+        if codigo is None:
+            codigo = self._descricoes[descricao] = len(self._descricoes)
+            for termo in set(termos(descricao)):
+                if termo not in self._postagens:
+                    self._postagens[termo] = set()
+                    bisect.insort(self._vocabulario, termo)
+                self._postagens[termo].add(codigo)
+        return codigo
+
+    def _codigos(self, faceta, valores):
+        codigos = self._valores_faceta[faceta]
+        return [codigos.setdefault(v, len(codigos)) for v in valores]
+
+    def adicionar(self, df):
+        """Indexa as linhas de um DataFrame preparado (IDs já indexados são substituídos)."""
+        if df is None or df.empty:
+            return
+        ids = df['ID Transacao'].astype(str).tolist()
+        self.remover([i for i in ids if i in self._posicoes])
+
+        quantidade = len(ids)
+        if self._tamanho + quantidade > len(self._colunas['viva']):
+            self._alocar(max(2 * len(self._colunas['viva']), self._tamanho + quantidade))
+        inicio, fim = self._tamanho, self._tamanho + quantidade
+
+        # Descrições repetidas (a maioria num extrato) são normalizadas uma vez só
+        codigos, unicas = df['Descricao'].factorize(use_na_sentinel=False)
+        mapa = np.array([self._codigo_descricao(_texto(d)) for d in unicas], dtype=np.int32)
+        colunas = self._colunas
+        colunas['id'][inicio:fim] = ids
+        colunas['descricao'][inicio:fim] = mapa[codigos]
+        colunas['centavos'][inicio:fim] = df['Centavos'].to_numpy(dtype=np.int64)
+        colunas['viva'][inicio:fim] = True
+        for faceta in FACETAS:
+            codigos_faceta, valores = df[faceta].factorize(use_na_sentinel=False)
+            valores = [_texto(v) for v in valores]
+            colunas[faceta][inicio:fim] = np.array(self._codigos(faceta, valores), dtype=np.int32)[codigos_faceta]
+
+        self._posicoes.update(zip(ids, range(inicio, fim)))
+        self._tamanho = fim
+
+    def remover(self, ids):
+        for id_transacao in ids:
+            posicao = self._posicoes.pop(str(id_transacao), None)
+            if posicao is not None:
+                self._colunas['viva'][posicao] = False
+        mortas = self._tamanho - len(self._posicoes)
+        if mortas > CAPACIDADE_INICIAL and mortas * 2 > self._tamanho:
+            self._compactar()
+
+    def _compactar(self):
+        vivas = np.flatnonzero(self._colunas['viva'][:self._tamanho])
+        for nome, coluna in self._colunas.items():
+            coluna[:len(vivas)] = coluna[vivas]
+            if nome == 'viva':
+                coluna[len(vivas):self._tamanho] = False
+        self._tamanho = len(vivas)
+        self._posicoes = dict(zip(self._colunas['id'][:self._tamanho].tolist(), range(self._tamanho)))
+
+    # --- Consulta ---
+
+    def _descricoes_com_prefixo(self, prefixo):
+        inicio = bisect.bisect_left(self._vocabulario, prefixo)
+        fim = bisect.bisect_left(self._vocabulario, prefixo + "\U0010ffff")
+        return set().union(*(self._postagens[termo] for termo in self._vocabulario[inicio:fim]))
+
+    def _aceitas(self, coluna, codigos):
+        """Máscara das posições cujo código em `coluna` está em `codigos`."""
+        valores = self._colunas[coluna][:self._tamanho]
+        if len(codigos) > 8:
+            tabela = np.zeros(max(codigos) + 1, dtype=bool)
+            tabela[codigos] = True
+            return tabela[valores.clip(0, len(tabela) - 1)] & (valores < len(tabela))
+        # Poucos códigos: comparações diretas (np.isin tem custo fixo alto para listas curtas)
+        aceitas = np.zeros(self._tamanho, dtype=bool)
+        for codigo in codigos:
+            aceitas |= valores == codigo
+        return aceitas
+
+    def _posicoes_encontradas(self, texto="", categorias=(), status=(), meses=(), centavos_min=None, centavos_max=None):
+        mascara = self._colunas['viva'][:self._tamanho].copy()
+        palavras = list(dict.fromkeys(termos(texto)))
+        if palavras:
+            # Todas as palavras resolvidas no nível das descrições distintas; nas linhas, um filtro só
+            descricoes = set.intersection(*(self._descricoes_com_prefixo(p) for p in palavras))
+            mascara &= self._aceitas('descricao', sorted(descricoes))
+        for faceta, valores in zip(FACETAS, (categorias, status, meses)):
+            if valores:
+                codigos = self._valores_faceta[faceta]
+                mascara &= self._aceitas(faceta, [codigos[v] for v in valores if v in codigos])
+        if centavos_min is not None:
+            mascara &= self._colunas['centavos'][:self._tamanho] >= centavos_min
+        if centavos_max is not None:
+            mascara &= self._colunas['centavos'][:self._tamanho] <= centavos_max
+        return np.flatnonzero(mascara)
+
+    def buscar(self, texto="", categorias=(), status=(), meses=(), centavos_min=None, centavos_max=None):
+        """
+        IDs que casam com todas as palavras de `texto` (cada uma como prefixo
+        de algum termo da descrição) e com os filtros: em cada faceta, qualquer
+        um dos valores pedidos (vazio = sem filtro); valor entre `centavos_min`
+        e `centavos_max`.
+        """
+        posicoes = self._posicoes_encontradas(texto, categorias, status, meses, centavos_min, centavos_max)
+        return self._colunas['id'][posicoes].tolist()
+
+    def contar_facetas(self, texto="", categorias=(), status=(), meses=(), centavos_min=None, centavos_max=None):
+        """Para a mesma consulta de `buscar`: {faceta: {valor: quantidade}}, sem os valores zerados."""
+        posicoes = self._posicoes_encontradas(texto, categorias, status, meses, centavos_min, centavos_max)
+        contagens = {}
+        for faceta in FACETAS:
+            valores = list(self._valores_faceta[faceta])
+            quantidades = np.bincount(self._colunas[faceta][posicoes], minlength=len(valores))
+            contagens[faceta] = {v: int(q) for v, q in zip(valores, quantidades) if q}
+        return contagens
+
+# =================================================================
+# === INTERFACE ===
+# =================================================================
+
+def renderizar_busca(buscar, opcoes, chave="busca"):
+    """
+    Caixa de busca, faixa de valor e facetas (com a quantidade de resultados
+    de cada opção). `buscar(**filtros)` devolve (DataFrame, IDs, contagens)
+    como `CacheTransacoes.buscar`; `opcoes` é {faceta: valores possíveis}.
+    Devolve as transações encontradas (None se não há consulta nem filtro).
+    """
+    import streamlit as st
+
+    texto = st.text_input(
+        "Buscar na descrição", key=f"{chave}_texto",
+        placeholder="Palavras ou começos de palavras, com ou sem acento (ex.: agua, alug)",
+    )
+    col_min, col_max = st.columns(2)
+    valor_min = col_min.number_input("Valor mínimo (R$)", min_value=0.0, value=None, step=10.0, key=f"{chave}_min")
+    valor_max = col_max.number_input("Valor máximo (R$)", min_value=0.0, value=None, step=10.0, key=f"{chave}_max")
+
+    chaves_facetas = {faceta: f"{chave}_{faceta}" for faceta in FACETAS}
+    filtros = {
+        'texto': texto,
+        # Facetas lidas do estado (os widgets vêm depois, com as contagens desta busca)
+        'categorias': st.session_state.get(chaves_facetas['Categoria'], []),
+        'status': st.session_state.get(chaves_facetas['Status'], []),
+        'meses': st.session_state.get(chaves_facetas['Mês'], []),
+        'centavos_min': None if valor_min is None else round(valor_min * 100),
+        'centavos_max': None if valor_max is None else round(valor_max * 100),
+    }
+    df, ids, contagens = buscar(**filtros)
+
+    for coluna, faceta in zip(st.columns(len(FACETAS)), FACETAS):
+        coluna.multiselect(
+            faceta, options=list(opcoes[faceta]), key=chaves_facetas[faceta],
+            format_func=lambda valor, faceta=faceta: f"{valor} ({contagens[faceta].get(valor, 0)})",
+        )
+
+    if not texto and not any(filtros[f] for f in ('categorias', 'status', 'meses')) \
+            and valor_min is None and valor_max is None:
+        return None
+    encontradas = df[df['ID Transacao'].isin(ids)] if len(ids) else df.iloc[:0]
+    st.caption(f"{len(encontradas)} transação(ões) encontrada(s).")
+    return encontradas
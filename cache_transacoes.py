@@ -0,0 +1,272 @@
+# cache_transacoes.py (CACHE DO DATAFRAME DE TRANSAÇÕES COM APLICAÇÃO DE MUTAÇÕES E CONTADOR DE VERSÃO)
+import threading
+import time
+
+import pandas as pd
+
+from busca import IndiceBusca
+from dados import concatenar_transacoes
+from fila_mutacoes import OP_ATUALIZAR, OP_DELETAR, OP_INSERIR
+from kpis import ajustar_kpis, calcular_tabela_kpis
+
+OCIOSIDADE_MAXIMA = 300 # Segundos sem leitura depois dos quais a recarga periódica para de rodar
+
+class CacheTransacoes:
+    """
+    Guarda o DataFrame de transações em memória e o corrige a cada escrita.
+
+    Em vez de jogar o cache fora após cada inserção/atualização/exclusão, a
+    mutação é aplicada diretamente ao DataFrame (acrescenta a linha, troca a
+    linha pelo ID ou remove pelo ID). A carga completa (`carregar`) só roda
+    quando o TTL expira ou quando `invalidar()` é chamado.
+
+    Stale-while-revalidate: só a primeira carga (ou a seguinte a `invalidar`)
+    bloqueia quem lê. Com o TTL vencido, `obter` devolve a última versão e a
+    recarga roda em uma thread em segundo plano (uma por vez, compartilhada
+    por todas as sessões); `iniciar_timer` faz essa recarga também sem
+    esperar uma leitura, enquanto houver leitores recentes. O DataFrame novo
+    e seus KPIs entram juntos, sob o lock; mutações aplicadas durante a
+    recarga são reaplicadas sobre ele antes da troca.
+
+    Cada alteração gera um DataFrame novo (copy-on-write), então quem já leu
+    o DataFrame anterior nunca o vê pela metade. `versao` aumenta a cada carga
+    ou mutação aplicada e serve de chave para resultados derivados.
+
+    A tabela de KPIs por mês (`kpis`) é calculada junto com a carga e ajustada
+    com a diferença das linhas alteradas a cada mutação. Se a recarga devolve
+    o mesmo DataFrame da carga anterior (o backend reaproveita o que já tinha
+    limpo quando nada mudou) e não houve mutação desde então, DataFrame, KPIs
+    e `versao` ficam como estão: nada derivado deles é recalculado.
+
+    O índice de busca (`buscar`) segue a mesma regra dos KPIs a partir da
+    primeira busca: construído junto com cada carga nova e corrigido linha a
+    linha a cada mutação.
+    """
+
+    def __init__(self, carregar, preparar, colunas, meses, ttl_segundos=10):
+        self._carregar = carregar
+        self._preparar = preparar
+        self.colunas = list(colunas)
+        self.meses = list(meses)
+        self.ttl_segundos = ttl_segundos
+        self._lock = threading.RLock()
+        self._df = None
+        self._carregado_em = 0.0
+        self._lido_em = 0.0
+        self.kpis = None
+        self.versao = 0
+        self._indice_busca = None  # Só existe depois da primeira busca
+        self._origem = None        # DataFrame devolvido pela última carga e a versão que ele gerou
+        self._versao_origem = None
+        self.erro_recarga = None   # Última falha da recarga em segundo plano (a versão anterior continua valendo)
+        self._geracao = 0          # Muda a cada invalidar(): recargas iniciadas antes são descartadas
+        self._durante_recarga = None # Mutações aplicadas enquanto uma recarga está em andamento
+        self._timer = None
+        self._parar = threading.Event()
+
+    def expirado(self):
+        return self._df is None or time.time() - self._carregado_em >= self.ttl_segundos
+
+    def carregado(self):
+        """True se já há uma versão para servir (a leitura não vai bloquear)."""
+        return self._df is not None
+
+    @property
+    def carregado_em(self):
+        return self._carregado_em
+
+    @property
+    def recarregando(self):
+        return self._durante_recarga is not None
+
+    def obter(self):
+        """DataFrame atual; só bloqueia na primeira carga, depois recarrega em segundo plano quando o TTL vence."""
+        with self._lock:
+            self._lido_em = time.time()
+            if self._df is None:
+                df = self._carregar()
+                self._trocar(df, calcular_tabela_kpis(df, self.meses))
+            elif self.expirado():
+                self.recarregar_em_segundo_plano()
+            return self._df
+
+    def obter_kpis(self):
+        """Tabela de KPIs por mês correspondente ao DataFrame atual."""
+        return self.obter_com_kpis()[1]
+
+    def obter_com_kpis(self):
+        """
+        DataFrame, tabela de KPIs e `versao` lidos juntos, sob o lock: quem
+        memoriza algo derivado deles usa essa versão, não `self.versao` lida
+        depois (uma recarga pode ter trocado tudo no meio).
+        """
+        with self._lock:
+            df = self.obter()
+            return df, self.kpis, self.versao
+
+    def buscar(self, texto="", categorias=(), status=(), meses=(), centavos_min=None, centavos_max=None):
+        """
+        Busca no ano (ver `IndiceBusca.buscar`). Devolve (DataFrame, IDs
+        encontrados, contagem por faceta) da mesma versão. As contagens
+        consideram só o texto e a faixa de valor, para mostrar quantas
+        transações cada opção das facetas traria.
+        """
+        with self._lock:
+            df = self.obter()
+            if self._indice_busca is None:
+                self._indice_busca = IndiceBusca(df)
+            ids = self._indice_busca.buscar(texto, categorias, status, meses, centavos_min, centavos_max)
+            contagens = self._indice_busca.contar_facetas(texto, centavos_min=centavos_min, centavos_max=centavos_max)
+            return df, ids, contagens
+
+    def invalidar(self):
+        """Força a carga completa na próxima leitura (botão de atualização manual)."""
+        with self._lock:
+            self._df = None
+            self._geracao += 1
+
+    # --- Recarga em segundo plano ---
+
+    def recarregar_em_segundo_plano(self):
+        """Inicia a recarga completa em outra thread, se nenhuma estiver em andamento."""
+        with self._lock:
+            if self._durante_recarga is not None:
+                return
+            self._durante_recarga = []
+            geracao = self._geracao
+        threading.Thread(
+            target=self._recarregar, args=(geracao,), name="recarga-cache-transacoes", daemon=True,
+        ).start()
+
+    def _recarregar(self, geracao):
+        try:
+            # Download e KPIs fora do lock: leitores continuam recebendo a versão anterior
+            df = self._carregar()
+            kpis = indice = None
+            if df is not self._origem:
+                kpis = calcular_tabela_kpis(df, self.meses)
+                indice = IndiceBusca(df) if self._indice_busca is not None else None
+        except Exception as e:
+            with self._lock:
+                self.erro_recarga = e
+                self._carregado_em = time.time() # Nova tentativa só no próximo TTL
+                self._durante_recarga = None
+            return
+
+        with self._lock:
+            pendentes, self._durante_recarga = self._durante_recarga, None
+            self.erro_recarga = None
+            if geracao != self._geracao:
+                return # invalidar() durante a recarga: a próxima leitura carrega de novo
+            if df is self._origem and self.versao == self._versao_origem and not pendentes:
+                self._carregado_em = time.time() # Nada mudou: mantém DataFrame, KPIs e versão
+                return
+            self._trocar(df, calcular_tabela_kpis(df, self.meses) if kpis is None else kpis, indice)
+            # Mutações que chegaram durante o download podem ou não estar nele: reaplica como upsert
+            for op, id_transacao, dados in pendentes:
+                if op == OP_DELETAR:
+                    self.aplicar_remocao(id_transacao)
+                else:
+                    self.aplicar_atualizacao(id_transacao, dados)
+
+    def iniciar_timer(self, intervalo_verificacao=1.0, ociosidade_maxima=OCIOSIDADE_MAXIMA):
+        """
+        Inicia (uma vez) a thread que recarrega o cache quando o TTL vence,
+        sem esperar uma leitura, enquanto alguém o leu nos últimos
+        `ociosidade_maxima` segundos.
+        """
+        if self._timer is not None:
+            return
+
+        def _laco():
+            while not self._parar.wait(intervalo_verificacao):
+                if (self._df is not None and self.expirado()
+                        and time.time() - self._lido_em < ociosidade_maxima):
+                    self.recarregar_em_segundo_plano()
+
+        self._timer = threading.Thread(target=_laco, name="timer-cache-transacoes", daemon=True)
+        self._timer.start()
+
+    def parar_timer(self):
+        self._parar.set()
+
+    def _trocar(self, df, kpis, indice=None):
+        """Substitui DataFrame, KPIs e índice de busca de uma vez (chamado com o lock)."""
+        self.kpis = kpis
+        if self._indice_busca is not None:
+            self._indice_busca = indice if indice is not None else IndiceBusca(df)
+        self._substituir(df)
+        self._carregado_em = time.time()
+        self._origem, self._versao_origem = df, self.versao
+
+    def _substituir(self, df, antigas=None, novas=None):
+        if antigas is not None or novas is not None:
+            self.kpis = ajustar_kpis(self.kpis, antigas, novas)
+            if self._indice_busca is not None:
+                if antigas is not None:
+                    self._indice_busca.remover(antigas['ID Transacao'].astype(str))
+                self._indice_busca.adicionar(novas)
+        self._df = df
+        self.versao += 1
+
+    def _linha_preparada(self, dados):
+        return self._preparar(pd.DataFrame([dados], columns=self.colunas))
+
+    # --- Mutações ---
+
+    def aplicar_insercao(self, dados):
+        with self._lock:
+            if self._df is None:
+                return
+            nova = self._linha_preparada(dados)
+            if self._df.empty:
+                self._substituir(nova.reset_index(drop=True), novas=nova)
+            elif not nova.empty:
+                self._substituir(concatenar_transacoes(self._df, nova), novas=nova)
+
+    def aplicar_atualizacao(self, id_transacao, dados):
+        with self._lock:
+            if self._df is None:
+                return
+            if self._df.empty:
+                return self.aplicar_insercao(dados)
+            mascara = self._df['ID Transacao'] == id_transacao
+            if not mascara.any():
+                return self.aplicar_insercao(dados)
+            antigas = self._df[mascara]
+            nova = self._linha_preparada(dados)
+            if nova.empty:
+                # A nova versão não passa na limpeza (ex.: Valor inválido): some do DataFrame
+                self._substituir(self._df[~mascara].reset_index(drop=True), antigas=antigas)
+                return
+            df = self._df.copy()
+            for coluna, valor in nova.iloc[0].items():
+                df.loc[mascara, coluna] = valor
+            self._substituir(df, antigas=antigas, novas=df[mascara])
+
+    def aplicar_remocao(self, id_transacao):
+        with self._lock:
+            if self._df is None or self._df.empty:
+                return
+            mascara = self._df['ID Transacao'] == id_transacao
+            if mascara.any():
+                self._substituir(self._df[~mascara].reset_index(drop=True), antigas=self._df[mascara])
+
+    def aplicar_mutacoes(self, aplicadas):
+        """
+        Aplica uma lista de (op, id, dados) já gravada na planilha, como devolvida
+        pela fila. `None` (lote grande, ex.: importação) força a recarga.
+        """
+        if aplicadas is None:
+            self.invalidar()
+            return
+        with self._lock:
+            if self._durante_recarga is not None:
+                self._durante_recarga.extend(aplicadas)
+            for op, id_transacao, dados in aplicadas:
+                if op == OP_INSERIR:
+                    self.aplicar_insercao(dados)
+                elif op == OP_ATUALIZAR:
+                    self.aplicar_atualizacao(id_transacao, dados)
+                elif op == OP_DELETAR:
+                    self.aplicar_remocao(id_transacao)
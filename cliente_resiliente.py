@@ -0,0 +1,302 @@
+# cliente_resiliente.py (CLIENTE DO SHEETS COM LIMITE DE COTA, REENVIO COM BACKOFF E LEITURAS COALESCIDAS)
+import random
+import threading
+import time
+
+from instrumentacao import codigo_http, parece_aba, parece_planilha
+
+# Cota da API do Sheets por usuário (a conta de serviço): 60 leituras e 60 escritas por minuto
+COTA_LEITURA_POR_MINUTO = 60
+COTA_ESCRITA_POR_MINUTO = 60
+RAJADA = 10               # Chamadas liberadas de uma vez antes de o balde limitar o ritmo
+TENTATIVAS = 5
+ESPERA_BASE = 1.0         # Segundos; dobra a cada tentativa (com jitter)
+ESPERA_MAXIMA = 32.0
+CONEXOES_HTTP = 10        # Conexões mantidas abertas na sessão (thread do script, timers e recargas)
+CODIGOS_TRANSITORIOS = {429, 500, 502, 503, 504}
+
+# Métodos do gspread que só leem (podem ser repetidos em 5xx e coalescidos)
+METODOS_LEITURA = {
+    'get', 'get_all_values', 'get_all_records', 'get_values', 'col_values', 'row_values',
+    'batch_get', 'acell', 'cell', 'find', 'findall', 'worksheet', 'worksheets',
+    'fetch_sheet_metadata', 'list_named_ranges', 'values_get', 'values_batch_get', 'open_by_key',
+}
+
+def _erro_de_conexao(erro):
+    try:
+        import requests
+        if isinstance(erro, (requests.ConnectionError, requests.Timeout)):
+            return True
+    except ImportError:
+        pass
+    return isinstance(erro, (ConnectionError, TimeoutError))
+
+def _retry_after(erro):
+    """Segundos pedidos pelo servidor no cabeçalho Retry-After, se houver."""
+    cabecalhos = getattr(getattr(erro, "response", None), "headers", None) or {}
+    try:
+        return float(cabecalhos.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+# =================================================================
+# === LIMITE DE COTA ===
+# =================================================================
+
+class BaldeTokens:
+    """
+    Token bucket: até `capacidade` chamadas de uma vez, depois uma nova a
+    cada 1/`por_segundo` s. A reposição é (cota - capacidade) por minuto, então
+    nenhuma janela de 60 s passa de `por_minuto` chamadas.
+    """
+
+    def __init__(self, por_minuto, capacidade=RAJADA, relogio=time.monotonic, dormir=time.sleep):
+        self.capacidade = min(capacidade, por_minuto)
+        self.por_segundo = max(por_minuto - self.capacidade, 1) / 60
+        self._relogio = relogio
+        self._dormir = dormir
+        self._lock = threading.Lock()
+        self._tokens = float(self.capacidade)
+        self._atualizado = relogio()
+
+    def _repor(self):
+        agora = self._relogio()
+        self._tokens = min(self.capacidade, self._tokens + (agora - self._atualizado) * self.por_segundo)
+        self._atualizado = agora
+
+    def aguardar(self):
+        """Consome um token, dormindo o necessário. Devolve os segundos esperados."""
+        esperado = 0.0
+        while True:
+            with self._lock:
+                self._repor()
+                if self._tokens >= 1 - 1e-9: # Tolerância: a reposição em float pode ficar um ulp abaixo de 1
+                    self._tokens -= 1
+                    return esperado
+                falta = (1 - self._tokens) / self.por_segundo
+            self._dormir(falta)
+            esperado += falta
+
+    def esvaziar(self):
+        """Depois de um 429: zera o balde para que as outras threads também desacelerem."""
+        with self._lock:
+            self._repor()
+            self._tokens = min(self._tokens, 0.0)
+
+class _LeituraEmAndamento:
+    def __init__(self):
+        self.pronta = threading.Event()
+        self.resultado = None
+        self.erro = None
+
+class ControleCota:
+    """
+    Estado compartilhado por todas as chamadas de uma conexão: baldes de
+    leitura e escrita, leituras em andamento (coalescidas) e estatísticas.
+
+    Reenvio com backoff exponencial e jitter ("full jitter": espera
+    aleatória entre 0 e base * 2^tentativa, limitada a `espera_maxima`, ou o
+    Retry-After do servidor): 429 sempre; 5xx e falhas de conexão só em
+    leituras, porque uma escrita (append, exclusão de linhas) pode ter sido
+    aplicada antes do erro. `relogio`, `dormir` e `aleatorio` podem ser
+    trocados para simular o tempo.
+    """
+
+    def __init__(self, cota_leitura=COTA_LEITURA_POR_MINUTO, cota_escrita=COTA_ESCRITA_POR_MINUTO,
+                 tentativas=TENTATIVAS, espera_base=ESPERA_BASE, espera_maxima=ESPERA_MAXIMA,
+                 relogio=time.monotonic, dormir=time.sleep, aleatorio=random.random):
+        self.leitura = BaldeTokens(cota_leitura, relogio=relogio, dormir=dormir)
+        self.escrita = BaldeTokens(cota_escrita, relogio=relogio, dormir=dormir)
+        self.tentativas = tentativas
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self._dormir = dormir
+        self._aleatorio = aleatorio
+        self._lock = threading.Lock()
+        self._em_andamento = {}
+        self.estatisticas = {
+            "chamadas": 0, "reenvios": 0, "falhas": 0, "coalescidas": 0,
+            "espera_cota_s": 0.0, "espera_backoff_s": 0.0,
+        }
+
+    def _contar(self, chave, valor=1):
+        with self._lock:
+            self.estatisticas[chave] += valor
+
+    def transitorio(self, erro, leitura):
+        codigo = codigo_http(erro)
+        if codigo == 429:
+            return True
+        return leitura and (codigo in CODIGOS_TRANSITORIOS or _erro_de_conexao(erro))
+
+    def espera(self, tentativa, erro):
+        teto = min(self.espera_maxima, self.espera_base * 2 ** tentativa)
+        return max(_retry_after(erro) or 0.0, self._aleatorio() * teto)
+
+    def executar(self, funcao, args=(), kwargs=None, leitura=True, chave=None):
+        """
+        Chama `funcao(*args, **kwargs)` respeitando a cota e repetindo erros
+        transitórios. Leituras com a mesma `chave` em andamento ao mesmo tempo
+        (ex.: várias sessões esperando a cota) viram uma só chamada.
+        """
+        kwargs = kwargs or {}
+        if not leitura or chave is None:
+            return self._com_reenvio(funcao, args, kwargs, leitura)
+
+        with self._lock:
+            andamento = self._em_andamento.get(chave)
+            lider = andamento is None
+            if lider:
+                andamento = self._em_andamento[chave] = _LeituraEmAndamento()
+            else:
+                self.estatisticas["coalescidas"] += 1
+        if not lider:
+            andamento.pronta.wait()
+            if andamento.erro is not None:
+                raise andamento.erro
+            return andamento.resultado
+
+        try:
+            andamento.resultado = self._com_reenvio(funcao, args, kwargs, leitura)
+            return andamento.resultado
+        except Exception as e:
+            andamento.erro = e
+            raise
+        finally:
+            with self._lock:
+                self._em_andamento.pop(chave, None)
+            andamento.pronta.set()
+
+    def _com_reenvio(self, funcao, args, kwargs, leitura):
+        balde = self.leitura if leitura else self.escrita
+        for tentativa in range(self.tentativas):
+            self._contar("espera_cota_s", balde.aguardar())
+            self._contar("chamadas")
+            try:
+                return funcao(*args, **kwargs)
+            except Exception as e:
+                if not self.transitorio(e, leitura) or tentativa == self.tentativas - 1:
+                    self._contar("falhas")
+                    raise
+                if codigo_http(e) == 429:
+                    balde.esvaziar()
+                pausa = self.espera(tentativa, e)
+                self._contar("reenvios")
+                self._contar("espera_backoff_s", pausa)
+                self._dormir(pausa)
+
+# =================================================================
+# === CLIENTE ===
+# =================================================================
+
+class ClienteResiliente:
+    """
+    Envolve uma Spreadsheet/Worksheet do gspread (como `ClienteInstrumentado`)
+    e passa cada método por `ControleCota.executar`. Abas devolvidas também
+    saem envolvidas.
+    """
+
+    def __init__(self, alvo, controle, prefixo):
+        self._alvo = alvo
+        self._controle = controle
+        self._prefixo = prefixo
+
+    def __getattr__(self, nome):
+        valor = getattr(self._alvo, nome)
+        if not callable(valor):
+            return envolver_resiliente(valor, self._controle)
+        leitura = nome in METODOS_LEITURA
+        controle = self._controle
+
+        def chamar(*args, **kwargs):
+            chave = None
+            if leitura:
+                # Identifica a aba/planilha pelo id (os objetos Python mudam a cada worksheet())
+                alvo = (self._prefixo, getattr(self._alvo, "id", None) or id(self._alvo))
+                chave = (alvo, nome, repr(args), repr(sorted(kwargs.items())))
+            return envolver_resiliente(controle.executar(valor, args, kwargs, leitura, chave), controle)
+
+        return chamar
+
+    def __repr__(self):
+        return f"ClienteResiliente({self._alvo!r})"
+
+def envolver_resiliente(valor, controle):
+    """Envolve planilhas e abas (ou listas delas) em ClienteResiliente; o resto passa direto."""
+    if valor is None or controle is None or isinstance(valor, ClienteResiliente):
+        return valor
+    if isinstance(valor, list):
+        if valor and (parece_aba(valor[0]) or parece_planilha(valor[0])):
+            return [envolver_resiliente(v, controle) for v in valor]
+        return valor
+    if parece_planilha(valor):
+        return ClienteResiliente(valor, controle, "planilha")
+    if parece_aba(valor):
+        return ClienteResiliente(valor, controle, "aba")
+    return valor
+
+# =================================================================
+# === CONEXÃO ===
+# =================================================================
+
+def nova_sessao(credenciais, conexoes=CONEXOES_HTTP):
+    """Sessão HTTP autenticada com pool de conexões (keep-alive), reaproveitada por todas as chamadas."""
+    from google.auth.transport.requests import AuthorizedSession
+    from requests.adapters import HTTPAdapter
+
+    sessao = AuthorizedSession(credenciais)
+    # Sem reenvio no urllib3: quem repete (com backoff e cota) é o ControleCota
+    sessao.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=conexoes, max_retries=0))
+    return sessao
+
+def abrir_planilha(credenciais, chave_planilha, controle):
+    """Autoriza com uma sessão reaproveitável e abre a planilha (com reenvio); devolve a planilha sem envolver."""
+    import gspread
+
+    cliente = gspread.authorize(credenciais, session=nova_sessao(credenciais))
+    return controle.executar(cliente.open_by_key, (chave_planilha,), leitura=True)
+
+class ConexaoEmSegundoPlano:
+    """
+    Abre a planilha numa thread, para o app não esperar a autenticação e o
+    open_by_key antes de desenhar a tela. `abrir()` devolve a planilha (ou
+    levanta o erro); `ao_conectar(planilha)` roda na mesma thread quando ela
+    fica pronta. Quem precisa da planilha para continuar usa `aguardar`.
+    """
+
+    def __init__(self, abrir, ao_conectar=None):
+        self._abrir = abrir
+        self._ao_conectar = ao_conectar
+        self._terminada = threading.Event()
+        self.planilha = None
+        self.erro = None
+        self.iniciada_em = None
+        self.conectada_em = None # time.time() de quando a planilha ficou pronta
+        self.duracao = None
+
+    def iniciar(self):
+        self.iniciada_em = time.monotonic()
+        threading.Thread(target=self._executar, name="conexao-sheets", daemon=True).start()
+        return self
+
+    def _executar(self):
+        try:
+            planilha = self._abrir()
+            if self._ao_conectar is not None:
+                self._ao_conectar(planilha)
+            self.planilha = planilha
+            self.conectada_em = time.time()
+        except Exception as e:
+            self.erro = e
+        finally:
+            self.duracao = time.monotonic() - self.iniciada_em
+            self._terminada.set()
+
+    @property
+    def terminada(self):
+        return self._terminada.is_set()
+
+    def aguardar(self, timeout=None):
+        """Espera a tentativa terminar; devolve a planilha (None se falhou ou se o tempo acabou)."""
+        self._terminada.wait(timeout)
+        return self.planilha
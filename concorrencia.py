@@ -0,0 +1,124 @@
+# concorrencia.py (ESCRITAS CONCORRENTES: TRAVA POR ABA NO PROCESSO E REVISÃO OTIMISTA DA ABA NO SHEETS)
+import re
+import threading
+from contextlib import contextmanager
+
+TENTATIVAS_CONFLITO = 3 # Releituras da coluna de IDs antes de desistir de uma descarga em conflito
+
+class ConflitoRevisao(RuntimeError):
+    """A aba continuou mudando (outro processo gravando) em todas as tentativas."""
+
+# =================================================================
+# === TRAVA POR ABA (DENTRO DO PROCESSO) ===
+# =================================================================
+
+class GerenciadorTravas:
+    """
+    Um lock reentrante por aba, criado sob demanda. Todas as escritas de uma
+    aba feitas pelo processo (descarga da fila, lotes, regravações) passam
+    por `exclusiva(titulo)`: duas sessões nunca intercalam a leitura da
+    coluna de IDs de uma com o batch_update da outra. Abas diferentes não
+    esperam umas pelas outras.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._travas = {}
+
+    def trava(self, titulo):
+        with self._lock:
+            trava = self._travas.get(titulo)
+            if trava is None:
+                trava = self._travas[titulo] = threading.RLock()
+            return trava
+
+    @contextmanager
+    def exclusiva(self, titulo):
+        with self.trava(titulo):
+            yield
+
+TRAVAS_ABAS = GerenciadorTravas() # Compartilhado por todos os armazenamentos (e sessões) do processo
+
+# =================================================================
+# === REVISÃO OTIMISTA (ENTRE PROCESSOS) ===
+# =================================================================
+
+def _id_revisao(id_aba, numero):
+    return f"rev-{id_aba}-{numero}"
+
+class RevisaoAba:
+    """
+    Número de revisão de uma aba, guardado no próprio Sheets como um
+    intervalo nomeado (sobre a célula A1) de ID determinístico
+    `rev-<sheetId>-<n>`.
+
+    Escritas que endereçam linhas pelo número (atualizar, excluir) levam no
+    mesmo batch_update `deleteNamedRange(rev n)` + `addNamedRange(rev n+1)`.
+    O lote do Sheets é atômico: se outro processo já passou a aba para
+    n+1, apagar `rev n` falha e nada do lote é aplicado — é um
+    compare-and-swap. Quem perdeu relê a revisão e a coluna de IDs e tenta
+    de novo (ver `FilaMutacoes.descarregar`).
+
+    A revisão conhecida fica em memória: no caso comum (um só processo
+    gravando) não há leitura extra, só as duas requisições no lote que já
+    seria enviado. Edições feitas à mão na planilha não mudam a revisão.
+    """
+
+    def __init__(self):
+        self.numero = None
+
+    def ler(self, worksheet):
+        """
+        Relê a revisão atual da aba (uma chamada); cria a `rev 0` se a aba
+        ainda não tem nenhuma. Se a criação falhar, relista uma vez: só vale
+        como corrida (outro processo criou a revisão antes) se alguma revisão
+        aparecer; senão o erro da criação sobe.
+        """
+        numeros = self._numeros(worksheet)
+        if not numeros:
+            try:
+                worksheet.spreadsheet.batch_update({"requests": [self._adicionar(worksheet, 0)]})
+            except Exception:
+                numeros = self._numeros(worksheet)
+                if not numeros:
+                    raise # 403, cota esgotada, rede...: não foi outro processo criando a revisão
+            else:
+                numeros = [0]
+        self.numero = max(numeros)
+        return self.numero
+
+    def _numeros(self, worksheet):
+        padrao = re.compile(rf"^rev-{worksheet.id}-(\d+)$")
+        return [
+            int(encontrado.group(1))
+            for intervalo in worksheet.spreadsheet.list_named_ranges()
+            if (encontrado := padrao.match(str(intervalo.get("namedRangeId", ""))))
+        ]
+
+    def requisicoes(self, worksheet):
+        """Par de requisições que troca `rev n` por `rev n+1` (lidas antes, se preciso)."""
+        if self.numero is None:
+            self.ler(worksheet)
+        return [
+            {"deleteNamedRange": {"namedRangeId": _id_revisao(worksheet.id, self.numero)}},
+            self._adicionar(worksheet, self.numero + 1),
+        ]
+
+    def _adicionar(self, worksheet, numero):
+        return {"addNamedRange": {"namedRange": {
+            "namedRangeId": _id_revisao(worksheet.id, numero),
+            "name": f"revisao_{worksheet.id}_{numero}",
+            "range": {
+                "sheetId": worksheet.id,
+                "startRowIndex": 0, "endRowIndex": 1, "startColumnIndex": 0, "endColumnIndex": 1,
+            },
+        }}}
+
+    def confirmar(self):
+        """O lote com `requisicoes()` foi aceito: a aba está na revisão seguinte."""
+        self.numero += 1
+
+    def mudou(self, worksheet):
+        """Depois de um batch_update recusado: True se foi por conflito (a revisão não é mais a esperada)."""
+        esperado = self.numero
+        return self.ler(worksheet) != esperado
@@ -3,166 +3,244 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 import uuid
+import os
 # import time as t  # REMOVIDO!
 # from streamlit_autorefresh import st_autorefresh # REMOVIDO!
 
-import gspread
-from google.oauth2 import service_account
+from dados import (
+    ABA_TRANSACOES, CATEGORIAS, COLUNAS_SIMPLIFICADAS, MESES_PT, SHEET_ID, STATUS_DEFAULT, STATUS_PRIORIDADE,
+    ordenar_para_exibicao, preparar_transacoes,
+)
+from armazenamento_sheets import ArmazenamentoSheets
+from armazenamento_sqlite import ArmazenamentoSQLite
+from formatacao import format_currency
+from cache_transacoes import CacheTransacoes
+from kpis import ajustar_kpis, calcular_tabela_kpis
+from lista_transacoes import renderizar_lista
+from importacao import renderizar_importacao
+from recorrencias import renderizar_recorrencias
+from exportacao import renderizar_exportacao
+from tendencias import calcular_tendencias, renderizar_tendencias
+from busca import IndiceBusca, renderizar_busca
+from instrumentacao import Instrumentacao, envolver, renderizar_painel
+from cliente_resiliente import ConexaoEmSegundoPlano, ControleCota, abrir_planilha, envolver_resiliente
 
 # --- CONFIGURAÇÕES DA PLANILHA ---
-SHEET_ID = "1UgLkIHyl1sDeAUeUUn3C6TfOANZFn6KD9Yvd-OkDkfQ" 
-ABA_TRANSACOES = "TRANSACOES" 
-COLUNAS_SIMPLIFICADAS = ['ID Transacao', 'Mês', 'Descricao', 'Categoria', 'Valor', 'Status']
-STATUS_DEFAULT = 'PAGO' 
-
-# Lista de meses em português para uso na UI e como chave de ordenação
-MESES_PT = {
-    1: 'Jan', 2: 'Fev', 3: 'Mar', 4: 'Abr', 
-    5: 'Mai', 6: 'Jun', 7: 'Jul', 8: 'Ago', 
-    9: 'Set', 10: 'Out', 11: 'Nov', 12: 'Dez'
-}
-
-# =================================================================
-# === FUNÇÕES DE FORMATAÇÃO E PARSING ===
-# =================================================================
-
-def format_currency(value):
-    """
-    Formata um float (ex: 11.56) para string monetária BR (R$ 11,56).
-    """
-    if value is None or value == 0.0:
-        return "R$ 0,00"
-        
-    valor_str = "{:.2f}".format(value)
-    
-    # Formata a parte inteira com separador de milhar BR (ponto)
-    partes = valor_str.split('.')
-    reais = partes[0]
-    centavos = partes[1]
-    
-    reais_formatados = []
-    for i in range(len(reais), 0, -3):
-        start = max(0, i - 3)
-        reais_formatados.insert(0, reais[start:i])
-        
-    reais_com_ponto = ".".join(reais_formatados)
-    
-    # Junta tudo com a vírgula decimal
-    valor_final = f"{reais_com_ponto},{centavos}"
-    
-    return f"R$ {valor_final}"
+ARMAZENAMENTO = os.environ.get("CONTROLE_ARMAZENAMENTO", "sheets") # "sheets" (Google Sheets) ou "sqlite" (banco local, offline)
 
 # =================================================================
 # === FUNÇÕES DE CONEXÃO E GOVERNANÇA ===
 # =================================================================
 
 def get_service_account_credentials():
-    """Carrega as credenciais da conta de serviço."""
+    """Carrega as credenciais da conta de serviço (roda na thread da conexão: erros sobem, não viram st.error)."""
+    from google.oauth2 import service_account # Importado só aqui: não atrasa a primeira tela
+
     try:
         creds_dict = st.secrets["gcp_service_account"] 
-        scopes = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
-        creds = service_account.Credentials.from_service_account_info(creds_dict, scopes=scopes)
-        return creds
-    except Exception:
-        st.error("Erro: Credenciais não encontradas ou inválidas. Verifique st.secrets.")
-        return None
+    except Exception as e:
+        raise RuntimeError("Credenciais não encontradas ou inválidas. Verifique st.secrets.") from e
+    scopes = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
+    return service_account.Credentials.from_service_account_info(creds_dict, scopes=scopes)
 
 @st.cache_resource(ttl=3600) 
 def conectar_sheets_resource():
-    """Conecta ao Google Sheets."""
-    MAX_RETRIES = 3
-    creds = get_service_account_credentials()
-    if not creds: return None
+    """
+    Conecta ao Google Sheets em segundo plano, com uma sessão HTTP
+    reaproveitada: a tela é desenhada (com a cópia local) enquanto a
+    autenticação e a abertura da planilha acontecem. Toda chamada (inclusive
+    a abertura) respeita a cota por minuto e repete 429/5xx com backoff.
+    Quando a planilha fica pronta, o backend passa a usá-la.
+    """
+    # Resolvidos aqui: a conexão roda fora da thread do script
+    controle = obter_controle_cota()
+    instrumentacao = obter_instrumentacao()
+    armazenamento = obter_armazenamento()
 
-    for attempt in range(MAX_RETRIES):
-        try:
-            gc = gspread.authorize(creds)
-            spreadsheet = gc.open_by_key(SHEET_ID)
-            st.sidebar.success("✅ Conexão com Google Sheets estabelecida.")
-            return spreadsheet
-        except Exception as e:
-            if attempt < MAX_RETRIES - 1:
-                pass 
-            else:
-                st.error(f"🚨 Erro fatal ao conectar após {MAX_RETRIES} tentativas. Erro: {e}")
-                return None
-    return None
-
-@st.cache_data(ttl=10) # TTL de 10 segundos para leitura cacheada
-def carregar_dados(): 
-    """Lê a aba TRANSACOES forçando a leitura do valor puro (UNFORMATTED_VALUE)."""
-    spreadsheet = conectar_sheets_resource() 
-    if spreadsheet is None:
-        return pd.DataFrame()
-        
-    try:
-        records = spreadsheet.worksheet(ABA_TRANSACOES).get_all_records(
-             value_render_option='UNFORMATTED_VALUE', 
-             head=1 
-        )
-        df_transacoes = pd.DataFrame(records)
+    def abrir():
+        spreadsheet = abrir_planilha(get_service_account_credentials(), SHEET_ID, controle)
+        # Cada tentativa à API é cronometrada (instrumentação por dentro); cota e reenvio por fora
+        return envolver_resiliente(envolver(spreadsheet, instrumentacao), controle)
 
-        if not df_transacoes.empty:
-            
-            if 'Status' not in df_transacoes.columns:
-                df_transacoes['Status'] = STATUS_DEFAULT 
-            
-            df_transacoes['Valor'] = pd.to_numeric(df_transacoes['Valor'], errors='coerce')
-            
-            df_transacoes['Status'] = df_transacoes['Status'].fillna(STATUS_DEFAULT)
-            df_transacoes.loc[df_transacoes['Status'] == '', 'Status'] = STATUS_DEFAULT
-            
-            df_transacoes = df_transacoes.dropna(subset=['Mês', 'Valor']).copy() 
-            df_transacoes['Mes_Num'] = df_transacoes['Mês'].map({v: k for k, v in MESES_PT.items()})
+    return ConexaoEmSegundoPlano(abrir, ao_conectar=armazenamento.conectar).iniciar()
 
-        return df_transacoes
-        
+@st.fragment(run_every=1)
+def aguardar_conexao(conexao, cache):
+    """
+    Aviso na barra lateral enquanto a planilha abre. Pronta a conexão, o
+    cache do ano (vindo da cópia local) é recarregado em segundo plano e,
+    quando termina, a página é refeita com os dados atuais.
+    """
+    if not conexao.terminada:
+        st.caption("⏳ Conectando ao Google Sheets... exibindo a cópia local.")
+        return
+    if conexao.planilha is not None and cache.carregado() and cache.carregado_em < conexao.conectada_em:
+        cache.recarregar_em_segundo_plano() # Não faz nada se já estiver recarregando
+        st.caption("🔄 Conectado. Atualizando a cópia local...")
+        return
+    st.rerun()
+
+@st.cache_resource
+def obter_controle_cota():
+    """Cota da API, reenvio com backoff e leituras coalescidas, compartilhados entre as sessões."""
+    return ControleCota()
+
+@st.cache_resource
+def obter_instrumentacao():
+    """Coletor de tempos, chamadas ao Sheets e acertos de cache, compartilhado entre as sessões."""
+    return Instrumentacao()
+
+@st.cache_resource
+def obter_registro_caches():
+    """
+    {ano: CacheTransacoes} já criados, preenchido por `obter_cache` na thread
+    do script. A descarga da fila roda no timer (sem contexto do Streamlit):
+    ela só consulta este dicionário, nunca as funções com cache.
+    """
+    return {}
+
+@st.cache_resource
+def obter_armazenamento():
+    """
+    Backend de armazenamento das transações (ARMAZENAMENTO = "sheets" ou "sqlite").
+    Cada escrita que chega ao backend corrige o DataFrame cacheado do ano, se
+    ele já existe (senão a primeira leitura já vem com a escrita).
+    """
+    if ARMAZENAMENTO == "sqlite":
+        armazenamento = ArmazenamentoSQLite()
+    else:
+        # Sem planilha até `conectar_sheets_resource` abri-la: até lá lê os espelhos em disco
+        armazenamento = ArmazenamentoSheets(None, COLUNAS_SIMPLIFICADAS, instrumentacao=obter_instrumentacao())
+    caches = obter_registro_caches()
+
+    def corrigir_cache(ano, aplicadas): # CORRIGE O CACHE EM VEZ DE LIMPÁ-LO
+        cache = caches.get(int(ano))
+        if cache is not None:
+            cache.aplicar_mutacoes(aplicadas)
+
+    armazenamento.ao_gravar = corrigir_cache
+    return armazenamento
+
+@st.cache_data(ttl=60)
+def situacao_particoes(_armazenamento, conectado=True):
+    """
+    Anos que já têm partição própria e se ainda há dados no formato antigo
+    para migrar. `conectado` entra na chave: sem conexão os anos vêm das
+    cópias locais, e a lista é refeita quando a planilha fica pronta.
+    """
+    return {"anos": _armazenamento.anos(), "legada_pendente": _armazenamento.migracao_pendente()}
+
+@st.cache_data(max_entries=32)
+def tendencias_do_ano(_obter_tabela_kpis, ano, versao):
+    """
+    Série mensal, acumulado no ano e variações. `_obter_tabela_kpis` só é
+    chamada quando a versão dos dados (`versao`) muda.
+    """
+    return calcular_tendencias(_obter_tabela_kpis())
+
+def ler_transacoes(armazenamento, ano): 
+    """
+    Lê do backend todas as transações do ano, já limpas. No Sheets, só as
+    linhas alteradas são baixadas (espelho local) e, sem conexão, usa o último
+    conteúdo do espelho. Apenas a partição do ano pedido é lida.
+    Também roda na thread de recarga do cache (sem contexto do Streamlit): os
+    avisos ficam em `carregar_dados`.
+    """
+    return armazenamento.carregar(ano)
+
+@st.cache_resource
+def obter_cache(ano):
+    """
+    Cache do DataFrame do ano, compartilhado entre sessões: corrigido a cada
+    escrita e, vencido o TTL, recarregado em segundo plano (uma carga para
+    todas as sessões) enquanto a versão anterior continua sendo servida.
+    """
+    armazenamento = obter_armazenamento() # Resolvido aqui: a recarga roda fora da thread do script
+    cache = CacheTransacoes(
+        lambda: ler_transacoes(armazenamento, ano), preparar_transacoes, COLUNAS_SIMPLIFICADAS, MESES_PT.values(),
+        ttl_segundos=10, # TTL de 10 segundos
+    )
+    cache.iniciar_timer()
+    obter_registro_caches()[int(ano)] = cache
+    return cache
+
+def carregar_dados(ano):
+    """
+    DataFrame de transações do ano, sua tabela de KPIs e a versão do cache
+    de que os dois saíram. Só a primeira carga espera o Sheets; depois a
+    leitura devolve o cache na hora.
+    """
+    cache = obter_cache(ano)
+    armazenamento = obter_armazenamento()
+    obter_instrumentacao().registrar_cache("carregar_dados", acerto=cache.carregado())
+    try:
+        df, kpis, versao = cache.obter_com_kpis()
     except Exception as e:
         st.error(f"Erro ao carregar dados: {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(), calcular_tabela_kpis(None, MESES_PT.values()), None
+
+    erro = getattr(armazenamento, "erros_sincronizacao", {}).get(ano)
+    if erro is not None:
+        st.warning(f"⚠️ Falha ao sincronizar com o Sheets, exibindo cópia local de {armazenamento.ultima_sincronizacao(ano)}. Erro: {erro}")
+    elif armazenamento.nome == "sheets" and armazenamento.spreadsheet is None:
+        st.info(f"📂 Sem conexão com o Sheets (ainda): exibindo a cópia local de {armazenamento.ultima_sincronizacao(ano)}.")
+    elif cache.erro_recarga is not None:
+        st.warning(f"⚠️ Falha ao atualizar os dados, exibindo a versão de {datetime.fromtimestamp(cache.carregado_em):%H:%M:%S}. Erro: {cache.erro_recarga}")
+    return df, kpis, versao
+
+def buscar_transacoes(ano, fila, **filtros):
+    """
+    Busca no índice do cache do ano (construído uma vez, corrigido a cada
+    escrita). Alterações ainda na fila (visão otimista) entram por um índice
+    só delas, montado na hora: são poucas linhas.
+    """
+    df, ids, contagens = obter_cache(ano).buscar(**filtros)
+    if fila is None or not len(fila):
+        return df, ids, contagens
+    ids_pendentes = set(fila.ids_pendentes())
+    df = fila.aplicar_sobre(df, preparar_transacoes)
+    if df.empty:
+        return df, [], contagens
+    pendentes = IndiceBusca(df[df['ID Transacao'].isin(ids_pendentes)]).buscar(**filtros)
+    return df, [i for i in ids if i not in ids_pendentes] + pendentes, contagens
 
+# =================================================================
+# === ESCRITA (VIA BACKEND DE ARMAZENAMENTO) ===
+# =================================================================
 
-def adicionar_transacao(spreadsheet, dados_do_form):
-    """Insere uma nova linha de transação no Sheets."""
+def adicionar_transacao(armazenamento, dados_do_form):
+    """Grava uma nova transação na partição do seu ano (no Sheets, via fila write-behind)."""
     try:
-        sheet = spreadsheet.worksheet(ABA_TRANSACOES)
-        
-        nova_linha = [dados_do_form.get(col) for col in COLUNAS_SIMPLIFICADAS]
-        
-        sheet.append_row(nova_linha, value_input_option='USER_ENTERED')
-        st.success(f"🎉 {dados_do_form['Categoria']} criada com sucesso! Atualizando dados...")
-        carregar_dados.clear() # LIMPA O CACHE
+        armazenamento.inserir(dados_do_form)
+        st.success(f"🎉 {dados_do_form['Categoria']} criada com sucesso! Gravando...")
         return True
     except Exception as e:
         st.error(f"Erro ao adicionar transação: {e}")
         return False
 
-def atualizar_transacao(spreadsheet, id_transacao, novos_dados):
-    """Atualiza uma transação existente."""
+def atualizar_transacao(armazenamento, id_transacao, novos_dados, ano_atual):
+    """
+    Atualiza uma transação existente. Se o Ano mudou, a transação sai da
+    partição do ano atual e entra na partição do novo ano.
+    """
     try:
-        sheet = spreadsheet.worksheet(ABA_TRANSACOES)
-        cell = sheet.find(id_transacao) 
-        linha_index = cell.row 
-        
-        valores_atualizados = [novos_dados.get(col) for col in COLUNAS_SIMPLIFICADAS]
-
-        sheet.update(f'A{linha_index}', [valores_atualizados], value_input_option='USER_ENTERED')
-        st.success(f"🔄 Transação {id_transacao[:8]}... atualizada. Atualizando dados...")
-        carregar_dados.clear() # LIMPA O CACHE
+        novo_ano = novos_dados.get('Ano', ano_atual)
+        if novo_ano == ano_atual:
+            armazenamento.atualizar(id_transacao, novos_dados, ano_atual)
+        else:
+            armazenamento.deletar(id_transacao, ano_atual)
+            armazenamento.inserir(novos_dados)
+        st.success(f"🔄 Transação {id_transacao[:8]}... atualizada. Gravando...")
         return True
     except Exception as e:
         st.error(f"🚫 Erro ao atualizar a transação: {e}")
         return False
 
-def deletar_transacao(spreadsheet, id_transacao):
-    """Remove uma transação."""
+def deletar_transacao(armazenamento, id_transacao, ano):
+    """Remove uma transação da partição do ano."""
     try:
-        sheet = spreadsheet.worksheet(ABA_TRANSACOES)
-        cell = sheet.find(id_transacao)
-        linha_index = cell.row
-        sheet.delete_rows(linha_index)
-        st.success(f"🗑️ Transação {id_transacao[:8]}... deletada. Atualizando dados...")
-        carregar_dados.clear() # LIMPA O CACHE
+        armazenamento.deletar(id_transacao, ano)
+        st.success(f"🗑️ Transação {id_transacao[:8]}... deletada. Gravando...")
         return True
     except Exception as e:
         st.error(f"🚫 Erro ao deletar a transação: {e}")
@@ -176,32 +254,82 @@ st.set_page_config(layout="wide", page_title="Controle Financeiro Básico")
 
 st.title("💸 **Controle Financeiro**")
 
+# Instrumentação: mede esta execução do script do início ao fim
+instrumentacao = obter_instrumentacao()
+if '_sessao_instrumentacao' not in st.session_state:
+    st.session_state['_sessao_instrumentacao'] = uuid.uuid4().hex[:8]
+instrumentacao.iniciar_execucao(st.session_state['_sessao_instrumentacao'])
+
 # Inicialização do Estado
 if 'filtro_mes' not in st.session_state:
     mes_atual_init = MESES_PT.get(datetime.now().month, 'Jan')
     st.session_state.filtro_mes = mes_atual_init
     
+if 'filtro_ano' not in st.session_state:
+    st.session_state.filtro_ano = datetime.now().year
+    
 if 'id_edicao_ativa' not in st.session_state:
     st.session_state['id_edicao_ativa'] = None
 
-# Conexão
-spreadsheet = conectar_sheets_resource()
-if spreadsheet is None:
-    st.stop() 
+# Conexão: não espera a planilha (no Sheets ela abre em segundo plano; até lá vale a cópia local)
+with instrumentacao.etapa("conexao"):
+    armazenamento = obter_armazenamento()
+    conexao = conectar_sheets_resource() if armazenamento.nome == "sheets" else None
+conectando = conexao is not None and armazenamento.spreadsheet is None
+if conectando and conexao.erro is not None:
+    st.error(f"🚨 Erro fatal ao conectar ao Google Sheets. Erro: {conexao.erro}")
+
+# --- PARTIÇÕES POR ANO (uma aba TRANSACOES_AAAA por ano; só o ano escolhido é carregado) ---
+st.sidebar.header("🗓️ Filtro de Período")
+
+with instrumentacao.etapa("particoes"):
+    situacao = situacao_particoes(armazenamento, armazenamento.nome != "sheets" or armazenamento.spreadsheet is not None)
+opcoes_ano = sorted(set(situacao["anos"]) | {datetime.now().year, st.session_state.filtro_ano})
+selected_year = st.sidebar.selectbox("Selecione o Ano:", options=opcoes_ano, key='filtro_ano')
+
+if conexao is not None:
+    with st.sidebar:
+        if not conectando:
+            st.success("✅ Conexão com Google Sheets estabelecida.")
+        elif conexao.erro is None:
+            aguardar_conexao(conexao, obter_cache(selected_year))
+
+if situacao["legada_pendente"]:
+    with st.sidebar.expander("📦 Migrar aba única para abas por ano"):
+        st.caption(
+            f"A aba {ABA_TRANSACOES} ainda guarda todas as transações. A migração copia cada linha "
+            "para a aba do seu ano e renomeia a aba antiga (nada é apagado)."
+        )
+        ano_padrao_migracao = st.number_input(
+            "Ano para linhas sem ano identificável", min_value=2000, max_value=2100,
+            value=datetime.now().year, step=1, key="ano_padrao_migracao",
+        )
+        if st.button("Migrar agora", key="migrar_particoes"):
+            try:
+                copiadas = armazenamento.migrar(int(ano_padrao_migracao))
+                situacao_particoes.clear()
+                for ano_migrado in copiadas:
+                    obter_cache(ano_migrado).invalidar()
+                st.success(f"✅ Migração concluída: {sum(copiadas.values())} transação(ões) em {len(copiadas)} aba(s).")
+                st.rerun()
+            except Exception as e:
+                st.error(f"🚫 Erro na migração: {e}")
 
 # --- BLOCO DE REFRESH MANUAL (Corrigido para dar feedback de UX) ---
 with st.sidebar:
     st.markdown("---")
-    if st.button("Forçar Atualização Manual 🔄", help="Limpa o cache e busca os dados mais recentes do Google Sheets."):
-        carregar_dados.clear() 
+    if st.button("Forçar Atualização Manual 🔄", help="Grava as alterações pendentes, relê o ano inteiro e recarrega o cache."):
+        try:
+            armazenamento.sincronizar(selected_year)
+        except Exception as e:
+            st.error(f"Erro ao ressincronizar o espelho local: {e}")
+        situacao_particoes.clear()
+        obter_cache(selected_year).invalidar() 
         st.success("✅ Cache limpo! Recarregando dados...") 
         st.rerun() 
     st.markdown("---")
     st.info("Atualização: Automática ao salvar/deletar, ou use o botão manual.")
 
-# Carregamento de Dados 
-df_transacoes = carregar_dados() 
-
 # === INSERÇÃO DE DADOS (CREATE) - FORMS SEPARADOS ===
 
 st.header("📥 Registrar Novas Transações")
@@ -213,9 +341,16 @@ with col_rec_form:
     st.markdown("##### 🟢 Nova Receita (Entrada Simples)")
     with st.form("form_transacao_receita", clear_on_submit=True):
         
-        col_r1, col_r2 = st.columns(2)
+        col_r0, col_r1, col_r2 = st.columns(3)
         
         mes_atual = MESES_PT.get(datetime.now().month, 'Jan')
+        ano_referencia_r = col_r0.selectbox(
+            "Ano",
+            options=opcoes_ano,
+            index=opcoes_ano.index(selected_year),
+            key="ano_ref_r"
+        )
+        
         mes_referencia_r = col_r1.selectbox(
             "Mês", 
             options=list(MESES_PT.values()), 
@@ -257,12 +392,13 @@ with col_rec_form:
                 data_to_save = {
                     "ID Transacao": f"TRX-{datetime.now().strftime('%Y%m%d%H%M%S')}-{str(uuid.uuid4())[:4]}",
                     "Mês": mes_referencia_r,
+                    "Ano": int(ano_referencia_r),
                     "Descricao": descricao_r, 
                     "Categoria": 'Receita', 
                     "Valor": valor_r,
                     "Status": STATUS_DEFAULT 
                 }
-                adicionar_transacao(spreadsheet, data_to_save) 
+                adicionar_transacao(armazenamento, data_to_save) 
                 st.rerun() 
             else:
                 st.warning("Descrição e Valor (deve ser maior que zero) são obrigatórios para Receita.")
@@ -272,9 +408,16 @@ with col_des_form:
     st.markdown("##### 🔴 Nova Despesa (Com Status)")
     with st.form("form_transacao_despesa", clear_on_submit=True):
         
-        col_d1, col_d2 = st.columns(2) 
+        col_d0, col_d1, col_d2 = st.columns(3) 
 
         mes_atual = MESES_PT.get(datetime.now().month, 'Jan')
+        ano_referencia_d = col_d0.selectbox(
+            "Ano",
+            options=opcoes_ano,
+            index=opcoes_ano.index(selected_year),
+            key="ano_ref_d"
+        )
+        
         mes_referencia_d = col_d1.selectbox(
             "Mês", 
             options=list(MESES_PT.values()), 
@@ -322,27 +465,86 @@ with col_des_form:
                 data_to_save = {
                     "ID Transacao": f"TRX-{datetime.now().strftime('%Y%m%d%H%M%S')}-{str(uuid.uuid4())[:4]}",
                     "Mês": mes_referencia_d,
+                    "Ano": int(ano_referencia_d),
                     "Descricao": descricao_d, 
                     "Categoria": 'Despesa', 
                     "Valor": valor_d,
                     "Status": status_select_d 
                 }
-                adicionar_transacao(spreadsheet, data_to_save) 
+                adicionar_transacao(armazenamento, data_to_save) 
                 st.rerun() 
             else:
                 st.warning("Descrição e Valor (deve ser maior que zero) são obrigatórios para Despesa.")
 
 
+# === IMPORTAÇÃO EM LOTE (CSV/OFX) ===
+
+with st.expander("📤 Importar transações em lote (CSV/OFX)"):
+    renderizar_importacao(
+        armazenamento, selected_year,
+        ao_concluir=lambda resumo: situacao_particoes.clear(),
+    )
+
+# === TRANSAÇÕES RECORRENTES (modelos salvos no armazenamento; ocorrências gravadas em lote) ===
+
+with st.expander("🔁 Transações recorrentes (contas fixas)"):
+    renderizar_recorrencias(
+        armazenamento, selected_year,
+        ao_concluir=lambda resumo: situacao_particoes.clear(),
+    )
+
+# === DADOS DO ANO (depois dos formulários: a tela já está desenhada enquanto carrega) ===
+
+# Sem cópia local do ano, não há o que mostrar antes da planilha abrir: espera a conexão aqui
+if conectando and armazenamento.spreadsheet is None and not armazenamento.tem_copia_local(selected_year):
+    if conexao.erro is None:
+        with st.spinner("Conectando ao Google Sheets..."):
+            conexao.aguardar()
+    if armazenamento.spreadsheet is None:
+        if conexao.erro is not None:
+            st.error(f"🚨 Sem conexão com o Google Sheets e sem cópia local de {selected_year}. Erro: {conexao.erro}")
+        st.stop()
+
+# Escrita em lote: descarrega a fila se o timer ainda não o fez (só backends com escrita adiada)
+fila_mutacoes = armazenamento.pendentes(selected_year)
+if fila_mutacoes is not None:
+    try:
+        with instrumentacao.etapa("fila_mutacoes"):
+            armazenamento.descarregar(selected_year)
+    except Exception as e:
+        st.sidebar.warning(f"⚠️ Falha ao gravar alterações pendentes (nova tentativa em instantes). Erro: {e}")
+    if len(fila_mutacoes):
+        st.sidebar.caption(f"⏳ {len(fila_mutacoes)} alteração(ões) aguardando gravação na planilha.")
+
+# Carregamento de Dados
+if armazenamento.consulta_nativa:
+    # Backend com consulta por mês (SQLite): nada é carregado aqui, o mês é consultado no dashboard
+    with instrumentacao.etapa("carregar_dados"):
+        ano_sem_dados = armazenamento.vazio(selected_year)
+else:
+    # Ano inteiro cacheado, com as alterações pendentes aplicadas de forma otimista
+    with instrumentacao.etapa("carregar_dados"):
+        df_base, tabela_kpis, versao_cache = carregar_dados(selected_year)
+    with instrumentacao.etapa("visao_otimista"):
+        versao_fila = fila_mutacoes.versao # Lida antes da fila ser aplicada: no pior caso a chave fica para trás
+        df_transacoes = fila_mutacoes.aplicar_sobre(df_base, preparar_transacoes)
+        if len(fila_mutacoes) and not df_transacoes.empty:
+            ids_pendentes = fila_mutacoes.ids_pendentes()
+            tabela_kpis = ajustar_kpis(
+                tabela_kpis,
+                antigas=df_base[df_base['ID Transacao'].isin(ids_pendentes)] if not df_base.empty else None,
+                novas=df_transacoes[df_transacoes['ID Transacao'].isin(ids_pendentes)],
+            )
+    ano_sem_dados = df_transacoes.empty
+
 st.markdown("---") 
 
-if df_transacoes.empty:
-    st.error("Sem dados válidos para análise. Adicione uma transação para começar.")
+if ano_sem_dados:
+    st.error(f"Sem dados válidos para {selected_year}. Adicione uma transação para começar.")
 else:
     
     # --- FILTROS E DASHBOARD ---
     
-    st.sidebar.header("🗓️ Filtro de Período")
-
     todos_os_meses_pt = list(MESES_PT.values())
 
     selected_month = st.sidebar.selectbox(
@@ -351,23 +553,29 @@ else:
         key='filtro_mes', 
     )
 
-    if selected_month and 'Mês' in df_transacoes.columns:
-        df_filtrado = df_transacoes[df_transacoes['Mês'] == selected_month].copy()
-    else:
-        df_filtrado = pd.DataFrame() 
+    with instrumentacao.etapa("filtro_mes"):
+        if selected_month and armazenamento.consulta_nativa:
+            df_filtrado = armazenamento.consultar_mes(selected_year, selected_month)
+        elif selected_month and 'Mês' in df_transacoes.columns:
+            df_filtrado = df_transacoes[df_transacoes['Mês'] == selected_month]
+        else:
+            df_filtrado = pd.DataFrame() 
 
 
-    st.header(f"📊 Dashboard Básico ({selected_month or 'Nenhum Mês Selecionado'})")
+    st.header(f"📊 Dashboard Básico ({selected_month or 'Nenhum Mês Selecionado'}/{selected_year})")
     
-    if not df_filtrado.empty and 'Valor' in df_filtrado.columns:
+    if not df_filtrado.empty and 'Centavos' in df_filtrado.columns:
         
-        # Cálculo dos KPIs
-        total_receita_bruta = df_filtrado[df_filtrado['Categoria'] == 'Receita']['Valor'].sum()
-        total_despesa_bruta = df_filtrado[df_filtrado['Categoria'] == 'Despesa']['Valor'].sum()
-        total_receita_paga = df_filtrado[(df_filtrado['Categoria'] == 'Receita') & (df_filtrado['Status'] == 'PAGO')]['Valor'].sum()
-        total_despesa_paga = df_filtrado[(df_filtrado['Categoria'] == 'Despesa') & (df_filtrado['Status'] == 'PAGO')]['Valor'].sum()
-        margem_liquida_real = total_receita_paga - total_despesa_paga
-        total_despesa_pendente = total_despesa_bruta - total_despesa_paga
+        # KPIs do mês: GROUP BY no SQLite ou consulta à tabela pré-calculada na carga (sem reprocessar as linhas)
+        if armazenamento.consulta_nativa:
+            kpis_mes = armazenamento.kpis_mes(selected_year, selected_month)
+        else:
+            kpis_mes = tabela_kpis.loc[selected_month]
+        total_receita_bruta = kpis_mes['receita_bruta']
+        total_despesa_bruta = kpis_mes['despesa_bruta']
+        total_despesa_paga = kpis_mes['despesa_paga']
+        margem_liquida_real = kpis_mes['lucro_liquido']
+        total_despesa_pendente = kpis_mes['despesa_pendente']
 
         col1, col2, col3, col4, col5 = st.columns(5)
         
@@ -402,161 +610,100 @@ else:
         
         st.subheader(f"📑 Registros de Transações Detalhadas ({selected_month})")
         
-        # 1. Mapeamento para priorizar PENDENTE (1) sobre PAGO (2) nas Despesas
-        # 'PENDENTE' vem antes de 'PAGO'
-        status_priority_map = {
-            'PENDENTE': 1,
-            'PAGO': 2
-        }
-        df_filtrado['Ordem_Status'] = df_filtrado['Status'].map(status_priority_map)
-        
-        # DataFrame a ser exibido (Ordenado)
-        df_display = df_filtrado.copy().sort_values(
-            by=['Categoria', 'Ordem_Status', 'Valor'], 
-            ascending=[
-                False, # Categoria (Receita Z->A) primeiro
-                True,  # Ordem_Status (PENDENTE 1->2) segundo
-                False  # Valor (Maior->Menor) para desempate
-            ]
-        )
+        # DataFrame a ser exibido (Ordenado: Receitas, PENDENTE antes de PAGO, maior valor primeiro)
+        with instrumentacao.etapa("ordenacao"):
+            df_display = ordenar_para_exibicao(df_filtrado)
         
         if df_display.empty:
             st.info(f"Sem transações para o mês de **{selected_month}**.")
         else:
             
-            # Cabeçalhos
-            cols_header = st.columns([0.4, 0.2, 0.2, 0.1, 0.1])
-            cols_header[0].markdown("**Descrição**")
-            cols_header[1].markdown("**Categoria**")
-            cols_header[2].markdown("**Valor / Status**")
-            cols_header[3].markdown(" ") 
-            cols_header[4].markdown(" ") 
-            st.markdown("---")
-            
-            # Loop sobre cada transação
-            for index, row in df_display.iterrows():
-                
-                id_transacao = row['ID Transacao']
-                
-                # 1. Se a linha NÃO está em modo de edição (EXIBIÇÃO NORMAL + BOTÕES)
-                if st.session_state.id_edicao_ativa != id_transacao:
-                    
-                    col_desc, col_cat, col_val_status, col_btn_edit, col_btn_del = st.columns([0.4, 0.2, 0.2, 0.1, 0.1])
-                    
-                    # === CÓDIGO PARA COLORAÇÃO CONDICIONAL NA TABELA (UX VISUAL) ===
-                    if row['Categoria'] == 'Receita':
-                        categoria_cor = "green"
-                    elif row['Categoria'] == 'Despesa' and row['Status'] == 'PAGO':
-                        # Despesa PAGA fica neutra/cinza
-                        categoria_cor = "darkgrey" 
-                    else:
-                        # Despesa PENDENTE (continua vermelho)
-                        categoria_cor = "red"
-                    # =============================================================
-                    
-                    col_desc.markdown(f"**<span style='color:{categoria_cor}'>{row['Descricao']}</span>**", unsafe_allow_html=True)
-                    col_cat.write(row['Categoria'])
-                    col_val_status.write(f"{format_currency(row['Valor'])} ({row['Status']})")
-
-                    if col_btn_edit.button("✍️", key=f'edit_{id_transacao}', help="Editar esta transação"):
-                        st.session_state.id_edicao_ativa = id_transacao 
-                        st.rerun() 
-
-                    if col_btn_del.button("🗑️", key=f'del_{id_transacao}', help="Excluir esta transação"):
-                        deletar_transacao(spreadsheet, id_transacao)
-                        st.rerun() 
-                
-                    st.markdown("---") 
-                
-                # 2. Se a linha ESTÁ em modo de edição (FORMULÁRIO)
-                else: 
-                    st.warning(f"📝 Editando Transação: **{row['Descricao']}**")
-                    
-                    with st.form(key=f"form_update_c_{id_transacao}"):
-                        
-                        transacao_dados = row 
-                        
-                        col_upd_1, col_upd_2, col_upd_3 = st.columns(3) 
-                        
-                        valor_existente = float(transacao_dados['Valor'])
-                        reais_existentes = int(valor_existente)
-                        centavos_existentes = int(round((valor_existente - reais_existentes) * 100))
-                        
-                        # INPUTS
-                        mes_idx = list(MESES_PT.values()).index(transacao_dados['Mês'])
-                        novo_mes = col_upd_1.selectbox("Mês", list(MESES_PT.values()), index=mes_idx, key=f'ut_mes_c_{id_transacao}')
-                        cat_index = ["Receita", "Despesa"].index(transacao_dados['Categoria'])
-                        novo_categoria = col_upd_2.selectbox("Tipo", ["Receita", "Despesa"], index=cat_index, key=f'ut_tipo_c_{id_transacao}')
-                        novo_status_existente = transacao_dados.get('Status', STATUS_DEFAULT) 
-                        status_idx = ['PAGO', 'PENDENTE'].index(novo_status_existente)
-                        novo_status = col_upd_3.selectbox("Status", ['PAGO', 'PENDENTE'], index=status_idx, key=f'ut_status_c_{id_transacao}')
-                        
-                        col_upd_v1, col_upd_v2 = st.columns([2, 1])
-                        
-                        novo_reais_input = col_upd_v1.number_input(
-                            "Valor (R$ - Reais)", 
-                            min_value=0, 
-                            value=reais_existentes, 
-                            step=1, 
-                            format="%d", 
-                            key=f"ut_reais_c_{id_transacao}"
-                        )
-
-                        novo_centavos_input = col_upd_v2.number_input(
-                            "Centavos", 
-                            min_value=0, 
-                            max_value=99, 
-                            value=centavos_existentes, 
-                            step=1, 
-                            format="%d", 
-                            key=f"ut_centavos_c_{id_transacao}"
-                        )
-                        
-                        novo_descricao = st.text_input(
-                            "Descrição", 
-                            value=transacao_dados['Descricao'], 
-                            key=f'ut_desc_c_{id_transacao}'
-                        )
-                        
-                        # BOTÃO DE SALVAR (DENTRO DO FORM)
-                        update_button = st.form_submit_button("✅ Salvar Alterações")
-
-                        if update_button:
-                            
-                            novo_reais_final = novo_reais_input if novo_reais_input is not None else 0
-                            novo_centavos_final = novo_centavos_input if novo_centavos_input is not None else 0
-                            novo_valor = novo_reais_final + (novo_centavos_final / 100)
-                            
-                            if novo_descricao and novo_valor >= 0:
-                                dados_atualizados = {
-                                    'ID Transacao': id_transacao, 
-                                    'Descricao': novo_descricao,
-                                    'Valor': novo_valor, 
-                                    'Categoria': novo_categoria,
-                                    'Mês': novo_mes,
-                                    'Status': novo_status
-                                }
-                                atualizar_transacao(spreadsheet, id_transacao, dados_atualizados) 
-                                st.session_state.id_edicao_ativa = None 
-                                st.rerun()
-                            else:
-                                st.warning("Descrição e Valor (deve ser maior ou igual a zero) são obrigatórios na atualização.")
-
-                    # BOTÃO DE CANCELAR (FORA DO FORM)
-                    col_dummy_save, col_cancel_out = st.columns([1, 4])
-                    if col_cancel_out.button("Cancelar Edição", key=f'cancel_edit_{id_transacao}'):
-                        st.session_state.id_edicao_ativa = None
-                        st.rerun()
-
-                    st.markdown("---") # Separador para o formulário de edição
-
+            with instrumentacao.etapa("renderizacao_lista"):
+                renderizar_lista(
+                    df_display,
+                    chave=f"pagina_lista_{selected_year}_{selected_month}",
+                    ao_deletar=lambda id_transacao: deletar_transacao(armazenamento, id_transacao, selected_year),
+                    ao_atualizar=lambda id_transacao, dados: atualizar_transacao(armazenamento, id_transacao, dados, selected_year),
+                    meses=list(MESES_PT.values()),
+                    anos=opcoes_ano,
+                    ano_padrao=selected_year,
+                    status_default=STATUS_DEFAULT,
+                )
     else:
         if selected_month and not df_filtrado.empty:
              st.error("Erro na coluna 'Valor' do DataFrame filtrado. Verifique a planilha.")
         elif selected_month:
              st.info(f"Sem transações para o mês de **{selected_month}**.")
 
+    # === BUSCA NO ANO (índice em memória; só montado na primeira busca) ===
+    st.markdown("---")
+    if st.toggle(f"🔎 Buscar transações de {selected_year}", key="mostrar_busca"):
+        with instrumentacao.etapa("busca"):
+            encontradas = renderizar_busca(
+                lambda **filtros: buscar_transacoes(selected_year, fila_mutacoes, **filtros),
+                {'Categoria': CATEGORIAS, 'Status': list(STATUS_PRIORIDADE), 'Mês': todos_os_meses_pt},
+                chave=f"busca_{selected_year}",
+            )
+        if encontradas is not None and not encontradas.empty:
+            renderizar_lista(
+                ordenar_para_exibicao(encontradas).sort_values('Mes_Num', kind='stable'),
+                chave=f"pagina_busca_{selected_year}",
+                ao_deletar=lambda id_transacao: deletar_transacao(armazenamento, id_transacao, selected_year),
+                ao_atualizar=lambda id_transacao, dados: atualizar_transacao(armazenamento, id_transacao, dados, selected_year),
+                meses=todos_os_meses_pt,
+                anos=opcoes_ano,
+                ano_padrao=selected_year,
+                status_default=STATUS_DEFAULT,
+                prefixo="busca_",
+            )
+
+    # === TENDÊNCIAS DO ANO (só calculadas quando abertas; memorizadas pela versão dos dados) ===
+    st.markdown("---")
+    if st.toggle(f"📈 Tendências de {selected_year}", key="mostrar_tendencias"):
+        with instrumentacao.etapa("tendencias"):
+            if armazenamento.consulta_nativa:
+                # GROUP BY do ano no SQLite; a chave é o contador de alterações do banco
+                tendencias = tendencias_do_ano(
+                    lambda: armazenamento.kpis_ano(selected_year),
+                    selected_year, (armazenamento.nome, armazenamento.versao(selected_year)),
+                )
+            else:
+                # Tabela de KPIs já mantida pelo cache (com a visão otimista da fila aplicada), com
+                # as versões lidas junto com ela: uma recarga no meio não memoriza a tabela velha
+                tendencias = tendencias_do_ano(
+                    lambda: tabela_kpis, selected_year, (armazenamento.nome, versao_cache, versao_fila),
+                )
+            renderizar_tendencias(tendencias, selected_year)
+
+    # === EXPORTAÇÃO (PARQUET/CSV/XLSX) ===
+    # Usa os DataFrames já carregados/filtrados; o arquivo só é gerado no clique
+    with st.expander("⬇️ Exportar transações"):
+        renderizar_exportacao(
+            {
+                f"Mês ({selected_month})": (lambda: df_filtrado, selected_month),
+                f"Ano inteiro ({selected_year})": (
+                    (lambda: armazenamento.carregar(selected_year)) if armazenamento.consulta_nativa
+                    else (lambda: df_transacoes),
+                    None,
+                ),
+            },
+            selected_year,
+        )
+
 
 with st.sidebar:
     st.markdown("---")
-    st.caption(f"Última leitura de dados (Cache/Sheets): {datetime.now().strftime('%H:%M:%S')}")
+    cache_ano = obter_cache(selected_year)
+    if cache_ano.carregado():
+        st.caption(
+            f"Dados carregados às {datetime.fromtimestamp(cache_ano.carregado_em):%H:%M:%S} · versão {cache_ano.versao}"
+            + (" · atualizando em segundo plano…" if cache_ano.recarregando else "")
+        )
+    else:
+        st.caption(f"Última leitura de dados: {datetime.now().strftime('%H:%M:%S')}")
+    mostrar_diagnostico = st.toggle("Mostrar diagnóstico de desempenho", key="mostrar_diagnostico")
+
+if mostrar_diagnostico:
+    renderizar_painel(instrumentacao, "carregar_dados", controle_cota=obter_controle_cota() if ARMAZENAMENTO == "sheets" else None)
+
+instrumentacao.finalizar_execucao()
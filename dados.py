@@ -0,0 +1,117 @@
+# dados.py (ESQUEMA DA ABA TRANSACOES, LIMPEZA E ORDENAÇÃO DO DATAFRAME — SEM DEPENDER DO STREAMLIT)
+import numpy as np
+import pandas as pd
+
+# --- CONFIGURAÇÕES DA PLANILHA ---
+SHEET_ID = "1UgLkIHyl1sDeAUeUUn3C6TfOANZFn6KD9Yvd-OkDkfQ" 
+ABA_TRANSACOES = "TRANSACOES" 
+COLUNAS_SIMPLIFICADAS = ['ID Transacao', 'Mês', 'Descricao', 'Categoria', 'Valor', 'Status', 'Ano']
+STATUS_DEFAULT = 'PAGO' 
+CATEGORIAS = ['Despesa', 'Receita'] # Ordem das categorias: ordenar por Categoria (decrescente) põe Receitas primeiro
+ABA_RECORRENCIAS = "RECORRENCIAS" # Modelos de transações recorrentes (ver recorrencias.py)
+COLUNAS_RECORRENCIAS = ['ID Modelo', 'Descricao', 'Categoria', 'Valor', 'Status', 'Frequencia', 'Inicio', 'Fim']
+
+# Lista de meses em português para uso na UI e como chave de ordenação
+MESES_PT = {
+    1: 'Jan', 2: 'Fev', 3: 'Mar', 4: 'Abr', 
+    5: 'Mai', 6: 'Jun', 7: 'Jul', 8: 'Ago', 
+    9: 'Set', 10: 'Out', 11: 'Nov', 12: 'Dez'
+}
+
+# Mapeamento para priorizar PENDENTE (1) sobre PAGO (2) nas Despesas
+STATUS_PRIORIDADE = {
+    'PENDENTE': 1,
+    'PAGO': 2
+}
+
+# =================================================================
+# === LIMPEZA E ORDENAÇÃO ===
+# =================================================================
+
+def _categorica(serie, categorias):
+    """Categórica com as categorias conhecidas primeiro (iguais em toda carga) e valores inesperados no fim."""
+    extras = sorted(set(serie.dropna().unique()) - set(categorias))
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.set_categories(list(categorias) + extras) # Só troca as categorias, sem recodificar texto
+    return pd.Categorical(serie, categories=list(categorias) + extras)
+
+def preparar_transacoes(df_transacoes):
+    """
+    Limpeza padrão e esquema compacto do DataFrame carregado.
+
+    Descarta linhas sem Mês válido ou sem Valor numérico e troca Valor
+    (float) por Centavos (int64, sem resíduos de arredondamento nas somas).
+    Mês (ordenado Jan..Dez), Categoria e Status (com default) viram
+    categóricas, Mes_Num é int8 e Ano Int16. Só as linhas válidas são
+    copiadas, uma vez.
+    """
+    if df_transacoes.empty:
+        return df_transacoes
+
+    valor = pd.to_numeric(df_transacoes['Valor'], errors='coerce')
+    mes = pd.Categorical(df_transacoes['Mês'], categories=list(MESES_PT.values()), ordered=True)
+    validas = valor.notna().to_numpy() & (mes.codes >= 0)
+
+    df_transacoes = df_transacoes[validas]
+    status = df_transacoes['Status'] if 'Status' in df_transacoes.columns else pd.Series(pd.NA, index=df_transacoes.index)
+    tipadas = {
+        'Mês': mes[validas],
+        'Categoria': _categorica(df_transacoes['Categoria'], CATEGORIAS),
+        'Status': _categorica(status.where(status.notna() & status.ne(''), STATUS_DEFAULT), STATUS_PRIORIDADE),
+        'Centavos': (valor[validas] * 100).round().astype('int64'),
+        'Mes_Num': (mes.codes[validas] + 1).astype('int8'),
+    }
+    if 'Ano' in df_transacoes.columns:
+        tipadas['Ano'] = pd.to_numeric(df_transacoes['Ano'], errors='coerce').astype('Int16')
+    return df_transacoes.assign(**tipadas).drop(columns='Valor')
+
+def concatenar_transacoes(*dfs):
+    """`pd.concat` de DataFrames já preparados sem perder as categóricas (categorias diferentes viram a união)."""
+    df = pd.concat(dfs, ignore_index=True)
+    for coluna, categorias in (('Categoria', CATEGORIAS), ('Status', STATUS_PRIORIDADE)):
+        if coluna in df.columns and not isinstance(df[coluna].dtype, pd.CategoricalDtype):
+            df[coluna] = _categorica(df[coluna], categorias)
+    return df
+
+def atualizar_preparadas(anterior, brutas, ids_alterados, linhas_por_id):
+    """
+    Reaproveita um DataFrame já preparado quando só algumas linhas mudaram.
+
+    Descarta de `anterior` as linhas de `ids_alterados` e as que saíram da
+    planilha (ID fora de `linhas_por_id`), renumera `_linha` das demais e
+    prepara só `brutas` (conteúdo atual das linhas alteradas). O resultado
+    volta na ordem da planilha, com as mesmas categorias que a limpeza
+    completa daria (valores inesperados que sumiram saem das categóricas).
+    """
+    # Membro-a-membro no dict: Series.map(dict)/Index.get_indexer montariam uma tabela hash do ano inteiro
+    alterados = set(ids_alterados)
+    linhas = np.array([
+        0 if id_linha in alterados else linhas_por_id.get(id_linha, 0) # 0: descartar (alterada ou fora da planilha)
+        for id_linha in anterior['ID Transacao'].astype(str).str.strip().tolist()
+    ], dtype='int64')
+    manter = linhas > 0
+    mantidas = anterior[manter].assign(_linha=linhas[manter])
+    novas = preparar_transacoes(brutas)
+    if not novas.empty:
+        mantidas = concatenar_transacoes(mantidas, novas)
+    for coluna, categorias in (('Categoria', CATEGORIAS), ('Status', STATUS_PRIORIDADE)):
+        if coluna in mantidas.columns and len(mantidas[coluna].cat.categories) > len(categorias):
+            mantidas[coluna] = _categorica(mantidas[coluna], categorias)
+    return mantidas.sort_values('_linha', ignore_index=True)
+
+def valores_reais(df):
+    """Coluna Centavos convertida para reais (float), para exibição e exportação."""
+    return df['Centavos'] / 100
+
+def ordenar_para_exibicao(df_filtrado):
+    """Ordem da tabela detalhada: Receitas primeiro, depois PENDENTE antes de PAGO, maior valor primeiro."""
+    return df_filtrado.assign(
+        Ordem_Status=df_filtrado['Status'].map(STATUS_PRIORIDADE).astype('float64')
+    ).sort_values(
+        by=['Categoria', 'Ordem_Status', 'Centavos'], 
+        ascending=[
+            False, # Categoria (Receita Z->A) primeiro
+            True,  # Ordem_Status (PENDENTE 1->2) segundo
+            False  # Valor (Maior->Menor) para desempate
+        ]
+    )
@@ -0,0 +1,493 @@
+# espelho_local.py (ESPELHO LOCAL EM SQLITE DA ABA TRANSACOES COM SINCRONIZAÇÃO INCREMENTAL)
+import operator
+import os
+import sqlite3
+import threading
+from collections import Counter
+from datetime import datetime
+
+import pandas as pd
+
+PASTA_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+CAMINHO_ESPELHO_PADRAO = os.path.join(PASTA_CACHE, "espelho_transacoes.sqlite")
+LINHA_CABECALHO = 1  # A linha 1 da planilha é o cabeçalho; dados começam na linha 2
+LIMITE_ALTERACOES = 5000 # IDs alterados guardados entre duas leituras; acima disso, quem lê refaz a carga completa
+LOTE_PARAMETROS = 900    # Parâmetros por consulta `IN (...)` (limite antigo do SQLite: 999)
+JANELA_VERIFICACAO = 2000 # Linhas com o conteúdo conferido a cada sincronização, em rodízio (edições que não mudam o ID)
+
+# =================================================================
+# === FUNÇÕES AUXILIARES ===
+# =================================================================
+
+def letra_coluna(numero):
+    """Converte o número da coluna (1 = A) para a letra usada na notação A1."""
+    letras = ""
+    while numero > 0:
+        numero, resto = divmod(numero - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+def caminho_espelho(titulo_aba):
+    """Arquivo SQLite do espelho de uma aba (um arquivo por aba/partição)."""
+    return os.path.join(PASTA_CACHE, f"espelho_{titulo_aba}.sqlite")
+
+def titulos_com_espelho(pasta=PASTA_CACHE):
+    """Títulos das abas que já têm espelho em disco (sem abrir os arquivos nem a planilha)."""
+    if not os.path.isdir(pasta):
+        return []
+    return [
+        nome[len("espelho_"):-len(".sqlite")] for nome in os.listdir(pasta)
+        if nome.startswith("espelho_") and nome.endswith(".sqlite")
+    ]
+
+def _normalizar_id(valor):
+    """IDs vazios (None/'') não servem como chave de diff."""
+    if valor is None:
+        return ""
+    return str(valor).strip()
+
+def _valor_espelho(valor):
+    """Valor gravado pelo app no formato que a planilha devolveria (UNFORMATTED_VALUE): vazio vira ''."""
+    if valor is None or pd.isna(valor):
+        return ""
+    if hasattr(valor, "item"): # Escalares do numpy
+        valor = valor.item()
+    return valor if isinstance(valor, (bool, int, float)) else str(valor)
+
+def _completar_linha(valores, largura):
+    """Completa (ou corta) a linha para ter exatamente `largura` células."""
+    valores = list(valores)[:largura]
+    return valores + [""] * (largura - len(valores))
+
+def _intercalar(quantidade, anterior, proxima):
+    """
+    `quantidade` valores de ordem entre `anterior` e `proxima` (qualquer um
+    pode ser None: início/fim da tabela), ou None se não couberem mais
+    (a precisão do float se esgotou entre as duas vizinhas).
+    """
+    if anterior is None and proxima is None:
+        return [float(i) for i in range(quantidade)]
+    if proxima is None:
+        return [anterior + i for i in range(1, quantidade + 1)]
+    if anterior is None:
+        return [proxima - quantidade + i for i in range(quantidade)]
+    passo = (proxima - anterior) / (quantidade + 1)
+    ordens = [anterior + passo * i for i in range(1, quantidade + 1)]
+    if not all(a < b for a, b in zip([anterior] + ordens, ordens + [proxima])):
+        return None
+    return ordens
+
+# =================================================================
+# === ESPELHO LOCAL ===
+# =================================================================
+
+class EspelhoLocal:
+    """
+    Cópia persistente (SQLite) da aba TRANSACOES.
+
+    As linhas ficam na ordem da planilha por uma coluna `ordem` (não é o
+    número da linha): excluir linhas não renumera nada e uma linha nova
+    recebe uma ordem entre as vizinhas. O número da linha na planilha sai
+    da posição na ordem, na leitura.
+
+    A sincronização incremental lê a coluna de IDs e, na mesma chamada, o
+    conteúdo de uma janela de JANELA_VERIFICACAO linhas (em rodízio; a aba
+    inteira se for menor que isso). Linhas com ID novo são baixadas,
+    linhas que saíram são apagadas e linhas da janela com conteúdo
+    diferente (editadas à mão ou por outro processo, sem mudar o ID) são
+    regravadas. Uma ressincronização completa só acontece quando forçada ou
+    quando o espelho ainda está vazio. As gravações do próprio app entram
+    na hora, por `atualizar_linhas`, sem esperar a janela.
+
+    `revisao` (em memória) aumenta a cada mudança no conteúdo e serve de
+    impressão digital barata: quem guardou algo derivado do espelho na
+    revisão R pergunta `alteracoes_desde(R)` quais IDs mudaram desde então
+    e só reprocessa essas linhas.
+
+    O `worksheet` recebido em `sincronizar` só precisa oferecer `batch_get`
+    e `get_all_values` (mesma assinatura do gspread), o que permite usar uma
+    planilha falsa em memória.
+    """
+
+    def __init__(self, caminho=CAMINHO_ESPELHO_PADRAO):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        if caminho != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor TEXT)")
+        colunas = [coluna[1] for coluna in self._conn.execute("PRAGMA table_info(linhas)")]
+        if colunas and "ordem" not in colunas:
+            # Espelho do formato antigo (número da linha como chave primária): baixa tudo de novo
+            with self._conn:
+                self._conn.execute("DROP TABLE linhas")
+                self._conn.execute("DELETE FROM meta WHERE chave = 'cabecalho'")
+        self.revisao = 0
+        self._alterados = set()    # IDs com conteúdo novo, alterado ou removido desde `_alterados_desde`
+        self._alterados_desde = 0
+        self._cursor_verificacao = 0 # Posição (0 = primeira linha de dados) onde começa a próxima janela
+
+    # --- Metadados ---
+
+    def _meta(self, chave, padrao=None):
+        linha = self._conn.execute("SELECT valor FROM meta WHERE chave = ?", (chave,)).fetchone()
+        return linha[0] if linha else padrao
+
+    def _gravar_meta(self, **valores):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO meta (chave, valor) VALUES (?, ?)",
+            [(chave, str(valor)) for chave, valor in valores.items()],
+        )
+
+    @property
+    def cabecalho(self):
+        valor = self._meta("cabecalho")
+        return valor.split("\x1f") if valor else []
+
+    @property
+    def ultima_sincronizacao(self):
+        return self._meta("ultima_sincronizacao")
+
+    def vazio(self):
+        return not self.cabecalho
+
+    # --- Leitura ---
+
+    def carregar(self):
+        """Devolve o conteúdo do espelho como DataFrame, na ordem da planilha, com a coluna `_linha`."""
+        cabecalho = self.cabecalho
+        if not cabecalho:
+            return pd.DataFrame()
+        # read_sql monta as colunas direto do cursor, sem a lista intermediária de linhas
+        colunas_sql = ", ".join(f"c{i}" for i in range(len(cabecalho)))
+        with self._lock:
+            df = pd.read_sql_query(f"SELECT {colunas_sql} FROM linhas ORDER BY ordem", self._conn)
+        df = df.set_axis(cabecalho, axis=1)
+        df.insert(0, "_linha", range(LINHA_CABECALHO + 1, LINHA_CABECALHO + 1 + len(df)))
+        return df
+
+    def carregar_ids(self, ids, linhas_por_id=None):
+        """
+        Só as linhas dos `ids` pedidos (mesmo formato de `carregar`, sem ordem
+        garantida). `linhas_por_id` (de `ids_por_linha`) evita reler a ordem.
+        """
+        cabecalho = self.cabecalho
+        ids = list(ids)
+        if not cabecalho or not ids:
+            return pd.DataFrame(columns=["_linha"] + cabecalho)
+        if linhas_por_id is None:
+            linhas_por_id = self.ids_por_linha()
+        colunas_sql = ", ".join(f"c{i}" for i in range(len(cabecalho)))
+        partes = []
+        with self._lock:
+            for inicio in range(0, len(ids), LOTE_PARAMETROS):
+                lote = ids[inicio:inicio + LOTE_PARAMETROS]
+                partes.append(pd.read_sql_query(
+                    f"SELECT id, {colunas_sql} FROM linhas WHERE id IN ({', '.join('?' * len(lote))})",
+                    self._conn, params=lote,
+                ))
+        df = pd.concat(partes, ignore_index=True)
+        linhas = pd.Series([linhas_por_id[i] for i in df.pop("id")], dtype="int64") # Series.map(dict) montaria um índice do dict inteiro
+        df = df.set_axis(cabecalho, axis=1)
+        df.insert(0, "_linha", linhas)
+        return df
+
+    def ids_por_linha(self):
+        """Mapa {ID: linha na planilha} conforme a última sincronização."""
+        if self.vazio():
+            return {}
+        with self._lock:
+            ids = self._conn.execute("SELECT id FROM linhas ORDER BY ordem").fetchall()
+        return {id_linha: LINHA_CABECALHO + 1 + posicao for posicao, (id_linha,) in enumerate(ids) if id_linha}
+
+    # --- Revisão e alterações ---
+
+    def alteracoes_desde(self, revisao):
+        """
+        IDs cujas linhas mudaram (novas, alteradas ou removidas) desde `revisao`;
+        pode incluir IDs mais antigos. None quando não dá para saber (carga
+        completa, IDs vazios/repetidos envolvidos, muitas alterações): quem
+        pergunta deve reler tudo. Linhas só renumeradas não aparecem.
+        """
+        with self._lock:
+            if revisao == self.revisao:
+                return set()
+            if revisao < self._alterados_desde:
+                return None
+            return set(self._alterados)
+
+    def confirmar(self, revisao):
+        """Quem lê já processou tudo até `revisao`: as alterações guardadas podem ser descartadas."""
+        with self._lock:
+            if revisao == self.revisao:
+                self._alterados.clear()
+                self._alterados_desde = revisao
+
+    def _registrar_alteracao(self, ids=(), estrutural=False):
+        """Nova revisão; `estrutural` (ou alterações demais) faz `alteracoes_desde` das revisões anteriores devolver None."""
+        self.revisao += 1
+        self._alterados.update(ids)
+        if estrutural or len(self._alterados) > LIMITE_ALTERACOES:
+            self._alterados.clear()
+            self._alterados_desde = self.revisao
+
+    # --- Sincronização ---
+
+    def sincronizar(self, worksheet, forcar=False):
+        """
+        Atualiza o espelho a partir da planilha e devolve um resumo da operação.
+
+        Caminho incremental: um `batch_get` com a coluna de IDs e a janela de
+        verificação (1 chamada) e, se houver IDs novos fora da janela, outro
+        `batch_get` só com essas linhas. Linhas removidas somem do espelho;
+        linhas da janela que mudaram de conteúdo são regravadas.
+        """
+        with self._lock:
+            if forcar or self.vazio():
+                return self._sincronizar_completo(worksheet)
+            return self._sincronizar_incremental(worksheet)
+
+    def _criar_tabela(self, largura):
+        self._conn.execute("DROP TABLE IF EXISTS linhas")
+        colunas_sql = ", ".join(f"c{i}" for i in range(largura))
+        self._conn.execute(
+            f"CREATE TABLE linhas (ordem REAL NOT NULL, id TEXT{', ' if largura else ''}{colunas_sql})"
+        )
+        self._conn.execute("CREATE INDEX idx_linhas_ordem ON linhas (ordem)")
+        self._conn.execute("CREATE INDEX idx_linhas_id ON linhas (id)")
+
+    def _sincronizar_completo(self, worksheet):
+        valores = worksheet.get_all_values(value_render_option='UNFORMATTED_VALUE')
+        if not valores:
+            cabecalho, dados = [], []
+        else:
+            cabecalho, dados = [str(c) for c in valores[0]], valores[1:]
+
+        largura = len(cabecalho)
+        registros = [
+            (float(posicao), _normalizar_id(linha[0] if linha else ""), *_completar_linha(linha, largura))
+            for posicao, linha in enumerate(dados)
+        ]
+
+        with self._conn:
+            self._criar_tabela(largura)
+            self._inserir(registros, largura)
+            self._gravar_meta(
+                cabecalho="\x1f".join(cabecalho),
+                ultima_sincronizacao=datetime.now().isoformat(timespec='seconds'),
+            )
+        self._cursor_verificacao = 0
+        self._registrar_alteracao(estrutural=True)
+        return {
+            "modo": "completo", "linhas": len(registros), "baixadas": len(registros), "removidas": 0,
+            "editadas": 0, "verificadas": len(registros),
+        }
+
+    def _conteudo_locais(self, rowids, largura):
+        """{rowid: [c0, c1, ...]} das linhas pedidas do espelho."""
+        rowids = list(rowids)
+        colunas_sql = ", ".join(["rowid"] + [f"c{i}" for i in range(largura)])
+        conteudo = {}
+        for inicio in range(0, len(rowids), LOTE_PARAMETROS):
+            lote = rowids[inicio:inicio + LOTE_PARAMETROS]
+            for rowid, *valores in self._conn.execute(
+                f"SELECT {colunas_sql} FROM linhas WHERE rowid IN ({', '.join('?' * len(lote))})", lote,
+            ):
+                conteudo[rowid] = valores
+        return conteudo
+
+    def _editadas(self, verificar, conteudo_janela, largura):
+        """(valores..., rowid) das linhas de `verificar` ({rowid: posição}) cujo conteúdo na janela mudou."""
+        return [
+            (*conteudo_janela[verificar[rowid]], rowid)
+            for rowid, valores in self._conteudo_locais(verificar, largura).items()
+            if valores != conteudo_janela[verificar[rowid]]
+        ]
+
+    def _regravar(self, editadas, largura):
+        if editadas:
+            atribuicoes = ", ".join(f"c{i} = ?" for i in range(largura))
+            self._conn.executemany(f"UPDATE linhas SET {atribuicoes} WHERE rowid = ?", editadas)
+
+    def _sincronizar_incremental(self, worksheet):
+        largura = len(self.cabecalho)
+        ultima = letra_coluna(largura)
+        primeira = LINHA_CABECALHO + 1
+        pares_locais = self._conn.execute("SELECT rowid, ordem, id FROM linhas ORDER BY ordem").fetchall()
+
+        # Janela de verificação: a aba inteira se couber; senão JANELA_VERIFICACAO linhas a partir do cursor
+        if len(pares_locais) <= JANELA_VERIFICACAO:
+            inicio_janela, faixa_janela = 0, f"A{primeira}:{ultima}"
+        else:
+            inicio_janela = self._cursor_verificacao if self._cursor_verificacao < len(pares_locais) else 0
+            fim = primeira + inicio_janela + JANELA_VERIFICACAO - 1
+            faixa_janela = f"A{primeira + inicio_janela}:{ultima}{fim}"
+        coluna_ids, janela = worksheet.batch_get(
+            [f"A{primeira}:A", faixa_janela], value_render_option='UNFORMATTED_VALUE',
+        )
+        ids_remotos = [_normalizar_id(linha[0] if linha else "") for linha in coluna_ids]
+        while ids_remotos and not ids_remotos[-1]:
+            ids_remotos.pop() # Como o col_values: linhas vazias no fim não contam
+        conteudo_janela = {
+            inicio_janela + deslocamento: _completar_linha(valores, largura)
+            for deslocamento, valores in enumerate(janela)
+            if inicio_janela + deslocamento < len(ids_remotos)
+        }
+        if len(pares_locais) > JANELA_VERIFICACAO:
+            proximo = inicio_janela + JANELA_VERIFICACAO
+            self._cursor_verificacao = proximo if proximo < len(ids_remotos) else 0
+
+        # Caminho rápido: mesma coluna de IDs, na mesma ordem e sem vazios/repetidos -> só a conferência da janela
+        ids_locais = [id_local for _, _, id_local in pares_locais]
+        if ids_locais == ids_remotos and "" not in ids_remotos and len(set(ids_remotos)) == len(ids_remotos):
+            verificar = {pares_locais[posicao][0]: posicao for posicao in conteudo_janela}
+            editadas = self._editadas(verificar, conteudo_janela, largura)
+            with self._conn:
+                self._regravar(editadas, largura)
+                self._gravar_meta(ultima_sincronizacao=datetime.now().isoformat(timespec='seconds'))
+            if editadas:
+                self._registrar_alteracao(ids_remotos[verificar[rowid]] for *_, rowid in editadas)
+            return {
+                "modo": "incremental", "linhas": len(ids_remotos), "baixadas": 0, "removidas": 0,
+                "editadas": len(editadas), "verificadas": len(verificar),
+            }
+
+        # IDs vazios ou repetidos não permitem diff seguro: essas linhas sempre são rebaixadas
+        contagem_remota = Counter(ids_remotos)
+        contagem_local = Counter(id_local for _, _, id_local in pares_locais)
+        locais = {
+            id_local: (rowid, ordem) for rowid, ordem, id_local in pares_locais
+            if id_local and contagem_local[id_local] == 1
+        }
+        mantidas, novas = {}, [] # posição remota -> (rowid, ordem) | posições a baixar
+        for posicao, id_remoto in enumerate(ids_remotos):
+            if id_remoto and contagem_remota[id_remoto] == 1 and id_remoto in locais:
+                mantidas[posicao] = locais[id_remoto]
+            else:
+                novas.append(posicao)
+        ids_mantidos = {ids_remotos[posicao] for posicao in mantidas}
+        descartadas = [rowid for rowid, _, id_local in pares_locais if id_local not in ids_mantidos]
+        removidas = [i for i in locais if i not in ids_mantidos]
+
+        # Ordem das linhas novas entre as vizinhas mantidas; se as mantidas trocaram de lugar
+        # (ou não há espaço entre duas ordens), todas recebem a posição atual
+        ordens_mantidas = [ordem for _, ordem in mantidas.values()] # Na ordem das posições remotas
+        renumerar = not all(map(operator.lt, ordens_mantidas, ordens_mantidas[1:]))
+        ordens_novas = {}
+        for inicio, fim in ([] if renumerar else self._agrupar_faixas(novas)):
+            anterior = mantidas[inicio - 1][1] if inicio > 0 else None
+            proxima = mantidas[fim + 1][1] if fim + 1 < len(ids_remotos) else None
+            ordens = _intercalar(fim - inicio + 1, anterior, proxima)
+            if ordens is None:
+                renumerar = True
+                break
+            ordens_novas.update(zip(range(inicio, fim + 1), ordens))
+        if renumerar:
+            ordens_novas = {posicao: float(posicao) for posicao in novas}
+
+        # Conteúdo das linhas novas: da janela ou de um batch_get só com as que ficaram de fora
+        conteudo_novas = {posicao: conteudo_janela[posicao] for posicao in novas if posicao in conteudo_janela}
+        faltantes = [primeira + posicao for posicao in novas if posicao not in conteudo_janela]
+        if faltantes:
+            faixas = self._agrupar_faixas(faltantes)
+            blocos = worksheet.batch_get(
+                [f"A{ini}:{ultima}{fim}" for ini, fim in faixas], value_render_option='UNFORMATTED_VALUE',
+            )
+            for (ini, fim), bloco in zip(faixas, blocos):
+                bloco = list(bloco)
+                for deslocamento in range(fim - ini + 1):
+                    valores = bloco[deslocamento] if deslocamento < len(bloco) else []
+                    conteudo_novas[ini + deslocamento - primeira] = _completar_linha(valores, largura)
+        novos_registros = [
+            (ordens_novas[posicao], ids_remotos[posicao], *conteudo_novas[posicao]) for posicao in novas
+        ]
+
+        # Linhas sem ID único são rebaixadas a cada sincronização: se voltaram iguais e no mesmo lugar, nada mudou
+        baixadas = len(novos_registros)
+        if descartadas and not removidas and len(descartadas) == len(novos_registros) and not renumerar:
+            posicoes_locais = {rowid: posicao for posicao, (rowid, _, _) in enumerate(pares_locais)}
+            conteudo = self._conteudo_locais(descartadas, largura)
+            anteriores = sorted(
+                (posicoes_locais[rowid], id_local, *conteudo[rowid])
+                for rowid, _, id_local in pares_locais if rowid in conteudo
+            )
+            if anteriores == [(posicao, ids_remotos[posicao], *conteudo_novas[posicao]) for posicao in novas]:
+                descartadas, novos_registros = [], []
+
+        # Conferência de conteúdo: linhas mantidas da janela que mudaram sem mudar o ID
+        verificar = {mantidas[posicao][0]: posicao for posicao in conteudo_janela if posicao in mantidas}
+        editadas = self._editadas(verificar, conteudo_janela, largura)
+
+        with self._conn:
+            self._conn.executemany("DELETE FROM linhas WHERE rowid = ?", [(rowid,) for rowid in descartadas])
+            if renumerar:
+                self._conn.executemany(
+                    "UPDATE linhas SET ordem = ? WHERE rowid = ?",
+                    [(float(posicao), rowid) for posicao, (rowid, _) in mantidas.items()],
+                )
+            self._regravar(editadas, largura)
+            self._inserir(novos_registros, largura)
+            self._gravar_meta(ultima_sincronizacao=datetime.now().isoformat(timespec='seconds'))
+
+        if descartadas or renumerar or novos_registros or editadas:
+            # Linhas sem ID único (vazio/repetido) não são identificáveis por quem reaproveita o que já leu
+            estrutural = (
+                any(contagem_local[id_local] != 1 or not id_local for _, _, id_local in pares_locais if id_local not in ids_mantidos)
+                or any(not id_remoto or contagem_remota[id_remoto] != 1 for _, id_remoto, *_ in novos_registros)
+            )
+            self._registrar_alteracao(
+                removidas + [id_remoto for _, id_remoto, *_ in novos_registros]
+                + [ids_remotos[verificar[rowid]] for *_, rowid in editadas],
+                estrutural,
+            )
+
+        return {
+            "modo": "incremental",
+            "linhas": len(ids_remotos),
+            "baixadas": baixadas,
+            "removidas": len(removidas),
+            "editadas": len(editadas),
+            "verificadas": len(verificar),
+        }
+
+    def atualizar_linhas(self, linhas_por_id):
+        """
+        Aplica ao espelho atualizações já gravadas na planilha por este app
+        ({ID: dict coluna -> valor}), sem esperar a janela de verificação
+        passar por elas. IDs ausentes do espelho são ignorados.
+        """
+        cabecalho = self.cabecalho
+        if not cabecalho or not linhas_por_id:
+            return 0
+        atribuicoes = ", ".join(f"c{i} = ?" for i in range(len(cabecalho)))
+        with self._lock, self._conn:
+            antes = self._conn.total_changes
+            self._conn.executemany(
+                f"UPDATE linhas SET {atribuicoes} WHERE id = ?",
+                [
+                    (*(_valor_espelho(dados.get(coluna)) for coluna in cabecalho), _normalizar_id(id_transacao))
+                    for id_transacao, dados in linhas_por_id.items()
+                ],
+            )
+            atualizadas = self._conn.total_changes - antes
+            if atualizadas:
+                self._registrar_alteracao(_normalizar_id(i) for i in linhas_por_id)
+        return atualizadas
+
+    def _inserir(self, registros, largura):
+        if not registros:
+            return
+        colunas_sql = ", ".join(["ordem", "id"] + [f"c{i}" for i in range(largura)])
+        marcadores = ", ".join(["?"] * (largura + 2))
+        self._conn.executemany(f"INSERT INTO linhas ({colunas_sql}) VALUES ({marcadores})", registros)
+
+    @staticmethod
+    def _agrupar_faixas(linhas):
+        """Agrupa números (de linha ou posição) consecutivos em faixas (início, fim), inclusive."""
+        faixas = []
+        for linha in sorted(linhas):
+            if faixas and linha == faixas[-1][1] + 1:
+                faixas[-1][1] = linha
+            else:
+                faixas.append([linha, linha])
+        return [tuple(f) for f in faixas]
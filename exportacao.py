@@ -0,0 +1,166 @@
+# exportacao.py (EXPORTAÇÃO DAS TRANSAÇÕES PARA PARQUET/CSV/XLSX: BOTÕES DE DOWNLOAD E LINHA DE COMANDO)
+#
+# Uso pela linha de comando (mesmo carregamento do app, via backend de armazenamento):
+#   python exportacao.py --ano 2025 --formato parquet --saida transacoes_2025.parquet
+#   python exportacao.py --ano 2025 --mes Jun --formato csv --credenciais conta_servico.json
+#   python exportacao.py --ano 2025 --formato xlsx --armazenamento sqlite
+import argparse
+import io
+import os
+import sys
+
+import pandas as pd
+import streamlit as st
+
+from armazenamento_sheets import ArmazenamentoSheets
+from armazenamento_sqlite import ArmazenamentoSQLite
+from cliente_resiliente import ControleCota, abrir_planilha, envolver_resiliente
+from dados import COLUNAS_SIMPLIFICADAS, MESES_PT, SHEET_ID, STATUS_PRIORIDADE, valores_reais
+
+FORMATOS = {
+    # formato: (extensão, MIME)
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'csv': ('csv', 'text/csv'),
+    'xlsx': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+LIMITE_LINHAS_XLSX = 1_048_575 # Máximo de linhas de dados em uma planilha do Excel (fora o cabeçalho)
+
+# =================================================================
+# === CONVERSÃO ===
+# =================================================================
+
+def tabela_exportacao(df):
+    """
+    Só as colunas da planilha, com tipos explícitos: Mês como categoria
+    ordenada (Jan..Dez), Categoria/Status como categoria, Valor float (dos
+    Centavos) e Ano inteiro. Colunas auxiliares (Mes_Num, _linha...) ficam de fora.
+    """
+    if df is None or df.empty:
+        return pd.DataFrame(columns=COLUNAS_SIMPLIFICADAS)
+    if 'Centavos' in df.columns:
+        df = df.assign(Valor=valores_reais(df))
+    tabela = df.reindex(columns=COLUNAS_SIMPLIFICADAS)
+    return tabela.assign(**{
+        'ID Transacao': tabela['ID Transacao'].astype('string'),
+        'Mês': pd.Categorical(tabela['Mês'], categories=list(MESES_PT.values()), ordered=True),
+        'Descricao': tabela['Descricao'].astype('string'),
+        'Categoria': tabela['Categoria'].astype('category'),
+        'Valor': pd.to_numeric(tabela['Valor'], errors='coerce').astype('float64'),
+        'Status': pd.Categorical(tabela['Status'], categories=list(STATUS_PRIORIDADE)),
+        'Ano': pd.to_numeric(tabela['Ano'], errors='coerce').astype('Int16'),
+    }).reset_index(drop=True)
+
+def exportar(df, formato, destino=None):
+    """
+    Grava `df` no formato pedido em `destino` (caminho ou arquivo binário).
+    Sem `destino`, devolve os bytes (para o botão de download).
+    """
+    tabela = tabela_exportacao(df)
+    saida = io.BytesIO() if destino is None else destino
+    if formato == 'parquet':
+        tabela.to_parquet(saida, engine='pyarrow', compression='zstd', index=False)
+    elif formato == 'csv':
+        # Padrão brasileiro (abre direto no Excel): `;` como separador e vírgula decimal
+        tabela.to_csv(saida, sep=';', decimal=',', index=False, encoding='utf-8-sig')
+    elif formato == 'xlsx':
+        if len(tabela) > LIMITE_LINHAS_XLSX:
+            raise ValueError(f"XLSX comporta até {LIMITE_LINHAS_XLSX} linhas; use Parquet ou CSV.")
+        tabela.to_excel(saida, sheet_name='Transacoes', index=False, engine='openpyxl')
+    else:
+        raise ValueError(f"Formato desconhecido: {formato}. Use um de {', '.join(FORMATOS)}.")
+    return saida.getvalue() if destino is None else None
+
+def formatos_disponiveis():
+    """Formatos cujas dependências opcionais (pyarrow, openpyxl) estão instaladas."""
+    disponiveis = ['csv']
+    for formato, modulo in (('parquet', 'pyarrow'), ('xlsx', 'openpyxl')):
+        try:
+            __import__(modulo)
+        except ImportError:
+            continue
+        disponiveis.append(formato)
+    return [f for f in FORMATOS if f in disponiveis]
+
+def nome_arquivo(formato, ano, mes=None):
+    extensao = FORMATOS[formato][0]
+    return f"transacoes_{ano}{f'_{mes}' if mes else ''}.{extensao}"
+
+# =================================================================
+# === BOTÕES DE DOWNLOAD ===
+# =================================================================
+
+def renderizar_exportacao(escopos, ano, chave="exportacao"):
+    """
+    Botões de download para cada formato disponível.
+
+    `escopos` é {rótulo: (função sem argumentos que devolve o DataFrame, mês ou None)};
+    o arquivo só é gerado quando o botão é clicado (data= função), sem
+    consultar o Sheets: as funções devolvem o DataFrame já carregado/filtrado.
+    """
+    rotulo = st.radio("Exportar", options=list(escopos), horizontal=True, key=f"{chave}_escopo")
+    obter_df, mes = escopos[rotulo]
+    colunas = st.columns(len(FORMATOS))
+    disponiveis = formatos_disponiveis()
+    for coluna, formato in zip(colunas, FORMATOS):
+        coluna.download_button(
+            f"⬇️ {formato.upper()}",
+            data=lambda formato=formato: exportar(obter_df(), formato),
+            file_name=nome_arquivo(formato, ano, mes),
+            mime=FORMATOS[formato][1],
+            key=f"{chave}_{formato}",
+            disabled=formato not in disponiveis,
+            help=None if formato in disponiveis else "Dependência opcional não instalada (pyarrow/openpyxl).",
+            on_click="ignore",
+        )
+
+# =================================================================
+# === LINHA DE COMANDO ===
+# =================================================================
+
+def criar_armazenamento(tipo, credenciais=None, planilha=SHEET_ID):
+    """
+    Mesmo backend usado pelo app: SQLite local ou Google Sheets (com a conta
+    de serviço em `credenciais`). O Sheets abre só para leitura: sem os
+    espelhos e filas do app em `.cache` e sem o timer de descarga.
+    """
+    if tipo == 'sqlite':
+        return ArmazenamentoSQLite()
+
+    from google.oauth2 import service_account # Só o backend sheets precisa dele
+    credenciais = credenciais or os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
+    if not credenciais:
+        raise SystemExit("Informe --credenciais (JSON da conta de serviço) ou GOOGLE_APPLICATION_CREDENTIALS.")
+    creds = service_account.Credentials.from_service_account_file(
+        credenciais, scopes=['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive'],
+    )
+    controle = ControleCota()
+    return ArmazenamentoSheets(
+        envolver_resiliente(abrir_planilha(creds, planilha, controle), controle), somente_leitura=True,
+    )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta as transações de um ano (ou mês) do Controle Financeiro.")
+    parser.add_argument("--ano", type=int, required=True)
+    parser.add_argument("--mes", choices=list(MESES_PT.values()), help="Só um mês (ex.: Jun).")
+    parser.add_argument("--formato", choices=list(FORMATOS), default='parquet')
+    parser.add_argument("--saida", help="Arquivo de saída (padrão: transacoes_<ano>[_<mes>].<formato>).")
+    parser.add_argument("--armazenamento", choices=['sheets', 'sqlite'],
+                        default=os.environ.get("CONTROLE_ARMAZENAMENTO", "sheets"))
+    parser.add_argument("--credenciais", help="JSON da conta de serviço do Google (backend sheets).")
+    parser.add_argument("--planilha", default=SHEET_ID, help="ID da planilha do Google Sheets.")
+    args = parser.parse_args(argv)
+
+    armazenamento = criar_armazenamento(args.armazenamento, args.credenciais, args.planilha)
+    if args.mes:
+        df = armazenamento.consultar_mes(args.ano, args.mes)
+    else:
+        df = armazenamento.carregar(args.ano)
+
+    saida = args.saida or nome_arquivo(args.formato, args.ano, args.mes)
+    with open(saida, "wb") as arquivo:
+        exportar(df, args.formato, arquivo)
+    print(f"{len(df)} transação(ões) exportada(s) para {saida}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
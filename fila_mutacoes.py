@@ -0,0 +1,333 @@
+# fila_mutacoes.py (FILA WRITE-BEHIND: AGRUPA INSERÇÕES, ATUALIZAÇÕES E EXCLUSÕES EM UM ÚNICO BATCH_UPDATE)
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from concorrencia import TENTATIVAS_CONFLITO, ConflitoRevisao
+from dados import concatenar_transacoes
+from espelho_local import PASTA_CACHE
+
+CAMINHO_FILA_PADRAO = os.path.join(PASTA_CACHE, "fila_mutacoes.jsonl")
+INTERVALO_DESCARGA_SEGUNDOS = 5  # Descarrega a fila se a mutação mais antiga tiver esperado isso
+TAMANHO_MAXIMO_FILA = 20         # ...ou assim que houver essa quantidade de mutações pendentes
+
+OP_INSERIR = 'inserir'
+OP_ATUALIZAR = 'atualizar'
+OP_DELETAR = 'deletar'
+
+# =================================================================
+# === FUNÇÕES AUXILIARES ===
+# =================================================================
+
+def caminho_fila(titulo_aba):
+    """Arquivo JSON-lines da fila de uma aba (uma fila por aba/partição)."""
+    return os.path.join(PASTA_CACHE, f"fila_{titulo_aba}.jsonl")
+
+def _valor_celula(valor):
+    """Converte um valor Python em `userEnteredValue` da API do Sheets."""
+    if valor is None:
+        return {}
+    if isinstance(valor, bool):
+        return {"userEnteredValue": {"boolValue": valor}}
+    if isinstance(valor, (int, float)):
+        return {"userEnteredValue": {"numberValue": valor}}
+    return {"userEnteredValue": {"stringValue": str(valor)}}
+
+def _linha_celulas(dados, colunas):
+    return {"values": [_valor_celula(dados.get(col)) for col in colunas]}
+
+# =================================================================
+# === FILA DE MUTAÇÕES ===
+# =================================================================
+
+class FilaMutacoes:
+    """
+    Fila de mutações pendentes (write-behind) da aba TRANSACOES.
+
+    Cada mutação é gravada em um arquivo JSON-lines antes de ser aceita, então
+    uma queda do processo não perde nada: a fila é relida na próxima
+    inicialização. A descarga consolida as mutações por ID (inserir + atualizar
+    vira uma inserção, inserir + excluir se anula) e envia tudo em uma única
+    chamada `spreadsheet.batch_update`.
+    """
+
+    def __init__(self, colunas, caminho=CAMINHO_FILA_PADRAO,
+                 intervalo_segundos=INTERVALO_DESCARGA_SEGUNDOS, tamanho_maximo=TAMANHO_MAXIMO_FILA):
+        self.colunas = list(colunas)
+        self.caminho = caminho
+        self.intervalo_segundos = intervalo_segundos
+        self.tamanho_maximo = tamanho_maximo
+        self._lock = threading.RLock() # Protege a lista e o arquivo (rápido: nunca fica preso à rede)
+        self._lock_descarga = threading.Lock() # Uma descarga por vez
+        self._mutacoes = []
+        self.versao = 0 # Aumenta a cada mutação aceita ou descarregada (chave de resultados da visão otimista)
+        self._timer = None
+        self._parar = threading.Event()
+        self.ultimo_erro = None
+        self.conflitos = 0 # Lotes recusados porque outro processo gravou a aba antes (e refeitos)
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        self._recuperar()
+
+    def __len__(self):
+        return len(self._mutacoes)
+
+    # --- Persistência ---
+
+    def _recuperar(self):
+        """Relê as mutações que ficaram no disco (processo encerrado antes da descarga)."""
+        if not os.path.exists(self.caminho):
+            return
+        with open(self.caminho, encoding="utf-8") as arquivo:
+            for linha in arquivo:
+                linha = linha.strip()
+                if not linha:
+                    continue
+                try:
+                    self._mutacoes.append(json.loads(linha))
+                except json.JSONDecodeError:
+                    # Última linha truncada por uma queda no meio da escrita
+                    break
+
+    def _persistir(self, mutacao):
+        with open(self.caminho, "a", encoding="utf-8") as arquivo:
+            arquivo.write(json.dumps(mutacao, ensure_ascii=False) + "\n")
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+
+    def _esvaziar(self, quantidade):
+        """Remove da fila (e do disco) as `quantidade` primeiras mutações, já gravadas na planilha."""
+        self._mutacoes = self._mutacoes[quantidade:]
+        self.versao += 1
+        temporario = self.caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            for mutacao in self._mutacoes:
+                arquivo.write(json.dumps(mutacao, ensure_ascii=False) + "\n")
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        os.replace(temporario, self.caminho)
+
+    # --- Enfileiramento ---
+
+    def enfileirar(self, op, id_transacao, dados=None):
+        """Aceita uma mutação: só retorna depois de gravá-la no disco."""
+        mutacao = {"op": op, "id": id_transacao, "dados": dados, "ts": time.time()}
+        with self._lock:
+            self._persistir(mutacao)
+            self._mutacoes.append(mutacao)
+            self.versao += 1
+
+    def inserir(self, dados):
+        self.enfileirar(OP_INSERIR, dados['ID Transacao'], dados)
+
+    def atualizar(self, id_transacao, dados):
+        self.enfileirar(OP_ATUALIZAR, id_transacao, dados)
+
+    def deletar(self, id_transacao):
+        self.enfileirar(OP_DELETAR, id_transacao)
+
+    def precisa_descarregar(self):
+        """True quando a fila atingiu o tamanho máximo ou a mutação mais antiga já esperou o intervalo."""
+        with self._lock:
+            if not self._mutacoes:
+                return False
+            if len(self._mutacoes) >= self.tamanho_maximo:
+                return True
+            return time.time() - self._mutacoes[0]["ts"] >= self.intervalo_segundos
+
+    def consolidar(self, mutacoes=None):
+        """Estado final por ID: {id: (op, dados)}, na ordem da primeira mutação de cada ID."""
+        with self._lock:
+            mutacoes = list(self._mutacoes if mutacoes is None else mutacoes)
+        estado = {}
+        for mutacao in mutacoes:
+            id_transacao, op, dados = mutacao["id"], mutacao["op"], mutacao["dados"]
+            anterior = estado.get(id_transacao)
+            if op == OP_INSERIR:
+                estado[id_transacao] = (OP_INSERIR, dados)
+            elif op == OP_ATUALIZAR:
+                if anterior and anterior[0] == OP_INSERIR:
+                    estado[id_transacao] = (OP_INSERIR, dados)
+                else:
+                    estado[id_transacao] = (OP_ATUALIZAR, dados)
+            elif op == OP_DELETAR:
+                if anterior and anterior[0] == OP_INSERIR:
+                    del estado[id_transacao]
+                else:
+                    estado[id_transacao] = (OP_DELETAR, None)
+        return estado
+
+    def ids_pendentes(self):
+        """IDs com alguma mutação ainda não gravada na planilha."""
+        return list(self.consolidar())
+
+    # --- Visão otimista ---
+
+    def aplicar_sobre(self, df, preparar=None):
+        """
+        Devolve `df` com as mutações pendentes já aplicadas (visão otimista).
+
+        `preparar` recebe o DataFrame das linhas inseridas/atualizadas e aplica
+        a mesma limpeza feita na carga, para que as colunas derivadas existam.
+        """
+        estado = self.consolidar()
+        if not estado:
+            return df
+
+        if not df.empty and 'ID Transacao' in df.columns:
+            df = df[~df['ID Transacao'].isin(list(estado))]
+
+        novas = [dados for op, dados in estado.values() if op in (OP_INSERIR, OP_ATUALIZAR)]
+        if not novas:
+            return df
+        df_novas = pd.DataFrame(novas, columns=self.colunas)
+        if preparar is not None:
+            df_novas = preparar(df_novas)
+        if df.empty:
+            return df_novas
+        return concatenar_transacoes(df, df_novas)
+
+    # --- Descarga ---
+
+    def _planejar(self, estado, worksheet, indice):
+        """Separa o estado consolidado nas linhas atuais do índice e monta as requisições do lote."""
+        atualizacoes, remocoes, insercoes, aplicadas, ignoradas = [], [], [], [], 0
+        for id_transacao, (op, dados) in estado.items():
+            linha = indice.linha(id_transacao)
+            if op == OP_INSERIR:
+                if linha is None:
+                    insercoes.append((id_transacao, dados))
+                else:
+                    ignoradas += 1
+                    continue
+            elif linha is None:
+                ignoradas += 1
+                continue
+            elif op == OP_ATUALIZAR:
+                atualizacoes.append((linha, dados))
+            else:
+                remocoes.append(linha)
+            aplicadas.append((op, id_transacao, dados))
+        remocoes.sort(reverse=True)
+
+        requisicoes = [
+            {"updateCells": {
+                "range": {
+                    "sheetId": worksheet.id,
+                    "startRowIndex": linha - 1, "endRowIndex": linha,
+                    "startColumnIndex": 0, "endColumnIndex": len(self.colunas),
+                },
+                "rows": [_linha_celulas(dados, self.colunas)],
+                "fields": "userEnteredValue",
+            }}
+            for linha, dados in atualizacoes
+        ]
+        requisicoes += [
+            {"deleteDimension": {"range": {
+                "sheetId": worksheet.id, "dimension": "ROWS",
+                "startIndex": linha - 1, "endIndex": linha,
+            }}}
+            for linha in remocoes
+        ]
+        if insercoes:
+            requisicoes.append({"appendCells": {
+                "sheetId": worksheet.id,
+                "rows": [_linha_celulas(dados, self.colunas) for _, dados in insercoes],
+                "fields": "userEnteredValue",
+            }})
+        return atualizacoes, remocoes, insercoes, aplicadas, ignoradas, requisicoes
+
+    def descarregar(self, worksheet, indice, revisao=None):
+        """
+        Grava as mutações pendentes com uma leitura (coluna de IDs) e uma escrita (batch_update).
+
+        Ordem das requisições dentro do lote: atualizações (nas linhas atuais),
+        exclusões de baixo para cima (para não deslocar as linhas seguintes) e,
+        por fim, as inserções no fim da tabela. O lote é atômico no Sheets.
+        Reaplicar a fila é seguro: inserções de IDs que já existem na planilha
+        e atualizações/exclusões de IDs ausentes são ignoradas. O resumo traz
+        em `aplicadas` a lista (op, id, dados) efetivamente gravada.
+
+        Com `revisao` (`concorrencia.RevisaoAba`), lotes que endereçam linhas
+        pelo número (atualizações, exclusões) também trocam a revisão da aba.
+        Se outro processo gravou entre a leitura da coluna de IDs e o lote, o
+        lote é recusado inteiro; a coluna é relida e o lote remontado, até
+        TENTATIVAS_CONFLITO vezes (depois, ConflitoRevisao e a fila fica
+        como está). Inserções puras não mudam nenhuma linha existente e vão
+        sem a revisão. A revisão ainda desconhecida é lida antes da coluna de
+        IDs, nunca depois.
+        """
+        with self._lock_descarga:
+            # Só o retrato da fila é tirado sob o lock: inserir/atualizar/deletar não esperam a rede
+            with self._lock:
+                quantidade = len(self._mutacoes)
+                retrato = self._mutacoes[:quantidade]
+            if not quantidade:
+                return {"inseridas": 0, "atualizadas": 0, "removidas": 0, "ignoradas": 0, "aplicadas": []}
+            estado = self.consolidar(retrato)
+            if revisao is not None and revisao.numero is None and any(op != OP_INSERIR for op, _ in estado.values()):
+                # Revisão lida antes da coluna de IDs: uma gravação entre as duas leituras faria o lote
+                # passar pela troca de revisão com a coluna já velha
+                revisao.ler(worksheet)
+
+            for tentativa in range(1, TENTATIVAS_CONFLITO + 1):
+                indice.construir_de_coluna(worksheet.col_values(1))
+                atualizacoes, remocoes, insercoes, aplicadas, ignoradas, requisicoes = self._planejar(
+                    estado, worksheet, indice,
+                )
+                versionado = revisao is not None and bool(atualizacoes or remocoes)
+                if versionado:
+                    requisicoes = revisao.requisicoes(worksheet) + requisicoes
+                if not requisicoes:
+                    break
+                try:
+                    worksheet.spreadsheet.batch_update({"requests": requisicoes})
+                except Exception as e:
+                    if not versionado or not revisao.mudou(worksheet):
+                        raise
+                    self.conflitos += 1
+                    if tentativa == TENTATIVAS_CONFLITO:
+                        raise ConflitoRevisao(
+                            f"A aba {worksheet.title} mudou durante {TENTATIVAS_CONFLITO} tentativas de gravação."
+                        ) from e
+                    continue
+                if versionado:
+                    revisao.confirmar()
+                break
+
+            # Enquanto isso só entraram mutações no fim da fila: as `quantidade` primeiras são o retrato
+            with self._lock:
+                self._esvaziar(quantidade)
+            self.ultimo_erro = None
+            return {
+                "inseridas": len(insercoes),
+                "atualizadas": len(atualizacoes),
+                "removidas": len(remocoes),
+                "ignoradas": ignoradas,
+                "aplicadas": aplicadas,
+                "tentativas": tentativa,
+            }
+
+    # --- Timer de descarga ---
+
+    def iniciar_timer(self, descarregar, intervalo_verificacao=1.0):
+        """Inicia (uma vez) a thread que chama `descarregar()` sempre que `precisa_descarregar()`."""
+        if self._timer is not None:
+            return
+
+        def _laco():
+            while not self._parar.wait(intervalo_verificacao):
+                if self.precisa_descarregar():
+                    try:
+                        descarregar()
+                    except Exception as e:
+                        # Mantém a fila intacta; a próxima verificação tenta de novo
+                        self.ultimo_erro = e
+
+        self._timer = threading.Thread(target=_laco, name="descarga-fila-mutacoes", daemon=True)
+        self._timer.start()
+
+    def parar_timer(self):
+        self._parar.set()
@@ -0,0 +1,96 @@
+# formatacao.py (FORMATAÇÃO MONETÁRIA BR: ESCALAR E VETORIZADA)
+import math
+
+import numpy as np
+import pandas as pd
+
+_VIRGULA, _PONTO = ord(','), ord('.')
+_DIGITO_ZERO = ord('0')
+_PREFIXO = np.frombuffer(b"R$ ", dtype=np.uint8)
+
+# =================================================================
+# === FUNÇÕES DE FORMATAÇÃO E PARSING ===
+# =================================================================
+
+def format_currency(value):
+    """
+    Formata um float (ex: 11.56) para string monetária BR (R$ 11,56).
+
+    Equivalente exato de `format_currency_vetorizado` para um único valor:
+    arredonda para centavos inteiros (meio-para-par), e o sinal fica antes
+    dos dígitos (R$ -1.234,50). None, NaN e infinito viram R$ 0,00.
+    """
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return "R$ 0,00"
+    if not math.isfinite(value):
+        return "R$ 0,00"
+
+    centavos_totais = round(value * 100)
+    sinal = "-" if centavos_totais < 0 else ""
+    reais, centavos = divmod(abs(centavos_totais), 100)
+
+    # Separador de milhar BR (ponto) e vírgula decimal
+    reais_com_ponto = f"{reais:,}".replace(",", ".")
+    return f"R$ {sinal}{reais_com_ponto},{centavos:02d}"
+
+def format_currency_vetorizado(valores):
+    """
+    Versão vetorizada de `format_currency` para uma Series ou array NumPy.
+
+    Todo o trabalho é feito com operações NumPy sobre o array inteiro: os
+    valores viram centavos inteiros, e os caracteres de cada string (dígitos,
+    pontos de milhar, vírgula, sinal) são escritos numa matriz de bytes, uma
+    posição de dígito por vez. Devolve uma Series (mesmo índice) quando recebe
+    uma Series, senão um array de strings.
+    """
+    indice = valores.index if isinstance(valores, pd.Series) else None
+    if isinstance(valores, pd.Series):
+        numeros = pd.to_numeric(valores, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    else:
+        numeros = np.asarray(valores, dtype=float).ravel()
+    numeros = np.where(np.isfinite(numeros), numeros, 0.0)
+    if not len(numeros):
+        return pd.Series([], index=indice, dtype=object) if indice is not None else np.array([], dtype=str)
+
+    centavos_totais = np.rint(numeros * 100).astype(np.int64)
+    negativo = centavos_totais < 0
+    reais, centavos = np.divmod(np.abs(centavos_totais), 100)
+
+    quantidade = len(reais)
+    digitos = np.ones(quantidade, dtype=np.int64)
+    limite = 10
+    while (reais >= limite).any():
+        digitos += reais >= limite
+        limite *= 10
+
+    # Comprimento de cada string: "R$ " + sinal + dígitos + pontos + ",cc"
+    comprimento = 3 + negativo + digitos + (digitos - 1) // 3 + 3
+    largura = int(comprimento.max())
+    matriz = np.zeros((quantidade, largura), dtype=np.uint8) # Bytes nulos à direita somem na conversão
+    linhas = np.arange(quantidade)
+    ultimo = comprimento - 1
+
+    matriz[:, :3] = _PREFIXO
+    matriz[linhas[negativo], 3] = ord('-')
+    matriz[linhas, ultimo] = _DIGITO_ZERO + centavos % 10
+    matriz[linhas, ultimo - 1] = _DIGITO_ZERO + centavos // 10
+    matriz[linhas, ultimo - 2] = _VIRGULA
+
+    restante = reais.copy()
+    for posicao in range(int(digitos.max())):
+        presentes = digitos > posicao
+        # Cada dígito fica após ",cc" e após um ponto a cada três dígitos já escritos
+        matriz[linhas[presentes], (ultimo - (3 + posicao + posicao // 3))[presentes]] = (
+            _DIGITO_ZERO + restante[presentes] % 10
+        )
+        restante //= 10
+        if posicao % 3 == 2:
+            com_ponto = digitos > posicao + 1
+            matriz[linhas[com_ponto], (ultimo - (4 + posicao + posicao // 3))[com_ponto]] = _PONTO
+
+    resultado = matriz.view(f"S{largura}").ravel().astype(str)
+    if indice is not None:
+        return pd.Series(resultado, index=indice, dtype=object)
+    return resultado
@@ -0,0 +1,415 @@
+# importacao.py (IMPORTAÇÃO EM LOTE DE CSV/OFX: LEITURA EM BLOCOS, VALIDAÇÃO, DEDUPLICAÇÃO E GRAVAÇÃO ÚNICA)
+import csv
+import io
+import re
+import unicodedata
+from collections import Counter
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+from dados import COLUNAS_SIMPLIFICADAS, MESES_PT, STATUS_DEFAULT, STATUS_PRIORIDADE
+
+TAMANHO_BLOCO = 20_000 # Linhas lidas e validadas por vez (memória limitada a um bloco do arquivo)
+AMOSTRA_ERROS = 50     # Linhas inválidas guardadas para exibição (as demais só são contadas)
+PREFIXO_ID_IMPORTADO = "IMP-"
+PREFIXO_ID_OFX = "OFX-"
+
+# Campo de destino -> nomes de coluna de origem reconhecidos automaticamente (sem acento, minúsculos)
+SINONIMOS = {
+    'ID Transacao': ['id transacao', 'id', 'identificador', 'fitid'],
+    'Data': ['data', 'data lancamento', 'data da transacao', 'dtposted', 'date'],
+    'Mês': ['mes', 'mes referencia', 'month'],
+    'Ano': ['ano', 'year'],
+    'Descricao': ['descricao', 'historico', 'memo', 'lancamento', 'description'],
+    'Categoria': ['categoria', 'tipo', 'natureza', 'category'],
+    'Valor': ['valor', 'valor (r$)', 'quantia', 'montante', 'trnamt', 'amount'],
+    'Status': ['status', 'situacao'],
+}
+CAMPOS_MAPEAVEIS = list(SINONIMOS)
+
+_MESES_POR_PREFIXO = {
+    unicodedata.normalize('NFKD', nome).encode('ascii', 'ignore').decode().lower(): nome
+    for nome in MESES_PT.values()
+}
+_CATEGORIAS = {
+    'receita': 'Receita', 'entrada': 'Receita', 'credito': 'Receita', 'credit': 'Receita',
+    'despesa': 'Despesa', 'saida': 'Despesa', 'debito': 'Despesa', 'debit': 'Despesa',
+}
+
+# =================================================================
+# === FUNÇÕES AUXILIARES ===
+# =================================================================
+
+def _sem_acento(texto):
+    return unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode().strip().lower()
+
+def sugerir_mapeamento(colunas_origem):
+    """Sugere {campo: coluna de origem ou None} comparando os nomes com SINONIMOS."""
+    normalizadas = {_sem_acento(c): c for c in colunas_origem}
+    return {
+        campo: next((normalizadas[s] for s in sinonimos if s in normalizadas), None)
+        for campo, sinonimos in SINONIMOS.items()
+    }
+
+def converter_valores(serie):
+    """
+    Texto monetário -> float; o último separador é o decimal ('R$ 1.234,56',
+    '-50,00', '1,234.56', '1234.56'). Um separador único seguido de
+    exatamente três dígitos ('1.234', '1,234') é ambíguo: segue o formato
+    das demais linhas do bloco e, sem indício ou com indícios dos dois
+    formatos, vira NaN como os inválidos.
+    """
+    texto = serie.astype('string').str.replace(r'[R$\s]', '', regex=True)
+    virgulas = texto.str.count(',').fillna(0)
+    pontos = texto.str.count(r'\.').fillna(0)
+    ultima_virgula = texto.str.rfind(',').fillna(-1)
+    ultimo_ponto = texto.str.rfind('.').fillna(-1)
+    ambos = (virgulas > 0) & (pontos > 0)
+    um_so = (virgulas + pontos) == 1
+    ambiguo = um_so & (texto.str.len().fillna(0) - ultima_virgula.where(ultima_virgula > ultimo_ponto, ultimo_ponto) == 4)
+    brasileiro = ~ambiguo & (
+        (ambos & (ultima_virgula > ultimo_ponto)) | ((virgulas == 1) & (pontos == 0)) | ((pontos > 1) & (virgulas == 0))
+    )
+    americano = ~ambiguo & (
+        (ambos & (ultimo_ponto > ultima_virgula)) | ((virgulas > 1) & (pontos == 0)) | ((pontos == 1) & (virgulas == 0))
+    )
+    if ambiguo.any():
+        if brasileiro.any() and not americano.any():
+            brasileiro |= ambiguo
+        elif americano.any() and not brasileiro.any():
+            americano |= ambiguo
+    texto = texto.mask(brasileiro, texto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    texto = texto.mask(americano, texto.str.replace(',', '', regex=False))
+    texto = texto.mask(ambiguo & ~brasileiro & ~americano)
+    return pd.to_numeric(texto, errors='coerce')
+
+def converter_meses(serie):
+    """'Jan', 'janeiro', 'Março', '3' ou '03' -> nome de MESES_PT; o resto vira NA."""
+    texto = serie.astype('string').str.strip()
+    numero = pd.to_numeric(texto, errors='coerce')
+    por_nome = {t: _MESES_POR_PREFIXO.get(_sem_acento(t)[:3]) for t in texto.dropna().unique()}
+    return numero.map(MESES_PT).fillna(texto.map(por_nome))
+
+FORMATOS_DATA = ['%d/%m/%Y', '%Y-%m-%d', '%Y%m%d', '%d-%m-%Y', '%d.%m.%Y', '%d/%m/%y']
+
+def converter_datas(serie):
+    """Datas em texto (dd/mm/aaaa, aaaa-mm-dd, aaaammdd do OFX...) -> datetime; a hora é ignorada."""
+    texto = serie.astype('string').str.strip().str.split(r'[\sT\[]', n=1, regex=True).str[0]
+    data = pd.Series(pd.NaT, index=serie.index, dtype='datetime64[ns]')
+    for formato in FORMATOS_DATA:
+        faltando = data.isna() & texto.notna()
+        if not faltando.any():
+            break
+        data = data.fillna(pd.to_datetime(texto.where(faltando), format=formato, errors='coerce'))
+    return data
+
+def hash_conteudo(df):
+    """Hash (uint64) do conteúdo de cada transação: Ano, Mês, Descrição normalizada, Categoria e Valor em centavos."""
+    if df.empty:
+        return pd.Series([], dtype='uint64')
+    chave = pd.DataFrame({
+        'Ano': pd.to_numeric(df['Ano'], errors='coerce').fillna(0).astype('int64'),
+        'Mês': df['Mês'].astype('string'),
+        'Descricao': df['Descricao'].astype('string').str.strip().str.lower(),
+        'Categoria': df['Categoria'].astype('string'),
+        'Centavos': (
+            df['Centavos'].astype('int64') if 'Centavos' in df.columns # DataFrame já preparado
+            else (pd.to_numeric(df['Valor'], errors='coerce').fillna(0) * 100).round().astype('int64')
+        ),
+    })
+    return pd.util.hash_pandas_object(chave, index=False)
+
+# =================================================================
+# === LEITURA EM BLOCOS ===
+# =================================================================
+
+@contextmanager
+def _abrir_texto(arquivo, encoding):
+    """
+    Leitura de texto de um caminho ou de um arquivo binário (ex.: UploadedFile),
+    sem carregá-lo inteiro. O arquivo recebido volta ao início e não é fechado.
+    """
+    if isinstance(arquivo, str):
+        with open(arquivo, encoding=encoding, errors='replace', newline='') as texto:
+            yield texto
+        return
+    arquivo.seek(0)
+    texto = io.TextIOWrapper(arquivo, encoding=encoding, errors='replace', newline='')
+    try:
+        yield texto
+    finally:
+        texto.detach()
+        arquivo.seek(0)
+
+def detectar_separador(arquivo, encoding='utf-8-sig'):
+    """Separador do CSV (`;`, `,`, tab ou `|`) a partir das primeiras linhas."""
+    with _abrir_texto(arquivo, encoding) as texto:
+        amostra = texto.read(64 * 1024)
+    try:
+        return csv.Sniffer().sniff(amostra, delimiters=';,\t|').delimiter
+    except csv.Error:
+        return ';' if amostra.count(';') > amostra.count(',') else ','
+
+def colunas_csv(arquivo, separador, encoding='utf-8-sig'):
+    with _abrir_texto(arquivo, encoding) as texto:
+        return list(pd.read_csv(texto, sep=separador, nrows=0).columns)
+
+def ler_csv_em_blocos(arquivo, separador, tamanho_bloco=TAMANHO_BLOCO, encoding='utf-8-sig'):
+    """Gera DataFrames (tudo como texto) de até `tamanho_bloco` linhas do CSV."""
+    with _abrir_texto(arquivo, encoding) as texto:
+        yield from pd.read_csv(
+            texto, sep=separador, dtype=str, keep_default_na=False,
+            chunksize=tamanho_bloco, skipinitialspace=True,
+        )
+
+_PADRAO_TRANSACAO_OFX = re.compile(r'<STMTTRN>(.*?)</STMTTRN>', re.S | re.I)
+_PADRAO_CAMPO_OFX = re.compile(r'<([A-Z0-9.]+)>([^<\r\n]*)', re.I)
+
+def ler_ofx_em_blocos(arquivo, tamanho_bloco=TAMANHO_BLOCO, encoding='latin-1'):
+    """
+    Gera DataFrames com as transações (<STMTTRN>) de um extrato OFX/QFX.
+
+    O arquivo é lido em pedaços de 64 KB; só o texto ainda não processado
+    fica em memória. Colunas: ID Transacao (OFX-<FITID>), Data, Descricao,
+    Valor (com sinal) e Status (PAGO: extrato só traz lançamentos efetivados).
+    """
+    pendente, registros = "", []
+    with _abrir_texto(arquivo, encoding) as texto:
+        while True:
+            pedaco = texto.read(64 * 1024)
+            pendente += pedaco
+            ultimo_fim = 0
+            for encontrado in _PADRAO_TRANSACAO_OFX.finditer(pendente):
+                campos = {tag.upper(): valor.strip() for tag, valor in _PADRAO_CAMPO_OFX.findall(encontrado.group(1))}
+                registros.append({
+                    'ID Transacao': PREFIXO_ID_OFX + campos['FITID'] if campos.get('FITID') else "",
+                    'Data': campos.get('DTPOSTED', "")[:8],
+                    'Descricao': campos.get('MEMO') or campos.get('NAME', ""),
+                    'Valor': campos.get('TRNAMT', ""),
+                    'Status': 'PAGO',
+                })
+                ultimo_fim = encontrado.end()
+                if len(registros) >= tamanho_bloco:
+                    yield pd.DataFrame(registros)
+                    registros = []
+            if not ultimo_fim:
+                # Nenhuma transação completa ainda: descarta o que vem antes da próxima <STMTTRN>
+                inicio = pendente.upper().rfind('<STMTTRN>')
+                ultimo_fim = inicio if inicio >= 0 else max(0, len(pendente) - len('<STMTTRN>'))
+            pendente = pendente[ultimo_fim:]
+            if not pedaco:
+                break
+    if registros:
+        yield pd.DataFrame(registros)
+
+# =================================================================
+# === NORMALIZAÇÃO E VALIDAÇÃO ===
+# =================================================================
+
+def normalizar_bloco(bloco, mapeamento, ano_padrao, linha_inicial=2):
+    """
+    Converte um bloco lido do arquivo para COLUNAS_SIMPLIFICADAS.
+
+    Mês/Ano vêm das colunas mapeadas ou da coluna de data; Categoria vem da
+    coluna mapeada ou, na falta dela, do sinal do valor (negativo = Despesa),
+    e o Valor gravado é sempre positivo. Devolve (válidas, erros), em que
+    `erros` é uma lista de (linha do arquivo, motivo).
+    """
+    def coluna(campo):
+        origem = mapeamento.get(campo)
+        if origem is None or origem not in bloco.columns:
+            return pd.Series(pd.NA, index=bloco.index, dtype='string')
+        return bloco[origem].astype('string').str.strip().replace('', pd.NA)
+
+    valor = converter_valores(coluna('Valor'))
+
+    data = converter_datas(coluna('Data'))
+    mes = converter_meses(coluna('Mês')).fillna(data.dt.month.map(MESES_PT))
+    ano = pd.to_numeric(coluna('Ano'), errors='coerce').fillna(data.dt.year).fillna(ano_padrao).astype('int64')
+
+    categoria = coluna('Categoria')
+    categoria = categoria.map({c: _CATEGORIAS.get(_sem_acento(c)) for c in categoria.dropna().unique()})
+    categoria = categoria.fillna(pd.Series(valor.lt(0).map({True: 'Despesa', False: 'Receita'}), index=bloco.index))
+
+    status = coluna('Status').str.upper()
+    status = status.where(status.isin(list(STATUS_PRIORIDADE)), STATUS_DEFAULT)
+
+    df = pd.DataFrame({
+        'ID Transacao': coluna('ID Transacao'),
+        'Mês': mes,
+        'Descricao': coluna('Descricao'),
+        'Categoria': categoria,
+        'Valor': valor.abs().round(2),
+        'Status': status,
+        'Ano': ano,
+    }, columns=COLUNAS_SIMPLIFICADAS)
+
+    motivos = pd.Series(pd.NA, index=bloco.index, dtype='string')
+    motivos = motivos.mask(df['Descricao'].isna(), 'descrição vazia')
+    motivos = motivos.mask(df['Mês'].isna(), 'mês/data não reconhecido')
+    motivos = motivos.mask(df['Valor'].isna() | df['Valor'].eq(0), 'valor inválido ou zero')
+    invalidas = motivos.notna()
+
+    linhas = pd.RangeIndex(linha_inicial, linha_inicial + len(bloco))
+    erros = list(zip(linhas[invalidas.to_numpy()], motivos[invalidas]))
+    return df[~invalidas].reset_index(drop=True), erros
+
+# =================================================================
+# === IMPORTAÇÃO ===
+# =================================================================
+
+def id_importado(hash_linha, ocorrencia):
+    """ID de uma linha importada sem ID: hash do conteúdo e, da segunda ocorrência no arquivo em diante, o número dela."""
+    sufixo = f"-{ocorrencia + 1}" if ocorrencia else ""
+    return f"{PREFIXO_ID_IMPORTADO}{hash_linha:016x}{sufixo}"
+
+class _Existentes:
+    """
+    IDs e hashes de conteúdo já gravados, por ano (carregados uma vez por
+    ano, sob demanda). Os hashes são contados: duas compras iguais no mesmo
+    mês são duas linhas.
+    """
+
+    def __init__(self, armazenamento):
+        self._armazenamento = armazenamento
+        self._por_ano = {}
+
+    def do_ano(self, ano):
+        if ano not in self._por_ano:
+            df = self._armazenamento.carregar(ano)
+            if df.empty:
+                self._por_ano[ano] = (set(), Counter())
+            else:
+                self._por_ano[ano] = (set(df['ID Transacao'].astype(str)), Counter(hash_conteudo(df).tolist()))
+        return self._por_ano[ano]
+
+def importar(blocos, mapeamento, armazenamento, ano_padrao, gravar=True):
+    """
+    Valida e deduplica os blocos e grava todas as novas transações com um único `inserir_lote`.
+
+    Linhas com ID (coluna mapeada ou FITID do OFX) são duplicadas se o ID já
+    existe na partição ou apareceu antes no arquivo. Linhas sem ID são
+    numeradas pela ocorrência do seu conteúdo (hash de Ano/Mês/Descrição/
+    Categoria/Valor) no arquivo: a n-ésima é duplicada se a partição já tem
+    n linhas com esse conteúdo, ou o ID que ela receberia. O ID gerado
+    (`id_importado`) vem do hash e da ocorrência, então compras repetidas
+    no mesmo mês são mantidas e reimportar o mesmo arquivo não duplica nada. Com `gravar=False` só
+    devolve o resumo. A memória fica limitada a um bloco do arquivo mais as
+    linhas novas aceitas.
+    """
+    existentes = _Existentes(armazenamento)
+    vistos_ids, ocorrencias = set(), Counter()
+    novas = []
+    resumo = {"lidas": 0, "validas": 0, "invalidas": 0, "duplicadas_id": 0, "duplicadas_conteudo": 0, "erros": []}
+
+    linha_inicial = 2 # Linha 1 do arquivo é o cabeçalho
+    for bloco in blocos:
+        resumo["lidas"] += len(bloco)
+        df, erros = normalizar_bloco(bloco, mapeamento, ano_padrao, linha_inicial)
+        linha_inicial += len(bloco)
+        resumo["invalidas"] += len(erros)
+        resumo["erros"].extend(erros[:max(0, AMOSTRA_ERROS - len(resumo["erros"]))])
+        if df.empty:
+            continue
+
+        # Membro-a-membro em sets do Python: Series.isin(set) recriaria o set inteiro a cada bloco
+        hashes = hash_conteudo(df).tolist()
+        ids = df['ID Transacao'].tolist()
+        aceitas, gerados = [], []
+        for id_origem, hash_linha, ano in zip(ids, hashes, df['Ano'].tolist()):
+            ids_ano, hashes_ano = existentes.do_ano(ano)
+            if isinstance(id_origem, str):
+                duplicada = id_origem in ids_ano or id_origem in vistos_ids
+                resumo["duplicadas_id"] += duplicada
+                vistos_ids.add(id_origem)
+            else:
+                ocorrencia = ocorrencias[hash_linha]
+                ocorrencias[hash_linha] += 1
+                gerado = id_importado(hash_linha, ocorrencia)
+                duplicada = ocorrencia < hashes_ano[hash_linha] or gerado in ids_ano
+                resumo["duplicadas_conteudo"] += duplicada
+                if not duplicada:
+                    gerados.append(gerado)
+            aceitas.append(not duplicada)
+
+        df = df[aceitas]
+        if gerados:
+            sem_id = df['ID Transacao'].isna()
+            df = df.assign(**{'ID Transacao': df['ID Transacao'].mask(sem_id, pd.Series(gerados, index=df.index[sem_id]))})
+        novas.append(df)
+
+    df_novas = pd.concat(novas, ignore_index=True) if novas else pd.DataFrame(columns=COLUNAS_SIMPLIFICADAS)
+    resumo["validas"] = len(df_novas)
+    resumo["por_ano"] = {int(ano): int(n) for ano, n in df_novas['Ano'].value_counts().sort_index().items()}
+    if gravar and not df_novas.empty:
+        armazenamento.inserir_lote(df_novas)
+    resumo["gravadas"] = len(df_novas) if gravar else 0
+    return resumo
+
+# =================================================================
+# === TELA DE IMPORTAÇÃO ===
+# =================================================================
+
+def renderizar_importacao(armazenamento, ano_padrao, ao_concluir=None):
+    """Upload de CSV/OFX, mapeamento das colunas, pré-visualização (sem gravar) e importação em lote."""
+    arquivo = st.file_uploader("Arquivo CSV ou OFX", type=["csv", "txt", "ofx", "qfx"], key="arquivo_importacao")
+    if arquivo is None:
+        st.caption("CSV com cabeçalho (separador detectado automaticamente) ou extrato bancário OFX/QFX.")
+        return
+
+    ofx = arquivo.name.lower().endswith((".ofx", ".qfx"))
+    if ofx:
+        mapeamento = {campo: campo for campo in ('ID Transacao', 'Data', 'Descricao', 'Valor', 'Status')}
+        st.caption("Extrato OFX: data, descrição, valor e FITID são lidos direto das transações; valores negativos viram Despesa.")
+    else:
+        separador = detectar_separador(arquivo)
+        origem = colunas_csv(arquivo, separador)
+        sugestao = sugerir_mapeamento(origem)
+        st.caption(f"Separador detectado: `{separador}` · {len(origem)} coluna(s). Confira o mapeamento:")
+        opcoes = [None] + origem
+        mapeamento = {}
+        colunas_ui = st.columns(4)
+        for posicao, campo in enumerate(CAMPOS_MAPEAVEIS):
+            mapeamento[campo] = colunas_ui[posicao % 4].selectbox(
+                campo, options=opcoes, index=opcoes.index(sugestao[campo]),
+                format_func=lambda c: "—" if c is None else c, key=f"mapa_importacao_{campo}",
+            )
+
+    ano_importacao = st.number_input(
+        "Ano para linhas sem ano/data", min_value=2000, max_value=2100, value=int(ano_padrao), step=1,
+        key="ano_importacao",
+    )
+
+    def blocos():
+        if ofx:
+            return ler_ofx_em_blocos(arquivo)
+        return ler_csv_em_blocos(arquivo, separador)
+
+    col_previa, col_importar = st.columns(2)
+    previa = col_previa.button("🔎 Pré-visualizar (sem gravar)", key="previa_importacao")
+    confirmar = col_importar.button("📤 Importar", type="primary", key="confirmar_importacao")
+    if not (previa or confirmar):
+        return
+
+    try:
+        with st.spinner("Lendo e validando o arquivo..."):
+            resumo = importar(blocos(), mapeamento, armazenamento, int(ano_importacao), gravar=confirmar)
+    except Exception as e:
+        st.error(f"🚫 Erro na importação: {e}")
+        return
+
+    st.write(
+        f"**{resumo['lidas']}** linha(s) lidas · **{resumo['validas']}** nova(s) · "
+        f"{resumo['duplicadas_id']} duplicada(s) por ID · {resumo['duplicadas_conteudo']} duplicada(s) por conteúdo · "
+        f"{resumo['invalidas']} inválida(s)"
+    )
+    if resumo["por_ano"]:
+        st.caption("Por ano: " + ", ".join(f"{ano}: {n}" for ano, n in resumo["por_ano"].items()))
+    if resumo["erros"]:
+        st.dataframe(pd.DataFrame(resumo["erros"], columns=["Linha", "Motivo"]), hide_index=True)
+    if confirmar:
+        st.success(f"✅ {resumo['gravadas']} transação(ões) importada(s).")
+        if ao_concluir is not None:
+            ao_concluir(resumo)
@@ -0,0 +1,43 @@
+# indice_linhas.py (ÍNDICE ID -> NÚMERO DA LINHA NA ABA TRANSACOES)
+import threading
+
+from espelho_local import LINHA_CABECALHO
+
+class IndiceLinhas:
+    """
+    Mapa {ID Transacao: linha na planilha} que substitui o `sheet.find()`.
+
+    É um retrato da coluna de IDs tirado a cada tentativa de descarga
+    (`construir_de_coluna`, com a única leitura que a descarga já faz), não
+    um índice mantido entre escritas: o lote atômico é montado logo em
+    seguida e, se outro processo gravou no meio, a revisão da aba recusa o
+    lote e o retrato é tirado de novo. Edições à mão entre duas descargas
+    nunca deixam uma linha velha chegar à planilha.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._linhas = {}
+
+    def __len__(self):
+        return len(self._linhas)
+
+    def __contains__(self, id_transacao):
+        return id_transacao in self._linhas
+
+    def construir_de_coluna(self, ids_coluna):
+        """
+        Recria o índice a partir da coluna A completa (com o cabeçalho), como
+        devolvida por `col_values(1)`. IDs vazios ficam de fora; um ID
+        repetido fica com a primeira linha.
+        """
+        ids_por_linha = {}
+        for posicao, valor in enumerate(ids_coluna[LINHA_CABECALHO:]):
+            if valor not in (None, ""):
+                ids_por_linha.setdefault(str(valor).strip(), LINHA_CABECALHO + 1 + posicao)
+        with self._lock:
+            self._linhas = ids_por_linha
+
+    def linha(self, id_transacao):
+        """Linha do ID no último retrato (O(1)), ou None."""
+        return self._linhas.get(id_transacao)
@@ -0,0 +1,316 @@
+# instrumentacao.py (TEMPOS POR ETAPA, CHAMADAS À API DO SHEETS E ACERTOS DE CACHE, COM LOG JSON-LINES)
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from espelho_local import PASTA_CACHE
+
+CAMINHO_LOG_PADRAO = os.path.join(PASTA_CACHE, "instrumentacao.jsonl")
+TAMANHO_MAXIMO_LOG = 5 * 1024 * 1024 # Ao passar disso o log vira .1 e recomeça
+EXECUCOES_RECENTES = 50               # Execuções do script mantidas em memória para o painel
+
+# =================================================================
+# === FUNÇÕES AUXILIARES ===
+# =================================================================
+
+def codigo_http(erro):
+    """Status HTTP de um erro do gspread (APIError.response.status_code), se houver."""
+    resposta = getattr(erro, "response", None)
+    codigo = getattr(resposta, "status_code", None) or getattr(erro, "code", None)
+    return codigo if isinstance(codigo, int) else None
+
+def parece_planilha(valor):
+    return hasattr(valor, "worksheets") and hasattr(valor, "batch_update")
+
+def parece_aba(valor):
+    return hasattr(valor, "col_values") and hasattr(valor, "spreadsheet")
+
+# =================================================================
+# === COLETOR ===
+# =================================================================
+
+class Instrumentacao:
+    """
+    Coletor de métricas do processo, compartilhado entre as sessões.
+
+    Cada execução do script (rerun) abre uma medição com `iniciar_execucao` e
+    a fecha com `finalizar_execucao`; entre as duas, `etapa(nome)` cronometra
+    trechos e as chamadas ao Sheets / consultas ao cache feitas na mesma
+    thread entram na medição corrente. Chamadas feitas fora de uma execução
+    (thread da fila de mutações) só entram nos totais e no log.
+
+    Cada execução finalizada vira uma linha no log JSON-lines.
+    """
+
+    def __init__(self, caminho_log=CAMINHO_LOG_PADRAO, recentes=EXECUCOES_RECENTES):
+        self.caminho_log = caminho_log
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._abertas = {}  # {sessao: medição ainda não finalizada}
+        self.execucoes = deque(maxlen=recentes)
+        self.chamadas = {}  # {metodo: {"chamadas", "erros", "cota_excedida", "total_s", "maximo_s"}}
+        self.cache = {}     # {nome: {"acertos", "falhas"}}
+        if caminho_log:
+            os.makedirs(os.path.dirname(os.path.abspath(caminho_log)), exist_ok=True)
+
+    # --- Execução do script ---
+
+    @property
+    def medicao(self):
+        """Medição da execução aberta nesta thread, ou None."""
+        return getattr(self._local, "medicao", None)
+
+    def iniciar_execucao(self, sessao):
+        """
+        Abre a medição desta execução. Uma medição anterior da mesma sessão que
+        não chegou ao fim (st.rerun/st.stop no meio do script) é registrada
+        como interrompida.
+        """
+        with self._lock:
+            anterior = self._abertas.pop(sessao, None)
+        if anterior is not None:
+            self._fechar(anterior, interrompida=True)
+        medicao = {
+            "inicio": datetime.now().isoformat(timespec='milliseconds'),
+            "sessao": sessao,
+            "_t0": time.perf_counter(),
+            "_ultimo": time.perf_counter(),
+            "etapas": {},
+            "chamadas": [],
+            "cache": [],
+        }
+        with self._lock:
+            self._abertas[sessao] = medicao
+        self._local.medicao = medicao
+
+    def finalizar_execucao(self):
+        """Fecha a medição desta thread e grava a linha da execução no log."""
+        medicao = self.medicao
+        if medicao is None:
+            return None
+        self._local.medicao = None
+        with self._lock:
+            self._abertas.pop(medicao["sessao"], None)
+        return self._fechar(medicao, interrompida=False)
+
+    def _fechar(self, medicao, interrompida):
+        registro = {k: v for k, v in medicao.items() if not k.startswith("_")}
+        registro["tipo"] = "execucao"
+        # Interrompida: só se sabe até o último evento medido (o resto do tempo foi espera pela próxima execução)
+        fim = medicao["_ultimo"] if interrompida else time.perf_counter()
+        registro["total_s"] = round(fim - medicao["_t0"], 6)
+        registro["interrompida"] = interrompida
+        with self._lock:
+            self.execucoes.append(registro)
+        self._gravar_log(registro)
+        return registro
+
+    @contextmanager
+    def etapa(self, nome):
+        """Cronometra um trecho da execução corrente (acumula se a etapa se repetir)."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            medicao = self.medicao
+            if medicao is not None:
+                medicao["_ultimo"] = time.perf_counter()
+                duracao = medicao["_ultimo"] - inicio
+                medicao["etapas"][nome] = round(medicao["etapas"].get(nome, 0.0) + duracao, 6)
+
+    # --- Eventos ---
+
+    def registrar_chamada(self, metodo, duracao, erro=None):
+        """Uma chamada à API do Sheets (sucesso ou erro), com a latência medida."""
+        codigo = codigo_http(erro) if erro is not None else None
+        with self._lock:
+            total = self.chamadas.setdefault(
+                metodo, {"chamadas": 0, "erros": 0, "cota_excedida": 0, "total_s": 0.0, "maximo_s": 0.0}
+            )
+            total["chamadas"] += 1
+            total["total_s"] += duracao
+            total["maximo_s"] = max(total["maximo_s"], duracao)
+            if erro is not None:
+                total["erros"] += 1
+                if codigo == 429:
+                    total["cota_excedida"] += 1
+
+        evento = {"metodo": metodo, "duracao_s": round(duracao, 6)}
+        if erro is not None:
+            evento["erro"] = type(erro).__name__
+            evento["status"] = codigo
+        medicao = self.medicao
+        if medicao is not None:
+            medicao["_ultimo"] = time.perf_counter()
+            medicao["chamadas"].append(evento)
+        else:
+            self._gravar_log({"tipo": "chamada", "ts": datetime.now().isoformat(timespec='milliseconds'), **evento})
+
+    def registrar_cache(self, nome, acerto):
+        with self._lock:
+            total = self.cache.setdefault(nome, {"acertos": 0, "falhas": 0})
+            total["acertos" if acerto else "falhas"] += 1
+        medicao = self.medicao
+        if medicao is not None:
+            medicao["cache"].append({"nome": nome, "acerto": bool(acerto)})
+
+    # --- Resumos ---
+
+    def resumo_chamadas(self):
+        """DataFrame com chamadas, erros e latência (média/máxima) por método da API."""
+        with self._lock:
+            linhas = [
+                {
+                    "Método": metodo,
+                    "Chamadas": t["chamadas"],
+                    "Erros": t["erros"],
+                    "429": t["cota_excedida"],
+                    "Média (ms)": round(1000 * t["total_s"] / t["chamadas"], 1),
+                    "Máxima (ms)": round(1000 * t["maximo_s"], 1),
+                }
+                for metodo, t in self.chamadas.items()
+            ]
+        return pd.DataFrame(linhas, columns=["Método", "Chamadas", "Erros", "429", "Média (ms)", "Máxima (ms)"])
+
+    def taxa_acerto_cache(self, nome):
+        with self._lock:
+            total = self.cache.get(nome, {"acertos": 0, "falhas": 0})
+        consultas = total["acertos"] + total["falhas"]
+        return (total["acertos"] / consultas if consultas else None), total
+
+    # --- Log ---
+
+    def _gravar_log(self, registro):
+        if not self.caminho_log:
+            return
+        linha = json.dumps(registro, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            try:
+                if os.path.exists(self.caminho_log) and os.path.getsize(self.caminho_log) > TAMANHO_MAXIMO_LOG:
+                    os.replace(self.caminho_log, self.caminho_log + ".1")
+                with open(self.caminho_log, "a", encoding="utf-8") as arquivo:
+                    arquivo.write(linha)
+            except OSError:
+                pass # Métrica nunca derruba a aplicação
+
+    def conteudo_log(self):
+        """Conteúdo atual do log JSON-lines (para o botão de download)."""
+        if not self.caminho_log or not os.path.exists(self.caminho_log):
+            return ""
+        with self._lock, open(self.caminho_log, encoding="utf-8") as arquivo:
+            return arquivo.read()
+
+# =================================================================
+# === CLIENTE DO SHEETS CRONOMETRADO ===
+# =================================================================
+
+class ClienteInstrumentado:
+    """
+    Envolve uma Spreadsheet/Worksheet do gspread e cronometra cada método chamado.
+
+    Atributos simples (`title`, `id`...) passam direto; métodos viram chamadas
+    cronometradas registradas como "planilha.<método>" ou "aba.<método>". As
+    abas devolvidas (`worksheet`, `worksheets`, `add_worksheet`) e o
+    `.spreadsheet` de uma aba também saem envolvidos.
+    """
+
+    def __init__(self, alvo, instrumentacao, prefixo):
+        self._alvo = alvo
+        self._instrumentacao = instrumentacao
+        self._prefixo = prefixo
+
+    def __getattr__(self, nome):
+        valor = getattr(self._alvo, nome)
+        if callable(valor):
+            return self._cronometrado(f"{self._prefixo}.{nome}", valor)
+        return envolver(valor, self._instrumentacao)
+
+    def __repr__(self):
+        return f"ClienteInstrumentado({self._alvo!r})"
+
+    def _cronometrado(self, metodo, funcao):
+        instrumentacao = self._instrumentacao
+
+        def chamar(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                resultado = funcao(*args, **kwargs)
+            except Exception as e:
+                instrumentacao.registrar_chamada(metodo, time.perf_counter() - inicio, erro=e)
+                raise
+            instrumentacao.registrar_chamada(metodo, time.perf_counter() - inicio)
+            return envolver(resultado, instrumentacao)
+
+        return chamar
+
+def envolver(valor, instrumentacao):
+    """Envolve planilhas e abas (ou listas delas) em ClienteInstrumentado; o resto passa direto."""
+    if valor is None or instrumentacao is None or isinstance(valor, ClienteInstrumentado):
+        return valor
+    if isinstance(valor, list):
+        # Só listas de abas (worksheets()); listas de valores voltam intactas, sem percorrer as linhas
+        if valor and (parece_aba(valor[0]) or parece_planilha(valor[0])):
+            return [envolver(v, instrumentacao) for v in valor]
+        return valor
+    if parece_planilha(valor):
+        return ClienteInstrumentado(valor, instrumentacao, "planilha")
+    if parece_aba(valor):
+        return ClienteInstrumentado(valor, instrumentacao, "aba")
+    return valor
+
+# =================================================================
+# === PAINEL DE DIAGNÓSTICO (SIDEBAR) ===
+# =================================================================
+
+def renderizar_painel(instrumentacao, nome_cache, controle_cota=None):
+    """Painel da sidebar: etapas da última execução, chamadas à API, cota/reenvios, cache e download do log."""
+    with st.sidebar.container(border=True):
+        st.markdown("**🩺 Diagnóstico de desempenho**")
+        with instrumentacao._lock:
+            anteriores = [e for e in instrumentacao.execucoes if not e["interrompida"]]
+        if anteriores:
+            ultima = anteriores[-1]
+            st.caption(f"Execução anterior: {ultima['total_s'] * 1000:.0f} ms · {len(ultima['chamadas'])} chamada(s) ao Sheets")
+            etapas = pd.DataFrame(
+                [{"Etapa": nome, "ms": round(s * 1000, 1)} for nome, s in ultima["etapas"].items()]
+            )
+            if not etapas.empty:
+                st.dataframe(etapas, hide_index=True, width="stretch")
+            media = sum(e["total_s"] for e in anteriores) / len(anteriores)
+            st.caption(f"Média das últimas {len(anteriores)} execuções: {media * 1000:.0f} ms")
+        else:
+            st.caption("Nenhuma execução medida ainda.")
+
+        st.markdown("**Chamadas à API do Sheets (processo)**")
+        chamadas = instrumentacao.resumo_chamadas()
+        if chamadas.empty:
+            st.caption("Nenhuma chamada registrada.")
+        else:
+            st.dataframe(chamadas, hide_index=True, width="stretch")
+
+        if controle_cota is not None:
+            e = controle_cota.estatisticas
+            st.caption(
+                f"Cota: {e['reenvios']} reenvio(s) com backoff ({e['espera_backoff_s']:.1f} s), "
+                f"{e['espera_cota_s']:.1f} s aguardando o limite por minuto, "
+                f"{e['coalescidas']} leitura(s) coalescida(s), {e['falhas']} falha(s) definitiva(s)"
+            )
+
+        taxa, total = instrumentacao.taxa_acerto_cache(nome_cache)
+        if taxa is not None:
+            st.caption(f"Cache de `{nome_cache}`: {taxa:.0%} de acertos ({total['acertos']} acertos / {total['falhas']} falhas)")
+
+        st.download_button(
+            "Baixar log (JSON-lines)",
+            data=instrumentacao.conteudo_log(),
+            file_name="instrumentacao.jsonl",
+            mime="application/x-ndjson",
+            key="baixar_log_instrumentacao",
+        )
@@ -0,0 +1,59 @@
+# kpis.py (TABELA DE KPIs POR MÊS CALCULADA EM UM ÚNICO GROUPBY)
+import pandas as pd
+
+COLUNAS_KPI = [
+    'receita_bruta', 'despesa_bruta', 'receita_paga', 'despesa_paga',
+    'despesa_pendente', 'lucro_liquido',
+]
+
+def calcular_tabela_kpis(df, meses):
+    """
+    KPIs do dashboard para todos os meses de uma vez.
+
+    Um único groupby (Mês, Categoria, Status) soma os Centavos (inteiros,
+    soma exata); o resultado é uma tabela em reais indexada pelos meses de
+    `meses` (na ordem recebida) com as colunas de COLUNAS_KPI. Meses sem
+    transações ficam zerados.
+    """
+    meses = list(meses)
+    if df is None or df.empty or 'Centavos' not in df.columns:
+        return pd.DataFrame(0.0, index=pd.Index(meses, name='Mês'), columns=COLUNAS_KPI)
+
+    somas = (
+        df.groupby(['Mês', 'Categoria', 'Status'], observed=True)['Centavos']
+        .sum()
+        .unstack(['Categoria', 'Status'], fill_value=0)
+    )
+
+    def _soma(categoria, status=None):
+        if categoria not in somas.columns.get_level_values('Categoria'):
+            return pd.Series(0, index=somas.index)
+        bloco = somas[categoria]
+        if status is None:
+            return bloco.sum(axis=1)
+        return bloco[status] if status in bloco.columns else pd.Series(0, index=somas.index)
+
+    tabela = pd.DataFrame({
+        'receita_bruta': _soma('Receita'),
+        'despesa_bruta': _soma('Despesa'),
+        'receita_paga': _soma('Receita', 'PAGO'),
+        'despesa_paga': _soma('Despesa', 'PAGO'),
+    })
+    tabela['despesa_pendente'] = tabela['despesa_bruta'] - tabela['despesa_paga']
+    tabela['lucro_liquido'] = tabela['receita_paga'] - tabela['despesa_paga']
+    # Centavos -> reais só no fim: as contas acima são exatas
+    return tabela.reindex(meses, fill_value=0).set_axis(pd.Index(meses, name='Mês')) / 100
+
+def ajustar_kpis(tabela, antigas=None, novas=None):
+    """
+    Atualiza a tabela sem recalcular tudo: subtrai a contribuição das linhas
+    `antigas` e soma a das `novas` (DataFrames com as mesmas colunas da carga).
+    """
+    meses = list(tabela.index)
+    resultado = tabela
+    if antigas is not None and not antigas.empty:
+        resultado = resultado - calcular_tabela_kpis(antigas, meses)
+    if novas is not None and not novas.empty:
+        resultado = resultado + calcular_tabela_kpis(novas, meses)
+    # Somas e subtrações sucessivas de floats acumulam resíduos abaixo do centavo
+    return resultado.round(2)
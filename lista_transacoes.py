@@ -0,0 +1,197 @@
+# lista_transacoes.py (LISTA PAGINADA DE TRANSAÇÕES COM BOTÕES DE EDITAR/EXCLUIR)
+import math
+
+import pandas as pd
+import streamlit as st
+
+from dados import valores_reais
+from formatacao import format_currency_vetorizado
+
+TAMANHO_PAGINA = 25 # Transações (e widgets) renderizadas por página
+
+# =================================================================
+# === PAGINAÇÃO ===
+# =================================================================
+
+def fatiar_pagina(df_display, pagina, tamanho_pagina=TAMANHO_PAGINA):
+    """
+    Recorta do DataFrame (já ordenado) só as linhas da página pedida.
+
+    Retorna (df_pagina, pagina, total_paginas), com a página limitada ao
+    intervalo válido (1..total_paginas).
+    """
+    total_paginas = max(1, math.ceil(len(df_display) / tamanho_pagina))
+    pagina = min(max(1, int(pagina)), total_paginas)
+    inicio = (pagina - 1) * tamanho_pagina
+    return df_display.iloc[inicio:inicio + tamanho_pagina], pagina, total_paginas
+
+def seletor_pagina(total_linhas, chave, tamanho_pagina=TAMANHO_PAGINA):
+    """Controle de navegação entre páginas; devolve a página selecionada (1..N)."""
+    total_paginas = max(1, math.ceil(total_linhas / tamanho_pagina))
+    if total_paginas == 1:
+        return 1
+    col_info, col_pagina = st.columns([3, 1])
+    pagina = col_pagina.number_input(
+        "Página",
+        min_value=1,
+        max_value=total_paginas,
+        value=1,
+        step=1,
+        key=chave,
+    )
+    col_info.caption(
+        f"{total_linhas} transações · página {pagina} de {total_paginas} "
+        f"({tamanho_pagina} por página)"
+    )
+    return pagina
+
+# =================================================================
+# === RENDERIZAÇÃO ===
+# =================================================================
+
+def renderizar_lista(df_display, chave, ao_deletar, ao_atualizar, meses, anos, ano_padrao, status_default,
+                     tamanho_pagina=TAMANHO_PAGINA, prefixo=""):
+    """
+    Renderiza a lista de transações paginada.
+
+    O DataFrame é fatiado no servidor e só as linhas da página visível criam
+    widgets (colunas, botões e formulário de edição), então o custo de
+    renderização não cresce com o total de transações do mês. Editar e
+    excluir continuam identificando a transação pelo ID. O formulário de
+    edição permite mudar o Ano (`anos`; `ano_padrao` para linhas sem ano).
+    `prefixo` separa as chaves dos widgets quando a mesma transação pode
+    aparecer em duas listas na tela (ex.: mês e resultado da busca).
+    """
+    pagina = seletor_pagina(len(df_display), chave, tamanho_pagina)
+    df_pagina, _, _ = fatiar_pagina(df_display, pagina, tamanho_pagina)
+    valores_formatados = format_currency_vetorizado(valores_reais(df_pagina).to_numpy())
+
+    # Cabeçalhos
+    cols_header = st.columns([0.4, 0.2, 0.2, 0.1, 0.1])
+    cols_header[0].markdown("**Descrição**")
+    cols_header[1].markdown("**Categoria**")
+    cols_header[2].markdown("**Valor / Status**")
+    cols_header[3].markdown(" ") 
+    cols_header[4].markdown(" ") 
+    st.markdown("---")
+
+    # Loop apenas sobre as transações da página visível
+    for row, valor_formatado in zip(df_pagina.to_dict('records'), valores_formatados):
+
+        id_transacao = row['ID Transacao']
+
+        # 1. Se a linha NÃO está em modo de edição (EXIBIÇÃO NORMAL + BOTÕES)
+        if st.session_state.id_edicao_ativa != f"{prefixo}{id_transacao}":
+
+            col_desc, col_cat, col_val_status, col_btn_edit, col_btn_del = st.columns([0.4, 0.2, 0.2, 0.1, 0.1])
+
+            # === CÓDIGO PARA COLORAÇÃO CONDICIONAL NA TABELA (UX VISUAL) ===
+            if row['Categoria'] == 'Receita':
+                categoria_cor = "green"
+            elif row['Categoria'] == 'Despesa' and row['Status'] == 'PAGO':
+                # Despesa PAGA fica neutra/cinza
+                categoria_cor = "darkgrey" 
+            else:
+                # Despesa PENDENTE (continua vermelho)
+                categoria_cor = "red"
+            # =============================================================
+
+            col_desc.markdown(f"**<span style='color:{categoria_cor}'>{row['Descricao']}</span>**", unsafe_allow_html=True)
+            col_cat.write(row['Categoria'])
+            col_val_status.write(f"{valor_formatado} ({row['Status']})")
+
+            if col_btn_edit.button("✍️", key=f'{prefixo}edit_{id_transacao}', help="Editar esta transação"):
+                st.session_state.id_edicao_ativa = f"{prefixo}{id_transacao}"
+                st.rerun() 
+
+            if col_btn_del.button("🗑️", key=f'{prefixo}del_{id_transacao}', help="Excluir esta transação"):
+                ao_deletar(id_transacao)
+                st.rerun() 
+
+            st.markdown("---") 
+
+        # 2. Se a linha ESTÁ em modo de edição (FORMULÁRIO)
+        else: 
+            st.warning(f"📝 Editando Transação: **{row['Descricao']}**")
+
+            with st.form(key=f"{prefixo}form_update_c_{id_transacao}"):
+
+                transacao_dados = row 
+
+                col_upd_0, col_upd_1, col_upd_2, col_upd_3 = st.columns(4) 
+
+                reais_existentes, centavos_existentes = divmod(int(transacao_dados['Centavos']), 100)
+
+                # INPUTS
+                ano_existente = transacao_dados.get('Ano')
+                ano_existente = ano_padrao if pd.isna(ano_existente) else int(ano_existente)
+                opcoes_ano = sorted(set(anos) | {ano_existente})
+                novo_ano = col_upd_0.selectbox("Ano", opcoes_ano, index=opcoes_ano.index(ano_existente), key=f'{prefixo}ut_ano_c_{id_transacao}')
+                mes_idx = meses.index(transacao_dados['Mês'])
+                novo_mes = col_upd_1.selectbox("Mês", meses, index=mes_idx, key=f'{prefixo}ut_mes_c_{id_transacao}')
+                cat_index = ["Receita", "Despesa"].index(transacao_dados['Categoria'])
+                novo_categoria = col_upd_2.selectbox("Tipo", ["Receita", "Despesa"], index=cat_index, key=f'{prefixo}ut_tipo_c_{id_transacao}')
+                novo_status_existente = transacao_dados.get('Status', status_default) 
+                status_idx = ['PAGO', 'PENDENTE'].index(novo_status_existente)
+                novo_status = col_upd_3.selectbox("Status", ['PAGO', 'PENDENTE'], index=status_idx, key=f'{prefixo}ut_status_c_{id_transacao}')
+
+                col_upd_v1, col_upd_v2 = st.columns([2, 1])
+
+                novo_reais_input = col_upd_v1.number_input(
+                    "Valor (R$ - Reais)", 
+                    min_value=0, 
+                    value=reais_existentes, 
+                    step=1, 
+                    format="%d", 
+                    key=f"{prefixo}ut_reais_c_{id_transacao}"
+                )
+
+                novo_centavos_input = col_upd_v2.number_input(
+                    "Centavos", 
+                    min_value=0, 
+                    max_value=99, 
+                    value=centavos_existentes, 
+                    step=1, 
+                    format="%d", 
+                    key=f"{prefixo}ut_centavos_c_{id_transacao}"
+                )
+
+                novo_descricao = st.text_input(
+                    "Descrição", 
+                    value=transacao_dados['Descricao'], 
+                    key=f'{prefixo}ut_desc_c_{id_transacao}'
+                )
+
+                # BOTÃO DE SALVAR (DENTRO DO FORM)
+                update_button = st.form_submit_button("✅ Salvar Alterações")
+
+                if update_button:
+
+                    novo_reais_final = novo_reais_input if novo_reais_input is not None else 0
+                    novo_centavos_final = novo_centavos_input if novo_centavos_input is not None else 0
+                    novo_valor = novo_reais_final + (novo_centavos_final / 100)
+
+                    if novo_descricao and novo_valor >= 0:
+                        dados_atualizados = {
+                            'ID Transacao': id_transacao, 
+                            'Descricao': novo_descricao,
+                            'Valor': novo_valor, 
+                            'Categoria': novo_categoria,
+                            'Mês': novo_mes,
+                            'Status': novo_status,
+                            'Ano': novo_ano
+                        }
+                        ao_atualizar(id_transacao, dados_atualizados) 
+                        st.session_state.id_edicao_ativa = None 
+                        st.rerun()
+                    else:
+                        st.warning("Descrição e Valor (deve ser maior ou igual a zero) são obrigatórios na atualização.")
+
+            # BOTÃO DE CANCELAR (FORA DO FORM)
+            col_dummy_save, col_cancel_out = st.columns([1, 4])
+            if col_cancel_out.button("Cancelar Edição", key=f'{prefixo}cancel_edit_{id_transacao}'):
+                st.session_state.id_edicao_ativa = None
+                st.rerun()
+
+            st.markdown("---") # Separador para o formulário de edição
+
@@ -0,0 +1,103 @@
+# particoes.py (PARTICIONAMENTO DAS TRANSAÇÕES POR ANO: UMA ABA POR ANO E MIGRAÇÃO DA ABA ÚNICA)
+import re
+from datetime import datetime
+
+from dados import ABA_TRANSACOES
+
+ABA_LEGADA_MIGRADA = f"{ABA_TRANSACOES}_LEGADO" # Nome dado à aba antiga depois de migrada (fica como backup)
+LINHAS_ABA_NOVA = 1000
+
+_PADRAO_ABA_ANUAL = re.compile(rf"^{ABA_TRANSACOES}_(\d{{4}})$")
+_PADRAO_ANO_NO_ID = re.compile(r"^TRX-(\d{4})\d{4}")
+
+def titulo_aba(ano):
+    """Nome da aba que guarda as transações de um ano (ex.: TRANSACOES_2025)."""
+    return f"{ABA_TRANSACOES}_{int(ano)}"
+
+def ano_da_aba(titulo):
+    """Ano de uma aba anual, ou None se o título não seguir o padrão."""
+    encontrado = _PADRAO_ABA_ANUAL.match(titulo)
+    return int(encontrado.group(1)) if encontrado else None
+
+def abas_por_titulo(spreadsheet):
+    """Todas as abas da planilha indexadas pelo título (uma chamada de API)."""
+    return {aba.title: aba for aba in spreadsheet.worksheets()}
+
+def listar_anos(spreadsheet):
+    """Anos que já têm aba própria, em ordem crescente."""
+    return sorted(a for a in (ano_da_aba(t) for t in abas_por_titulo(spreadsheet)) if a is not None)
+
+def obter_aba(spreadsheet, ano, colunas, criar=False):
+    """
+    Aba do ano; com `criar=True`, cria a aba (com o cabeçalho) se ainda não
+    existir. Sem `criar`, devolve None para anos sem aba.
+    """
+    titulo = titulo_aba(ano)
+    aba = abas_por_titulo(spreadsheet).get(titulo)
+    if aba is not None or not criar:
+        return aba
+    aba = spreadsheet.add_worksheet(title=titulo, rows=LINHAS_ABA_NOVA, cols=len(colunas))
+    aba.update('A1', [list(colunas)], value_input_option='RAW')
+    return aba
+
+def ano_da_transacao(registro, ano_padrao):
+    """
+    Ano de uma linha da aba antiga: coluna 'Ano' se preenchida, senão o ano
+    de criação embutido no ID (TRX-AAAAMMDD...), senão `ano_padrao`.
+    """
+    ano = registro.get('Ano')
+    if ano not in (None, ""):
+        try:
+            return int(ano)
+        except (TypeError, ValueError):
+            pass
+    encontrado = _PADRAO_ANO_NO_ID.match(str(registro.get('ID Transacao', "")))
+    if encontrado:
+        return int(encontrado.group(1))
+    return int(ano_padrao)
+
+def migrar_aba_legada(spreadsheet, colunas, ano_padrao=None):
+    """
+    Move as linhas da aba única TRANSACOES para as abas anuais.
+
+    Cada linha ganha o campo 'Ano' (ver `ano_da_transacao`) e é acrescentada
+    à aba do seu ano com um `append_rows` por ano. IDs que já existem na aba
+    de destino são pulados, então a migração pode ser repetida com segurança.
+    No fim a aba antiga é renomeada para ABA_LEGADA_MIGRADA (nada é apagado).
+    Devolve {ano: linhas migradas}.
+    """
+    ano_padrao = ano_padrao or datetime.now().year
+    abas = abas_por_titulo(spreadsheet)
+    legada = abas.get(ABA_TRANSACOES)
+    if legada is None:
+        return {}
+
+    valores = legada.get_all_values(value_render_option='UNFORMATTED_VALUE')
+    if not valores:
+        legada.update_title(ABA_LEGADA_MIGRADA)
+        return {}
+    cabecalho, linhas = [str(c) for c in valores[0]], valores[1:]
+
+    por_ano = {}
+    for linha in linhas:
+        registro = dict(zip(cabecalho, linha))
+        if not any(v not in (None, "") for v in registro.values()):
+            continue
+        registro['Ano'] = ano_da_transacao(registro, ano_padrao)
+        por_ano.setdefault(registro['Ano'], []).append([registro.get(col, "") for col in colunas])
+
+    migradas = {}
+    for ano, novas in sorted(por_ano.items()):
+        aba = obter_aba(spreadsheet, ano, colunas, criar=True)
+        existentes = {str(i) for i in aba.col_values(1)[1:]}
+        novas = [linha for linha in novas if str(linha[0]) not in existentes]
+        if novas:
+            aba.append_rows(novas, value_input_option='RAW')
+        migradas[ano] = len(novas)
+
+    legada.update_title(ABA_LEGADA_MIGRADA)
+    return migradas
+
+def aba_legada_pendente(spreadsheet):
+    """True se a aba única antiga ainda existe (migração não feita)."""
+    return ABA_TRANSACOES in abas_por_titulo(spreadsheet)
@@ -0,0 +1,271 @@
+# recorrencias.py (MODELOS DE TRANSAÇÕES RECORRENTES: GERAÇÃO VETORIZADA, IDS DETERMINÍSTICOS E GRAVAÇÃO EM LOTE)
+import hashlib
+import re
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from dados import (
+    CATEGORIAS, COLUNAS_RECORRENCIAS, COLUNAS_SIMPLIFICADAS, MESES_PT, STATUS_DEFAULT, STATUS_PRIORIDADE,
+)
+
+PREFIXO_ID_RECORRENTE = "REC-"
+
+# Frequência -> intervalo em meses entre duas ocorrências
+FREQUENCIAS = {
+    'Mensal': 1,
+    'Bimestral': 2,
+    'Trimestral': 3,
+    'Semestral': 6,
+    'Anual': 12,
+}
+
+_PADRAO_MES = re.compile(r"^\s*(\d{4})-(\d{1,2})\s*$")
+
+# =================================================================
+# === MESES E IDS ===
+# =================================================================
+
+def indice_mes(ano, mes_num):
+    """Mês como um inteiro contínuo (ano * 12 + mês - 1): somar 1 é ir para o mês seguinte."""
+    return int(ano) * 12 + int(mes_num) - 1
+
+def mes_do_indice(indice):
+    """(ano, número do mês) de um `indice_mes`."""
+    return indice // 12, indice % 12 + 1
+
+def ler_mes(texto):
+    """'AAAA-MM' -> `indice_mes`, ou None se vazio/inválido."""
+    encontrado = _PADRAO_MES.match(str(texto)) if texto is not None and not pd.isna(texto) else None
+    if encontrado is None or not 1 <= int(encontrado.group(2)) <= 12:
+        return None
+    return indice_mes(encontrado.group(1), encontrado.group(2))
+
+def id_ocorrencia(id_modelo, ano, mes_num):
+    """ID da ocorrência de um modelo num mês: sempre o mesmo, então gerar de novo não duplica."""
+    return f"{PREFIXO_ID_RECORRENTE}{id_modelo}-{int(ano)}{int(mes_num):02d}"
+
+def id_modelo_conteudo(modelos):
+    """
+    IDs para modelos sem ID, derivados do conteúdo (Descrição, Categoria,
+    Valor, Frequência e Início): o mesmo modelo ganha o mesmo ID a cada
+    geração, então rodar de novo não duplica as ocorrências. Modelos
+    idênticos na tabela são numerados pela ordem em que aparecem.
+    """
+    vistos = Counter()
+    ids = []
+    for modelo in modelos.itertuples(index=False):
+        valor = "" if pd.isna(modelo.Valor) else f"{float(modelo.Valor):.2f}" # 1500 e '1500.0' dão o mesmo ID
+        chave = "|".join((
+            modelo.Descricao.lower(), str(modelo.Categoria), valor, modelo.Frequencia, str(modelo.Inicio).strip(),
+        ))
+        resumo = hashlib.sha1(chave.encode("utf-8")).hexdigest()[:8]
+        ids.append(f"{resumo}-{vistos[resumo] + 1}" if vistos[resumo] else resumo)
+        vistos[resumo] += 1
+    return ids
+
+# =================================================================
+# === MODELOS ===
+# =================================================================
+
+def normalizar_modelos(df):
+    """
+    Modelos editados na tela (ou lidos do armazenamento) no formato de
+    COLUNAS_RECORRENCIAS: linhas sem descrição são descartadas, modelos novos
+    ganham um ID derivado do conteúdo (`id_modelo_conteudo`) e
+    Status/Frequência vazios recebem o padrão. Devolve
+    (modelos, erros), em que `erros` lista (descrição, motivo) das linhas
+    que não podem gerar transações.
+    """
+    if df is None or df.empty:
+        return pd.DataFrame(columns=COLUNAS_RECORRENCIAS), []
+    df = df.reindex(columns=COLUNAS_RECORRENCIAS)
+    df = df.astype(object).where(df.notna(), None)
+    df = df[df['Descricao'].map(lambda d: bool(d and str(d).strip()))].copy()
+    df['Descricao'] = df['Descricao'].map(lambda d: str(d).strip())
+    df['Valor'] = pd.to_numeric(df['Valor'], errors='coerce').round(2)
+    df['Status'] = df['Status'].where(df['Status'].isin(list(STATUS_PRIORIDADE)), STATUS_DEFAULT)
+    df['Frequencia'] = df['Frequencia'].where(df['Frequencia'].isin(list(FREQUENCIAS)), 'Mensal')
+    df['Fim'] = df['Fim'].map(lambda f: str(f).strip() if f else "")
+    sem_id = df['ID Modelo'].map(lambda i: not i).to_numpy()
+    if sem_id.any():
+        df.loc[sem_id, 'ID Modelo'] = id_modelo_conteudo(df[sem_id])
+    df['ID Modelo'] = df['ID Modelo'].map(str)
+
+    erros = []
+    for modelo in df.itertuples(index=False):
+        if modelo.Categoria not in CATEGORIAS:
+            erros.append((modelo.Descricao, "categoria deve ser Receita ou Despesa"))
+        elif pd.isna(modelo.Valor) or modelo.Valor <= 0:
+            erros.append((modelo.Descricao, "valor inválido ou zero"))
+        elif ler_mes(modelo.Inicio) is None:
+            erros.append((modelo.Descricao, "início deve estar no formato AAAA-MM"))
+        elif modelo.Fim and ler_mes(modelo.Fim) is None:
+            erros.append((modelo.Descricao, "fim deve estar no formato AAAA-MM (ou vazio)"))
+    return df.reset_index(drop=True), erros
+
+# =================================================================
+# === GERAÇÃO ===
+# =================================================================
+
+def materializar(modelos, inicio, fim):
+    """
+    Todas as ocorrências dos modelos entre os meses `inicio` e `fim`
+    (`indice_mes`, inclusive), em COLUNAS_SIMPLIFICADAS e com IDs de
+    `id_ocorrencia`.
+
+    Uma matriz modelos x meses diz quais meses vencem (dentro do período do
+    modelo e múltiplos da frequência a partir do início); as linhas saem de
+    uma vez do np.nonzero, sem laço por mês.
+    """
+    modelos, _ = normalizar_modelos(modelos)
+    inicios = modelos['Inicio'].map(ler_mes)
+    fins = modelos['Fim'].map(lambda f: ler_mes(f) if f else fim)
+    validos = (
+        inicios.notna() & fins.notna() & modelos['Categoria'].isin(CATEGORIAS)
+        & modelos['Valor'].gt(0)
+    )
+    modelos, inicios, fins = modelos[validos], inicios[validos], fins[validos]
+    if modelos.empty or fim < inicio:
+        return pd.DataFrame(columns=COLUNAS_SIMPLIFICADAS)
+
+    meses = np.arange(inicio, fim + 1)
+    inicio_modelo = inicios.to_numpy(dtype=np.int64)[:, None]
+    fim_modelo = fins.to_numpy(dtype=np.int64)[:, None]
+    passo = modelos['Frequencia'].map(FREQUENCIAS).to_numpy(dtype=np.int64)[:, None]
+    vence = (meses >= inicio_modelo) & (meses <= fim_modelo) & ((meses - inicio_modelo) % passo == 0)
+    linha_modelo, coluna_mes = np.nonzero(vence)
+
+    ocorrencias = modelos.iloc[linha_modelo].reset_index(drop=True)
+    ano, mes_num = mes_do_indice(meses[coluna_mes])
+    return pd.DataFrame({
+        'ID Transacao': [id_ocorrencia(i, a, m) for i, a, m in zip(ocorrencias['ID Modelo'], ano, mes_num)],
+        'Mês': pd.Series(mes_num).map(MESES_PT),
+        'Descricao': ocorrencias['Descricao'],
+        'Categoria': ocorrencias['Categoria'],
+        'Valor': ocorrencias['Valor'].astype(float),
+        'Status': ocorrencias['Status'],
+        'Ano': ano.astype('int64'),
+    }, columns=COLUNAS_SIMPLIFICADAS)
+
+def _ids_existentes(armazenamento, ano):
+    """IDs já gravados no ano mais os que ainda estão na fila de escrita."""
+    df = armazenamento.carregar(ano)
+    ids = set() if df.empty else set(df['ID Transacao'].astype(str))
+    fila = armazenamento.pendentes(ano)
+    if fila is not None:
+        ids.update(fila.ids_pendentes())
+    return ids
+
+def gerar_recorrencias(modelos, armazenamento, inicio, fim, gravar=True):
+    """
+    Materializa os modelos entre `inicio` e `fim` (`indice_mes`) e grava as
+    ocorrências que ainda não existem com um único `inserir_lote`.
+
+    Como o ID de cada ocorrência é determinístico (modelo + mês), rodar de
+    novo para o mesmo período não duplica nada: só entram os meses que
+    faltam. Uma ocorrência editada depois de gerada continua como está; uma
+    excluída volta se o seu mês for gerado de novo. Com `gravar=False` só
+    devolve o resumo.
+    """
+    previstas = materializar(modelos, inicio, fim)
+    existentes = set()
+    for ano in previstas['Ano'].unique():
+        existentes |= _ids_existentes(armazenamento, int(ano))
+    novas = previstas[~previstas['ID Transacao'].isin(existentes)].reset_index(drop=True)
+
+    if gravar and not novas.empty:
+        armazenamento.inserir_lote(novas)
+    return {
+        "previstas": len(previstas),
+        "existentes": len(previstas) - len(novas),
+        "novas": novas,
+        "por_ano": {int(ano): int(n) for ano, n in novas['Ano'].value_counts().sort_index().items()},
+        "gravadas": len(novas) if gravar else 0,
+    }
+
+# =================================================================
+# === TELA DE RECORRÊNCIAS ===
+# =================================================================
+
+def renderizar_recorrencias(armazenamento, ano_padrao, ao_concluir=None):
+    """Edição dos modelos (tabela editável) e geração das ocorrências de um período, com pré-visualização."""
+    try:
+        salvos = armazenamento.ler_recorrencias()
+    except ConnectionError as e:
+        st.caption(f"⏳ {e}")
+        return
+    except Exception as e:
+        st.error(f"🚫 Erro ao ler os modelos de recorrência: {e}")
+        return
+    if salvos is None:
+        st.caption("Este armazenamento não guarda modelos de recorrência.")
+        return
+
+    st.caption(
+        "Contas fixas (aluguel, assinaturas, salário...). Início e Fim no formato AAAA-MM; "
+        "Fim vazio = sem data para terminar."
+    )
+    editados = st.data_editor(
+        salvos.reindex(columns=COLUNAS_RECORRENCIAS), num_rows="dynamic", hide_index=True,
+        width="stretch", key="editor_recorrencias",
+        column_config={
+            'ID Modelo': None, # Gerado ao salvar
+            'Descricao': st.column_config.TextColumn("Descrição", required=True),
+            'Categoria': st.column_config.SelectboxColumn("Categoria", options=CATEGORIAS, required=True),
+            'Valor': st.column_config.NumberColumn("Valor (R$)", min_value=0.0, step=0.01, format="%.2f"),
+            'Status': st.column_config.SelectboxColumn("Status", options=list(STATUS_PRIORIDADE), default=STATUS_DEFAULT),
+            'Frequencia': st.column_config.SelectboxColumn("Frequência", options=list(FREQUENCIAS), default='Mensal'),
+            'Inicio': st.column_config.TextColumn("Início (AAAA-MM)"),
+            'Fim': st.column_config.TextColumn("Fim (AAAA-MM)"),
+        },
+    )
+    modelos, erros = normalizar_modelos(editados)
+    if erros:
+        st.warning("Modelos que não geram transações: " + "; ".join(f"{d} ({m})" for d, m in erros))
+    if st.button("💾 Salvar modelos", key="salvar_recorrencias"):
+        try:
+            armazenamento.gravar_recorrencias(modelos)
+            st.success(f"✅ {len(modelos)} modelo(s) salvo(s).")
+            salvos = modelos
+        except Exception as e:
+            st.error(f"🚫 Erro ao salvar os modelos: {e}")
+            return
+
+    meses = list(MESES_PT.values())
+    col_de, col_ate, col_ano = st.columns(3)
+    mes_de = col_de.selectbox("De", options=meses, index=0, key="recorrencias_de")
+    mes_ate = col_ate.selectbox("Até", options=meses, index=datetime.now().month - 1, key="recorrencias_ate")
+    ano = col_ano.number_input(
+        "Ano", min_value=2000, max_value=2100, value=int(ano_padrao), step=1, key="recorrencias_ano",
+    )
+    inicio = indice_mes(ano, meses.index(mes_de) + 1)
+    fim = indice_mes(ano, meses.index(mes_ate) + 1)
+
+    st.caption("Os lançamentos saem dos modelos salvos (o ID de cada um entra no ID das ocorrências).")
+    col_previa, col_gerar = st.columns(2)
+    previa = col_previa.button("🔎 Pré-visualizar (sem gravar)", key="previa_recorrencias")
+    confirmar = col_gerar.button("🔁 Gerar lançamentos", type="primary", key="gerar_recorrencias")
+    if not (previa or confirmar):
+        return
+
+    try:
+        with st.spinner("Gerando lançamentos..."):
+            resumo = gerar_recorrencias(salvos, armazenamento, inicio, fim, gravar=confirmar)
+    except Exception as e:
+        st.error(f"🚫 Erro ao gerar os lançamentos: {e}")
+        return
+
+    st.write(
+        f"**{resumo['previstas']}** lançamento(s) no período · **{len(resumo['novas'])}** novo(s) · "
+        f"{resumo['existentes']} já gerado(s)"
+    )
+    if not resumo['novas'].empty:
+        st.dataframe(resumo['novas'].drop(columns='ID Transacao'), hide_index=True, width="stretch")
+    if confirmar:
+        st.success(f"✅ {resumo['gravadas']} lançamento(s) gravado(s).")
+        if ao_concluir is not None:
+            ao_concluir(resumo)
@@ -0,0 +1,74 @@
+# tendencias.py (VISÃO DO ANO: SÉRIE MENSAL, ACUMULADO NO ANO, SALDO PENDENTE E VARIAÇÃO MÊS A MÊS)
+import pandas as pd
+import streamlit as st
+
+from formatacao import format_currency_vetorizado
+
+SERIES_MENSAIS = {
+    # coluna da tabela de KPIs: rótulo
+    'receita_bruta': 'Receitas',
+    'despesa_bruta': 'Despesas',
+    'lucro_liquido': 'Lucro',
+}
+
+# =================================================================
+# === CÁLCULO ===
+# =================================================================
+
+def calcular_tendencias(tabela_kpis):
+    """
+    A partir da tabela de KPIs por mês (`kpis.calcular_tabela_kpis`, um único
+    groupby sobre o ano), monta em operações vetorizadas de 12 linhas:
+    Receitas/Despesas/Lucro do mês, o acumulado no ano de cada um, o saldo
+    de despesas pendentes acumulado e a variação em relação ao mês anterior.
+    """
+    mensal = tabela_kpis[list(SERIES_MENSAIS)].rename(columns=SERIES_MENSAIS)
+    return pd.concat(
+        [
+            mensal,
+            mensal.cumsum().add_suffix(' no ano'),
+            tabela_kpis['despesa_pendente'].cumsum().rename('Pendente acumulado'),
+            mensal.diff().fillna(0.0).add_prefix('Δ '),
+        ],
+        axis=1,
+    ).round(2)
+
+# =================================================================
+# === GRÁFICOS ===
+# =================================================================
+
+def _grafico(tendencias, colunas, titulo, marca):
+    import altair as alt # ~0,8 s de importação: só quando as tendências são abertas, não na partida do app
+
+    meses = list(tendencias.index)
+    dados = tendencias[colunas].reset_index(names='Mês').melt('Mês', var_name='Série', value_name='R$')
+    base = alt.Chart(dados, title=titulo).encode(
+        x=alt.X('Mês:N', sort=meses, title=None), # Jan..Dez, não em ordem alfabética
+        y=alt.Y('R$:Q', title=None),
+        color=alt.Color('Série:N', title=None, legend=alt.Legend(orient='bottom')),
+        tooltip=['Mês', 'Série', alt.Tooltip('R$:Q', format=',.2f')],
+    )
+    if marca == 'barra':
+        return base.mark_bar().encode(xOffset='Série:N')
+    return base.mark_line(point=True)
+
+def renderizar_tendencias(tendencias, ano):
+    """Gráficos do ano (mensal e acumulado) e tabela de variação mês a mês."""
+    col_mensal, col_acumulado = st.columns(2)
+    col_mensal.altair_chart(
+        _grafico(tendencias, ['Receitas', 'Despesas'], f"Receitas x Despesas por mês ({ano})", 'barra'),
+        width="stretch",
+    )
+    col_acumulado.altair_chart(
+        _grafico(
+            tendencias, ['Receitas no ano', 'Despesas no ano', 'Lucro no ano', 'Pendente acumulado'],
+            f"Acumulado no ano ({ano})", 'linha',
+        ),
+        width="stretch",
+    )
+
+    variacao = tendencias[['Lucro', 'Δ Receitas', 'Δ Despesas', 'Δ Lucro']]
+    st.dataframe(
+        variacao.apply(format_currency_vetorizado),
+        width="stretch",
+    )
@@ -0,0 +1,6 @@
+# tests/conftest.py (RAIZ DO APP E FAKES DOS BENCHMARKS NO sys.path)
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [RAIZ, os.path.join(RAIZ, "benchmarks")]
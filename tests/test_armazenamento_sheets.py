@@ -0,0 +1,33 @@
+# tests/test_armazenamento_sheets.py (BACKEND SHEETS: ABERTURA SÓ PARA LEITURA DO CLI DE EXPORTAÇÃO)
+import pytest
+
+import armazenamento_sheets
+from armazenamento_sheets import ArmazenamentoSheets
+from gerador import gerar_transacoes
+from planilha_falsa import PlanilhaFalsa
+
+def _planilha(quantidade=20):
+    planilha = PlanilhaFalsa()
+    df = gerar_transacoes(quantidade, ano=2025)
+    planilha.adicionar_aba('TRANSACOES_2025', [list(df.columns)] + df.astype(object).to_numpy().tolist())
+    return planilha
+
+def test_somente_leitura_nao_abre_o_cache_do_app(monkeypatch):
+    def proibido(titulo):
+        raise AssertionError(f"arquivo do app aberto para {titulo}")
+    monkeypatch.setattr(armazenamento_sheets, "caminho_espelho", proibido)
+    monkeypatch.setattr(armazenamento_sheets, "caminho_fila", proibido)
+
+    armazenamento = ArmazenamentoSheets(_planilha(), somente_leitura=True)
+    assert len(armazenamento.carregar(2025)) == 20
+    assert armazenamento.pendentes(2025) is None # Sem fila, sem timer
+    assert armazenamento.descarregar(2025, forcar=True) is None
+
+def test_somente_leitura_recusa_escritas():
+    armazenamento = ArmazenamentoSheets(_planilha(), somente_leitura=True)
+    df = armazenamento.carregar(2025)
+    with pytest.raises(PermissionError):
+        armazenamento.deletar(df['ID Transacao'].iloc[0], 2025)
+    with pytest.raises(PermissionError):
+        armazenamento.inserir_lote(gerar_transacoes(2, ano=2025))
+    assert len(armazenamento.carregar(2025)) == 20
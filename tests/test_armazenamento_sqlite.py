@@ -0,0 +1,26 @@
+# tests/test_armazenamento_sqlite.py (BACKEND SQLITE: LOTE SEM DUPLICAR NO CACHE)
+from armazenamento_sqlite import ArmazenamentoSQLite
+from gerador import gerar_transacoes
+
+def test_inserir_lote_avisa_so_as_linhas_gravadas():
+    armazenamento = ArmazenamentoSQLite(":memory:")
+    avisos = []
+    armazenamento.ao_gravar = lambda ano, aplicadas: avisos.append((ano, aplicadas))
+    df = gerar_transacoes(6, ano=2025)
+    armazenamento.inserir_lote(df.iloc[:4])
+    avisos.clear()
+
+    armazenamento.inserir_lote(df.iloc[[2, 3, 4, 5, 5]]) # 2 já gravadas, 1 repetida no lote
+    assert [(ano, [i for _, i, _ in aplicadas]) for ano, aplicadas in avisos] == [
+        (2025, list(df['ID Transacao'].iloc[[4, 5]])),
+    ]
+    assert len(armazenamento.carregar(2025)) == 6
+
+def test_inserir_lote_so_com_repetidas_nao_avisa():
+    armazenamento = ArmazenamentoSQLite(":memory:")
+    df = gerar_transacoes(3, ano=2025)
+    armazenamento.inserir_lote(df)
+    avisos = []
+    armazenamento.ao_gravar = lambda ano, aplicadas: avisos.append(aplicadas)
+    armazenamento.inserir_lote(df)
+    assert avisos == []
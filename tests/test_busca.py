@@ -0,0 +1,74 @@
+# tests/test_busca.py (ÍNDICE DE BUSCA: CORREÇÃO INCREMENTAL PELO CACHE IGUAL À RECONSTRUÇÃO)
+import pytest
+
+from busca import IndiceBusca
+from cache_transacoes import CacheTransacoes
+from dados import COLUNAS_SIMPLIFICADAS, MESES_PT, preparar_transacoes
+from fila_mutacoes import OP_ATUALIZAR, OP_DELETAR, OP_INSERIR
+from gerador import gerar_transacoes
+
+CONSULTAS = [
+    {},
+    {"texto": "agua"},
+    {"texto": "ÁGUA"},
+    {"texto": "conta de ág"},
+    {"texto": "alug"},
+    {"texto": "mercado", "status": ["PENDENTE"]},
+    {"categorias": ["Receita"], "meses": ["Jan", "Dez"]},
+    {"texto": "farm", "centavos_min": 5_000, "centavos_max": 50_000},
+]
+
+def _dados(id_transacao, descricao, valor=120.0, categoria='Despesa', status='PAGO', mes='Mar'):
+    return {'ID Transacao': id_transacao, 'Mês': mes, 'Descricao': descricao, 'Categoria': categoria,
+            'Valor': valor, 'Status': status, 'Ano': 2025}
+
+def _conferir(cache):
+    """Resultados e contagens do índice corrigido pelo cache == índice montado do zero sobre o mesmo DataFrame."""
+    novo = IndiceBusca(cache.obter())
+    for consulta in CONSULTAS:
+        _, ids, contagens = cache.buscar(**consulta)
+        assert sorted(ids) == sorted(novo.buscar(**consulta)), consulta
+        facetas = {k: v for k, v in consulta.items() if k in ("texto", "centavos_min", "centavos_max")}
+        assert contagens == novo.contar_facetas(**facetas), consulta
+
+@pytest.fixture
+def cache():
+    df = preparar_transacoes(gerar_transacoes(3000).assign(_linha=range(2, 3002)))
+    cache = CacheTransacoes(lambda: df, preparar_transacoes, COLUNAS_SIMPLIFICADAS, MESES_PT.values(), ttl_segundos=3600)
+    cache.buscar() # Primeira busca monta o índice; daqui em diante ele só é corrigido
+    return cache
+
+def test_insercao_atualizacao_e_remocao(cache):
+    ids = cache.obter()['ID Transacao'].tolist()
+    cache.aplicar_insercao(_dados("NOVA-1", "Conta de Água da praia", categoria='Receita', mes='Dez'))
+    cache.aplicar_atualizacao(ids[0], _dados(ids[0], "Conta de água atrasada", status='PENDENTE'))
+    cache.aplicar_atualizacao(ids[1], _dados(ids[1], "Aluguel do galpão", valor="abc")) # Some: valor inválido
+    cache.aplicar_remocao(ids[2])
+    _conferir(cache)
+
+    _, encontrados, _ = cache.buscar("agua")
+    assert {"NOVA-1", ids[0]} <= set(encontrados)
+    assert ids[1] not in cache.buscar("galpao")[1] and ids[2] not in cache.buscar()[1]
+
+def test_lote_de_mutacoes(cache):
+    ids = cache.obter()['ID Transacao'].tolist()
+    cache.aplicar_mutacoes([
+        (OP_DELETAR, ids[10], None),
+        (OP_INSERIR, "NOVA-2", _dados("NOVA-2", "Farmácia São João", valor=80.0)),
+        (OP_ATUALIZAR, ids[2500], _dados(ids[2500], "Mercado Água Limpa", status='PENDENTE')),
+        (OP_ATUALIZAR, "NOVA-2", _dados("NOVA-2", "Farmácia Popular", valor=90.0)),
+    ])
+    _conferir(cache)
+    assert cache.buscar("sao joao")[1] == [] and cache.buscar("farmacia popular")[1] == ["NOVA-2"]
+
+def test_remocoes_em_massa_compactam_sem_perder_linhas():
+    df = preparar_transacoes(gerar_transacoes(3000).assign(_linha=range(2, 3002)))
+    indice = IndiceBusca(df)
+    indice.remover(df['ID Transacao'].iloc[:2000])
+    assert indice._tamanho == 1000 # Mais da metade morta: arrays compactados
+    indice.adicionar(df.iloc[[0, 2999]]) # Uma removida volta; uma viva é substituída
+    restantes = df.iloc[[0] + list(range(2000, 3000))]
+    novo = IndiceBusca(restantes)
+    for consulta in CONSULTAS:
+        assert sorted(indice.buscar(**consulta)) == sorted(novo.buscar(**consulta)), consulta
+    assert len(indice) == len(restantes)
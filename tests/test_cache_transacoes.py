@@ -0,0 +1,96 @@
+# tests/test_cache_transacoes.py (CACHE DO ANO: VERSÃO JUNTO COM OS DADOS, RECARGA EM SEGUNDO PLANO)
+import threading
+import time
+
+import pandas as pd
+
+from cache_transacoes import CacheTransacoes
+from dados import COLUNAS_SIMPLIFICADAS, MESES_PT, preparar_transacoes
+from fila_mutacoes import OP_ATUALIZAR, OP_DELETAR, OP_INSERIR
+from gerador import gerar_transacoes
+from kpis import calcular_tabela_kpis
+
+def _cache(carregar):
+    return CacheTransacoes(carregar, preparar_transacoes, COLUNAS_SIMPLIFICADAS, MESES_PT.values(), ttl_segundos=3600)
+
+def _preparadas(df):
+    return preparar_transacoes(df.assign(_linha=range(2, len(df) + 2)))
+
+def test_obter_com_kpis_devolve_a_versao_dos_dados():
+    cargas = [_preparadas(gerar_transacoes(30)), _preparadas(gerar_transacoes(40, semente=7))]
+    cache = _cache(lambda: cargas.pop(0))
+    df, kpis, versao = cache.obter_com_kpis()
+    assert versao == cache.versao
+    cache.invalidar() # Próxima leitura troca tudo: a versão lida junto muda com a tabela
+    df_novo, kpis_novos, versao_nova = cache.obter_com_kpis()
+    assert len(df_novo) == 40 and versao_nova != versao
+    pd.testing.assert_frame_equal(kpis_novos, calcular_tabela_kpis(df_novo, MESES_PT.values()))
+
+class CargaControlada:
+    """Devolve `dfs` em ordem; da segunda carga em diante (as recargas) espera `liberar` antes de devolver."""
+
+    def __init__(self, *dfs):
+        self.dfs = list(dfs)
+        self.chamadas = 0
+        self.iniciada = threading.Event()
+        self.liberar = threading.Event()
+
+    def __call__(self):
+        self.chamadas += 1
+        if self.chamadas > 1:
+            self.iniciada.set()
+            assert self.liberar.wait(10)
+        return self.dfs.pop(0)
+
+def _recarregar_preso(cache, carga):
+    cache.recarregar_em_segundo_plano()
+    assert carga.iniciada.wait(10) and cache.recarregando
+
+def _terminar(cache, carga):
+    carga.liberar.set()
+    limite = time.time() + 10
+    while cache.recarregando and time.time() < limite:
+        time.sleep(0.01)
+    assert not cache.recarregando
+
+def _dados(df, i, **campos):
+    return {**df.iloc[i][COLUNAS_SIMPLIFICADAS].to_dict(), **campos}
+
+def test_escrita_durante_a_recarga_e_reaplicada():
+    brutas = gerar_transacoes(30)
+    novas = gerar_transacoes(2, semente=7).assign(**{'ID Transacao': ['TRX-NOVA-0', 'TRX-NOVA-1']})
+    # O download da recarga já traz a inserção TRX-NOVA-0, mas não a atualização nem a exclusão
+    carga = CargaControlada(_preparadas(brutas), _preparadas(pd.concat([brutas, novas.iloc[:1]], ignore_index=True)))
+    cache = _cache(carga)
+    cache.obter()
+    cache.buscar()
+    _recarregar_preso(cache, carga)
+
+    cache.aplicar_mutacoes([
+        (OP_INSERIR, 'TRX-NOVA-0', _dados(novas, 0)),
+        (OP_INSERIR, 'TRX-NOVA-1', _dados(novas, 1)),
+        (OP_ATUALIZAR, brutas['ID Transacao'][3], _dados(brutas, 3, Valor=1.23)),
+        (OP_DELETAR, brutas['ID Transacao'][4], None),
+    ])
+    versao = cache.versao
+    _terminar(cache, carga)
+
+    df, kpis, versao_final = cache.obter_com_kpis()
+    assert versao_final > versao
+    ids = df['ID Transacao'].tolist()
+    assert sorted(ids) == sorted(set(brutas['ID Transacao']) - {brutas['ID Transacao'][4]} | {'TRX-NOVA-0', 'TRX-NOVA-1'})
+    assert df.loc[df['ID Transacao'] == brutas['ID Transacao'][3], 'Centavos'].tolist() == [123]
+    pd.testing.assert_frame_equal(kpis, calcular_tabela_kpis(df, MESES_PT.values()))
+    assert sorted(cache.buscar()[1]) == sorted(ids)
+
+def test_invalidar_durante_a_recarga_descarta_o_resultado():
+    carga = CargaControlada(*(_preparadas(gerar_transacoes(n, semente=n)) for n in (30, 40, 50)))
+    cache = _cache(carga)
+    cache.obter()
+    _recarregar_preso(cache, carga)
+
+    cache.invalidar()
+    _terminar(cache, carga)
+    assert not cache.carregado() # O download de antes do invalidar() não entra
+
+    assert len(cache.obter()) == 50 and carga.chamadas == 3
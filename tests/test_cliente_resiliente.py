@@ -0,0 +1,91 @@
+# tests/test_cliente_resiliente.py (COTA E REENVIO COM BACKOFF, COM RELÓGIO E SONO SIMULADOS)
+import pytest
+
+from cliente_resiliente import BaldeTokens, ControleCota
+from planilha_falsa import APIErrorFalso
+
+class RelogioFalso:
+    """`relogio` e `dormir` para o ControleCota: dormir só avança o tempo e anota a pausa."""
+
+    def __init__(self):
+        self.agora = 0.0
+        self.dormidas = []
+
+    def __call__(self):
+        return self.agora
+
+    def dormir(self, segundos):
+        self.dormidas.append(segundos)
+        self.agora += segundos
+
+def _falha_antes(erros, resultado="ok"):
+    """Função que levanta cada erro de `erros`, uma chamada por vez, e depois devolve `resultado`."""
+    pendentes = list(erros)
+    chamadas = []
+
+    def funcao():
+        chamadas.append(1)
+        if pendentes:
+            raise pendentes.pop(0)
+        return resultado
+    funcao.chamadas = chamadas
+    return funcao
+
+def _controle(relogio, **kwargs):
+    # Cota alta: o balde não limita, as pausas anotadas são só as do backoff
+    opcoes = dict(cota_leitura=6000, cota_escrita=6000, espera_base=1.0, espera_maxima=4.0,
+                  relogio=relogio, dormir=relogio.dormir, aleatorio=lambda: 1.0)
+    return ControleCota(**dict(opcoes, **kwargs))
+
+def test_backoff_exponencial_limitado():
+    relogio = RelogioFalso()
+    controle = _controle(relogio)
+    funcao = _falha_antes([APIErrorFalso(429)] * 4)
+    assert controle.executar(funcao) == "ok"
+    assert relogio.dormidas == [1.0, 2.0, 4.0, 4.0]
+    assert controle.estatisticas["reenvios"] == 4
+    assert controle.estatisticas["espera_backoff_s"] == 11.0
+
+def test_jitter_e_retry_after():
+    relogio = RelogioFalso()
+    controle = _controle(relogio, aleatorio=lambda: 0.25)
+    erro = APIErrorFalso(429)
+    erro.response.headers = {"Retry-After": "7"}
+    assert controle.executar(_falha_antes([APIErrorFalso(429), erro])) == "ok"
+    assert relogio.dormidas == [0.25, 7.0] # 0.25 * 1 s; o servidor pediu mais que o jitter
+
+def test_escrita_so_repete_429():
+    relogio = RelogioFalso()
+    controle = _controle(relogio)
+    assert controle.executar(_falha_antes([APIErrorFalso(429)]), leitura=False) == "ok"
+    funcao = _falha_antes([APIErrorFalso(500)])
+    with pytest.raises(APIErrorFalso):
+        controle.executar(funcao, leitura=False) # Pode ter sido aplicada: não reenvia
+    assert len(funcao.chamadas) == 1
+    assert controle.executar(_falha_antes([APIErrorFalso(503), ConnectionError()])) == "ok" # Leitura reenvia
+
+def test_desiste_depois_das_tentativas():
+    relogio = RelogioFalso()
+    controle = _controle(relogio, tentativas=3)
+    funcao = _falha_antes([APIErrorFalso(429)] * 3)
+    with pytest.raises(APIErrorFalso):
+        controle.executar(funcao)
+    assert len(funcao.chamadas) == 3
+    assert relogio.dormidas == [1.0, 2.0]
+    assert controle.estatisticas["falhas"] == 1
+
+def test_balde_limita_o_ritmo_depois_da_rajada():
+    relogio = RelogioFalso()
+    balde = BaldeTokens(60, capacidade=10, relogio=relogio, dormir=relogio.dormir)
+    assert [balde.aguardar() for _ in range(10)] == [0.0] * 10
+    assert balde.aguardar() == pytest.approx(60 / 50) # Reposição de (60 - 10) por minuto
+    relogio.agora += 600
+    assert [balde.aguardar() for _ in range(10)] == [0.0] * 10 # Cheio de novo, sem passar da capacidade
+    assert balde.aguardar() > 0
+
+def test_429_esvazia_o_balde():
+    relogio = RelogioFalso()
+    controle = _controle(relogio, cota_leitura=60, espera_maxima=0.0)
+    assert controle.executar(_falha_antes([APIErrorFalso(429)])) == "ok"
+    # Backoff zerado: a única pausa é o balde, esvaziado pelo 429, repondo um token
+    assert relogio.dormidas == [0.0, pytest.approx(60 / 50)]
@@ -0,0 +1,57 @@
+# tests/test_dados.py (LIMPEZA INCREMENTAL IGUAL À LIMPEZA COMPLETA)
+import pandas as pd
+import pytest
+
+from dados import CATEGORIAS, atualizar_preparadas, preparar_transacoes
+from gerador import gerar_transacoes
+
+def _com_linhas(df):
+    return df.reset_index(drop=True).assign(_linha=range(2, len(df) + 2))
+
+def _conferir(antes, depois):
+    """`atualizar_preparadas` sobre `antes` tem de dar o mesmo que limpar `depois` inteiro."""
+    ids_antes = dict(zip(antes['ID Transacao'], antes.drop(columns='_linha').values.tolist()))
+    alterados = {
+        linha[0] for linha in depois.drop(columns='_linha').values.tolist() if ids_antes.get(linha[0]) != linha
+    } | (set(ids_antes) - set(depois['ID Transacao']))
+    linhas_por_id = dict(zip(depois['ID Transacao'], depois['_linha']))
+    brutas = depois[depois['ID Transacao'].isin(alterados)]
+
+    incremental = atualizar_preparadas(preparar_transacoes(antes), brutas, alterados, linhas_por_id)
+    pd.testing.assert_frame_equal(incremental, preparar_transacoes(depois).reset_index(drop=True))
+    return incremental
+
+@pytest.fixture
+def antes():
+    return _com_linhas(gerar_transacoes(200, ano=2025).astype(object)) # Como vêm da planilha: sem dtype
+
+def test_linhas_alteradas(antes):
+    depois = antes.copy()
+    depois.loc[[3, 50, 199], 'Valor'] = [1.5, 2.25, 1000]
+    depois.loc[80, ['Mês', 'Status']] = ['Dez', 'PENDENTE']
+    depois.loc[120, 'Valor'] = 'abc' # Deixa de passar na limpeza
+    _conferir(antes, depois)
+
+def test_linhas_removidas(antes):
+    depois = _com_linhas(antes.drop(index=[0, 10, 11, 150]).drop(columns='_linha')) # As de baixo sobem
+    _conferir(antes, depois)
+
+def test_linhas_acrescentadas(antes):
+    novas = gerar_transacoes(5, semente=7, ano=2025).assign(
+        **{'ID Transacao': [f"TRX-NOVA-{i}" for i in range(5)]}
+    )
+    depois = _com_linhas(pd.concat([antes.drop(columns='_linha'), novas]))
+    _conferir(antes, depois)
+
+def test_categoria_fora_das_conhecidas(antes):
+    depois = antes.copy()
+    depois.loc[[5, 6], 'Categoria'] = 'Investimento'
+    depois = _com_linhas(depois.drop(index=9).drop(columns='_linha'))
+    incremental = _conferir(antes, depois)
+    assert list(incremental['Categoria'].cat.categories) == CATEGORIAS + ['Investimento']
+
+def test_categoria_fora_das_conhecidas_removida(antes):
+    antes.loc[5, 'Categoria'] = 'Investimento'
+    depois = _com_linhas(antes.drop(index=5).drop(columns='_linha'))
+    incremental = _conferir(antes, depois) # Sem linhas novas para preparar: só remoções
+    assert list(incremental['Categoria'].cat.categories) == CATEGORIAS
@@ -0,0 +1,129 @@
+# tests/test_espelho_local.py (SINCRONIZAÇÃO DO ESPELHO CONTRA A PLANILHA FALSA)
+import sqlite3
+
+import pytest
+
+import espelho_local
+from espelho_local import EspelhoLocal
+from planilha_falsa import PlanilhaFalsa
+
+CABECALHO = ['ID Transacao', 'Mês', 'Descricao', 'Categoria', 'Valor', 'Status', 'Ano']
+
+def _linha(i, valor=10.0):
+    return [f"TRX-{i:04d}", 'Jan', f"Compra {i}", 'Despesa', valor, 'PAGO', 2025]
+
+def _aba(quantidade):
+    planilha = PlanilhaFalsa()
+    return planilha.adicionar_aba('TRANSACOES_2025', [CABECALHO] + [_linha(i) for i in range(quantidade)])
+
+def _espelho_igual_a_planilha(espelho, aba):
+    df = espelho.carregar()
+    assert df['_linha'].tolist() == list(range(2, len(aba.linhas) + 1))
+    assert df.drop(columns='_linha').values.tolist() == aba.linhas[1:]
+    assert espelho.ids_por_linha() == {
+        linha[0]: numero for numero, linha in enumerate(aba.linhas[1:], start=2) if linha[0]
+    }
+
+@pytest.fixture
+def espelho():
+    return EspelhoLocal(":memory:")
+
+def test_sem_alteracao_faz_uma_chamada(espelho):
+    aba = _aba(50)
+    espelho.sincronizar(aba)
+    aba.spreadsheet.chamadas.clear()
+    revisao = espelho.revisao
+    resumo = espelho.sincronizar(aba)
+    assert aba.spreadsheet.total_chamadas() == 1
+    assert resumo["baixadas"] == resumo["editadas"] == 0
+    assert espelho.revisao == revisao
+
+def test_insercoes_e_exclusoes(espelho):
+    aba = _aba(50)
+    espelho.sincronizar(aba)
+    revisao = espelho.revisao
+    del aba.linhas[10]
+    del aba.linhas[30]
+    aba.linhas.insert(5, _linha(900))
+    aba.linhas.append(_linha(901))
+    resumo = espelho.sincronizar(aba)
+    assert (resumo["baixadas"], resumo["removidas"]) == (2, 2)
+    _espelho_igual_a_planilha(espelho, aba)
+    assert espelho.alteracoes_desde(revisao) == {"TRX-0009", "TRX-0030", "TRX-0900", "TRX-0901"}
+
+def test_exclusao_nao_regrava_as_linhas_seguintes(espelho):
+    aba = _aba(50)
+    espelho.sincronizar(aba)
+    ordens = dict(espelho._conn.execute("SELECT id, ordem FROM linhas").fetchall())
+    del aba.linhas[1]
+    espelho.sincronizar(aba)
+    assert dict(espelho._conn.execute("SELECT id, ordem FROM linhas").fetchall()) == {
+        i: o for i, o in ordens.items() if i != "TRX-0000"
+    }
+    _espelho_igual_a_planilha(espelho, aba)
+
+def test_linhas_reordenadas(espelho):
+    aba = _aba(20)
+    espelho.sincronizar(aba)
+    aba.linhas[1:] = list(reversed(aba.linhas[1:]))
+    espelho.sincronizar(aba)
+    _espelho_igual_a_planilha(espelho, aba)
+
+def test_muitas_insercoes_no_mesmo_lugar(espelho):
+    aba = _aba(3)
+    espelho.sincronizar(aba)
+    for i in range(80): # Esgota a precisão entre as duas vizinhas: cai na renumeração
+        aba.linhas.insert(2, _linha(100 + i))
+        espelho.sincronizar(aba)
+    _espelho_igual_a_planilha(espelho, aba)
+
+def test_edicao_sem_mudar_id_e_detectada(espelho):
+    aba = _aba(30)
+    espelho.sincronizar(aba)
+    revisao = espelho.revisao
+    aba.linhas[7][4] = 999.0
+    resumo = espelho.sincronizar(aba)
+    assert resumo["editadas"] == 1
+    assert espelho.alteracoes_desde(revisao) == {"TRX-0006"}
+    _espelho_igual_a_planilha(espelho, aba)
+
+def test_janela_em_rodizio_alcanca_a_aba_inteira(espelho, monkeypatch):
+    monkeypatch.setattr(espelho_local, "JANELA_VERIFICACAO", 10)
+    aba = _aba(35)
+    espelho.sincronizar(aba)
+    aba.linhas[30][2] = "Editada à mão"
+    editadas = sum(espelho.sincronizar(aba)["editadas"] for _ in range(4))
+    assert editadas == 1
+    _espelho_igual_a_planilha(espelho, aba)
+
+def test_ids_vazios_e_repetidos(espelho):
+    aba = _aba(10)
+    aba.linhas[3][0] = ""
+    aba.linhas[5][0] = aba.linhas[6][0]
+    espelho.sincronizar(aba)
+    revisao = espelho.revisao
+    espelho.sincronizar(aba)
+    assert espelho.revisao == revisao # Voltaram iguais: nada mudou
+    aba.linhas[3][2] = "Outra"
+    espelho.sincronizar(aba)
+    assert espelho.alteracoes_desde(revisao) is None
+    _espelho_igual_a_planilha(espelho, aba)
+
+def test_atualizar_linhas_aplica_gravacao_do_app(espelho):
+    aba = _aba(5)
+    espelho.sincronizar(aba)
+    dados = dict(zip(CABECALHO, _linha(2, valor=55.5)))
+    assert espelho.atualizar_linhas({"TRX-0002": dados, "TRX-AUSENTE": dados}) == 1
+    assert espelho.carregar_ids(["TRX-0002"])[['_linha', 'Valor']].values.tolist() == [[4, 55.5]]
+
+def test_espelho_do_formato_antigo_e_refeito(tmp_path):
+    caminho = str(tmp_path / "espelho.sqlite")
+    with sqlite3.connect(caminho) as conn:
+        conn.execute("CREATE TABLE meta (chave TEXT PRIMARY KEY, valor TEXT)")
+        conn.execute("INSERT INTO meta VALUES ('cabecalho', 'ID Transacao')")
+        conn.execute("CREATE TABLE linhas (linha INTEGER PRIMARY KEY, id TEXT, c0)")
+    espelho = EspelhoLocal(caminho)
+    assert espelho.vazio()
+    aba = _aba(5)
+    assert espelho.sincronizar(aba)["modo"] == "completo"
+    _espelho_igual_a_planilha(espelho, aba)
@@ -0,0 +1,158 @@
+# tests/test_fila_mutacoes.py (FILA WRITE-BEHIND: CONSOLIDAÇÃO, LOTE, PERSISTÊNCIA E REPETIÇÃO)
+import threading
+
+import pytest
+
+from concorrencia import RevisaoAba
+from fila_mutacoes import OP_ATUALIZAR, OP_DELETAR, OP_INSERIR, FilaMutacoes
+from indice_linhas import IndiceLinhas
+from planilha_falsa import APIErrorFalso, PlanilhaFalsa
+
+COLUNAS = ['ID Transacao', 'Mês', 'Descricao', 'Categoria', 'Valor', 'Status', 'Ano']
+
+def _dados(id_transacao, valor=10.0):
+    return dict(zip(COLUNAS, [id_transacao, 'Jan', f"Compra {id_transacao}", 'Despesa', valor, 'PAGO', 2025]))
+
+def _aba(quantidade=5):
+    planilha = PlanilhaFalsa()
+    return planilha.adicionar_aba(
+        'TRANSACOES_2025', [COLUNAS] + [list(_dados(f"TRX-{i}").values()) for i in range(quantidade)],
+    )
+
+@pytest.fixture
+def fila(tmp_path):
+    return FilaMutacoes(COLUNAS, caminho=str(tmp_path / "fila.jsonl"))
+
+def test_consolidar(fila):
+    fila.inserir(_dados("NOVA"))
+    fila.atualizar("NOVA", _dados("NOVA", 20.0))
+    fila.inserir(_dados("ANULADA"))
+    fila.deletar("ANULADA")
+    fila.atualizar("TRX-1", _dados("TRX-1", 30.0))
+    fila.deletar("TRX-2")
+    assert fila.consolidar() == {
+        "NOVA": (OP_INSERIR, _dados("NOVA", 20.0)),
+        "TRX-1": (OP_ATUALIZAR, _dados("TRX-1", 30.0)),
+        "TRX-2": (OP_DELETAR, None),
+    }
+
+def test_descarga_em_um_lote(fila):
+    aba = _aba()
+    fila.inserir(_dados("NOVA"))
+    fila.atualizar("TRX-3", _dados("TRX-3", 99.0))
+    fila.deletar("TRX-1")
+    fila.deletar("TRX-0")
+    indice = IndiceLinhas()
+    resumo = fila.descarregar(aba, indice)
+    assert aba.spreadsheet.chamadas == {"col_values": 1, "batch_update": 1}
+    assert (resumo["inseridas"], resumo["atualizadas"], resumo["removidas"]) == (1, 1, 2)
+    assert [linha[0] for linha in aba.linhas[1:]] == ["TRX-2", "TRX-3", "TRX-4", "NOVA"]
+    assert aba.linhas[2][4] == 99.0
+    assert len(fila) == 0
+
+def test_reaplicar_e_seguro(fila):
+    aba = _aba()
+    fila.inserir(_dados("TRX-0")) # Já existe na planilha
+    fila.atualizar("AUSENTE", _dados("AUSENTE"))
+    fila.deletar("AUSENTE-2")
+    resumo = fila.descarregar(aba, IndiceLinhas())
+    assert resumo["ignoradas"] == 3 and resumo["aplicadas"] == []
+    assert "batch_update" not in aba.spreadsheet.chamadas
+    assert len(aba.linhas) == 6
+
+def test_persistencia_e_recuperacao(tmp_path):
+    caminho = str(tmp_path / "fila.jsonl")
+    fila = FilaMutacoes(COLUNAS, caminho=caminho)
+    fila.inserir(_dados("NOVA"))
+    fila.deletar("TRX-1")
+    with open(caminho, "a", encoding="utf-8") as arquivo:
+        arquivo.write('{"op": "deletar", "id": "TRX-') # Queda no meio da escrita
+    recuperada = FilaMutacoes(COLUNAS, caminho=caminho)
+    assert list(recuperada.consolidar()) == ["NOVA", "TRX-1"]
+    aba = _aba()
+    recuperada.descarregar(aba, IndiceLinhas())
+    assert [linha[0] for linha in aba.linhas[1:]] == ["TRX-0", "TRX-2", "TRX-3", "TRX-4", "NOVA"]
+    assert len(FilaMutacoes(COLUNAS, caminho=caminho)) == 0
+
+def test_falha_mantem_a_fila(fila):
+    aba = _aba()
+    fila.deletar("TRX-1")
+    aba.spreadsheet.falhas = [None, RuntimeError("rede")]
+    with pytest.raises(RuntimeError):
+        fila.descarregar(aba, IndiceLinhas())
+    assert len(fila) == 1 and len(aba.linhas) == 6
+    fila.descarregar(aba, IndiceLinhas())
+    assert len(fila) == 0 and len(aba.linhas) == 5
+
+def test_enfileirar_nao_espera_a_descarga(fila):
+    aba = _aba()
+    liberar, lendo = threading.Event(), threading.Event()
+    col_values = aba.col_values
+
+    def col_values_lento(*args, **kwargs):
+        lendo.set()
+        liberar.wait(5)
+        return col_values(*args, **kwargs)
+
+    aba.col_values = col_values_lento
+    fila.atualizar("TRX-1", _dados("TRX-1", 1.0))
+    descarga = threading.Thread(target=fila.descarregar, args=(aba, IndiceLinhas()))
+    descarga.start()
+    assert lendo.wait(5)
+    fila.deletar("TRX-2") # Com a descarga presa na rede
+    assert len(fila) == 2
+    liberar.set()
+    descarga.join(5)
+    assert [m["id"] for m in fila._mutacoes] == ["TRX-2"] # Só o retrato saiu da fila
+    assert aba.linhas[2][4] == 1.0
+
+def test_gravacao_concorrente_antes_da_primeira_revisao(tmp_path):
+    aba = _aba()
+    outra = FilaMutacoes(COLUNAS, caminho=str(tmp_path / "outra.jsonl"))
+    outra.deletar("TRX-0")
+    pendente = [outra]
+    col_values = aba.col_values
+
+    def col_values_com_outro_processo(*args, **kwargs):
+        valores = col_values(*args, **kwargs)
+        if pendente:
+            # Outro processo remove uma linha logo depois da nossa leitura da coluna
+            pendente.pop().descarregar(aba, IndiceLinhas(), RevisaoAba())
+        return valores
+
+    aba.col_values = col_values_com_outro_processo
+    fila = FilaMutacoes(COLUNAS, caminho=str(tmp_path / "fila.jsonl"))
+    fila.atualizar("TRX-3", _dados("TRX-3", 99.0))
+    resumo = fila.descarregar(aba, IndiceLinhas(), RevisaoAba())
+    assert resumo["tentativas"] == 2 and fila.conflitos == 1
+    assert [linha[0] for linha in aba.linhas[1:]] == ["TRX-1", "TRX-2", "TRX-3", "TRX-4"]
+    assert aba.linhas[3][4] == 99.0 and aba.linhas[4][4] == 10.0
+
+def test_falha_ao_criar_a_revisao_sobe_sem_repetir(fila):
+    aba = _aba()
+    planilha = aba.spreadsheet
+
+    def recusar(body):
+        planilha.chamadas["batch_update"] += 1
+        raise APIErrorFalso(403)
+
+    planilha.batch_update = recusar
+    fila.atualizar("TRX-1", _dados("TRX-1", 1.0))
+    with pytest.raises(APIErrorFalso):
+        fila.descarregar(aba, IndiceLinhas(), RevisaoAba())
+    assert planilha.chamadas["list_named_ranges"] == 2 and planilha.chamadas["batch_update"] == 1
+    assert len(fila) == 1
+
+def test_revisao_criada_por_outro_processo_durante_a_criacao():
+    aba = _aba()
+    planilha = aba.spreadsheet
+    batch_update = planilha.batch_update
+
+    def outro_processo_antes(body):
+        planilha.batch_update = batch_update
+        RevisaoAba().ler(aba) # Cria a `rev 0` primeiro: a nossa criação é recusada
+        return batch_update(body)
+
+    planilha.batch_update = outro_processo_antes
+    revisao = RevisaoAba()
+    assert revisao.ler(aba) == 0
@@ -0,0 +1,49 @@
+# tests/test_importacao.py (IMPORTAÇÃO: FORMATO DOS VALORES E DEDUPLICAÇÃO)
+import pandas as pd
+
+from armazenamento_sqlite import ArmazenamentoSQLite
+from importacao import converter_valores, importar, sugerir_mapeamento
+
+def _valores(*textos):
+    return converter_valores(pd.Series(textos, dtype='string')).tolist()
+
+def test_converter_valores_usa_o_ultimo_separador_como_decimal():
+    assert _valores('R$ 1.234,56', '-50,00', '1,234.56', '1234.56', '1.234.567', '1,234,567') == [
+        1234.56, -50.0, 1234.56, 1234.56, 1234567.0, 1234567.0,
+    ]
+
+def test_converter_valores_resolve_ambiguos_pelo_bloco():
+    assert _valores('1.234', '10,50') == [1234.0, 10.5]
+    assert _valores('1,234', '2.50') == [1234.0, 2.5]
+    assert all(pd.isna(v) for v in _valores('1,234')) # Sem indício: inválido
+    assert pd.isna(_valores('1.234', '1,5', '2.50')[0]) # Indícios dos dois formatos
+
+def _arquivo(linhas):
+    df = pd.DataFrame(linhas, columns=['Data', 'Descricao', 'Valor', 'ID'])
+    return df, sugerir_mapeamento(df.columns)
+
+def test_compras_repetidas_no_mes_sao_mantidas_e_reimportar_nao_duplica():
+    bloco, mapeamento = _arquivo([
+        ('05/03/2025', 'Café', '-8,00', ''),
+        ('19/03/2025', 'Café', '-8,00', ''),
+        ('20/03/2025', 'Café', '-8,00', ''),
+    ])
+    armazenamento = ArmazenamentoSQLite(":memory:")
+    resumo = importar([bloco], mapeamento, armazenamento, 2025)
+    assert resumo["gravadas"] == 3
+    assert armazenamento.carregar(2025)['ID Transacao'].nunique() == 3
+
+    resumo = importar([bloco], mapeamento, armazenamento, 2025)
+    assert (resumo["gravadas"], resumo["duplicadas_conteudo"]) == (0, 3)
+
+    maior, _ = _arquivo([('05/03/2025', 'Café', '-8,00', '')] * 4)
+    resumo = importar([maior], mapeamento, armazenamento, 2025)
+    assert (resumo["gravadas"], resumo["duplicadas_conteudo"]) == (1, 3)
+
+def test_linha_com_id_nao_conta_como_conteudo_visto():
+    bloco, mapeamento = _arquivo([
+        ('05/03/2025', 'Mercado', '-120,00', 'BANCO-1'),
+        ('05/03/2025', 'Mercado', '-120,00', ''),
+    ])
+    resumo = importar([bloco], mapeamento, ArmazenamentoSQLite(":memory:"), 2025)
+    assert (resumo["gravadas"], resumo["duplicadas_conteudo"]) == (2, 0)
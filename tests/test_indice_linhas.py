@@ -0,0 +1,33 @@
+# tests/test_indice_linhas.py (ÍNDICE ID -> LINHA: RETRATO DA COLUNA DE IDS A CADA DESCARGA)
+from fila_mutacoes import FilaMutacoes
+from indice_linhas import IndiceLinhas
+from planilha_falsa import PlanilhaFalsa
+
+COLUNAS = ['ID Transacao', 'Mês', 'Descricao', 'Categoria', 'Valor', 'Status', 'Ano']
+
+def test_construir_de_coluna():
+    indice = IndiceLinhas()
+    indice.construir_de_coluna(['ID Transacao', 'TRX-0', '', ' TRX-2 ', None, 'TRX-0', 'TRX-5'])
+    assert indice.linha('TRX-0') == 2 # Repetido: vale a primeira linha
+    assert indice.linha('TRX-2') == 4 # Espaços em volta do ID são ignorados
+    assert indice.linha('TRX-5') == 7
+    assert indice.linha('AUSENTE') is None
+    assert len(indice) == 3 and 'TRX-5' in indice and '' not in indice
+
+def test_construir_de_coluna_substitui_o_retrato_anterior():
+    indice = IndiceLinhas()
+    indice.construir_de_coluna(['ID Transacao', 'A', 'B'])
+    indice.construir_de_coluna(['ID Transacao', 'B'])
+    assert indice.linha('A') is None and indice.linha('B') == 2
+    indice.construir_de_coluna(['ID Transacao'])
+    assert len(indice) == 0
+
+def test_descarga_ignora_retrato_velho(tmp_path):
+    linhas = [COLUNAS] + [[f"TRX-{i}", 'Jan', f"Compra {i}", 'Despesa', 10.0, 'PAGO', 2025] for i in range(4)]
+    aba = PlanilhaFalsa().adicionar_aba('TRANSACOES_2025', linhas)
+    indice = IndiceLinhas()
+    indice.construir_de_coluna(['ID Transacao', 'TRX-3', 'TRX-2', 'TRX-1', 'TRX-0']) # Ordem que não vale mais
+    fila = FilaMutacoes(COLUNAS, caminho=str(tmp_path / "fila.jsonl"))
+    fila.deletar('TRX-1')
+    fila.descarregar(aba, indice)
+    assert [linha[0] for linha in aba.linhas[1:]] == ['TRX-0', 'TRX-2', 'TRX-3']
@@ -0,0 +1,29 @@
+# tests/test_recorrencias.py (MODELOS RECORRENTES: IDS DETERMINÍSTICOS E GERAÇÃO IDEMPOTENTE)
+import pandas as pd
+
+from armazenamento_sqlite import ArmazenamentoSQLite
+from recorrencias import gerar_recorrencias, indice_mes, normalizar_modelos
+
+def _modelos(*linhas):
+    return pd.DataFrame([
+        {'ID Modelo': id_modelo, 'Descricao': descricao, 'Categoria': 'Despesa', 'Valor': valor,
+         'Status': 'PAGO', 'Frequencia': 'Mensal', 'Inicio': '2025-01', 'Fim': ''}
+        for id_modelo, descricao, valor in linhas
+    ])
+
+def test_modelo_sem_id_gera_uma_vez_so():
+    modelos = _modelos((None, 'Aluguel', 1500), ('', 'Internet', 99.9))
+    armazenamento = ArmazenamentoSQLite(":memory:")
+    inicio, fim = indice_mes(2025, 1), indice_mes(2025, 6)
+    primeira = gerar_recorrencias(modelos, armazenamento, inicio, fim)
+    assert primeira["gravadas"] == 12
+    segunda = gerar_recorrencias(modelos, armazenamento, inicio, fim)
+    assert (segunda["gravadas"], segunda["existentes"]) == (0, 12)
+    assert len(armazenamento.carregar(2025)) == 12
+
+def test_id_do_modelo_vem_do_conteudo():
+    ids = normalizar_modelos(_modelos((None, 'Aluguel', 1500), (None, 'Aluguel', 1500.0), ('fixo', 'Aluguel', 1500)))[0]['ID Modelo']
+    assert ids[1] == f"{ids[0]}-2" # Modelos idênticos: numerados pela ordem
+    assert ids[2] == 'fixo'
+    assert normalizar_modelos(_modelos((None, 'aluguel ', '1500')))[0]['ID Modelo'][0] == ids[0]
+    assert normalizar_modelos(_modelos((None, 'Aluguel', 1600)))[0]['ID Modelo'][0] != ids[0]